@@ -6,9 +6,12 @@ from flask_login import LoginManager
 from flask_migrate import Migrate
 from config import config
 from flask_wtf import CSRFProtect
+from app.utils.shards import SesionPorTienda
+from app.utils.replica import configurar_replica, registrar_replica
+from sqlalchemy.engine import make_url
 import os
 
-db = SQLAlchemy()
+db = SQLAlchemy(session_options={'class_': SesionPorTienda})
 csrf = CSRFProtect()
 bcrypt = Bcrypt()
 login_manager = LoginManager()
@@ -22,10 +25,35 @@ def load_user(user_id):
     from app.models import User
     return User.query.get(int(user_id))
 
-def create_app(config_name='default'):
+def configurar_pool(app):
+    """Opciones de QueuePool para servidores de BD (las de SQLALCHEMY_ENGINE_OPTIONS tienen prioridad)"""
+    if make_url(app.config['SQLALCHEMY_DATABASE_URI']).get_backend_name() == 'sqlite':
+        return
+    app.config['SQLALCHEMY_ENGINE_OPTIONS'] = {
+        'pool_size': app.config['DB_POOL_SIZE'],
+        'max_overflow': app.config['DB_MAX_OVERFLOW'],
+        'pool_timeout': app.config['DB_POOL_TIMEOUT'],
+        'pool_recycle': app.config['DB_POOL_RECYCLE'],
+        'pool_pre_ping': True,
+        **app.config.get('SQLALCHEMY_ENGINE_OPTIONS', {}),
+    }
+
+def marcar_ultima_migracion(app):
+    """Registra en alembic_version la última migración (equivale a `flask db stamp head`)"""
+    from alembic.migration import MigrationContext
+    from alembic.script import ScriptDirectory
+    script = ScriptDirectory(os.path.join(os.path.dirname(app.root_path), 'migrations'))
+    with db.engine.begin() as conexion:
+        MigrationContext.configure(conexion).stamp(script, 'head')
+
+def create_app(config_name='default', **config_overrides):
     app = Flask(__name__)
     app.config.from_object(config[config_name])
+    # Permite a scripts (benchmarks, pruebas de carga) ajustar la configuración, p. ej. la BD
+    app.config.update(config_overrides)
     app.config['LOW_STOCK_THRESHOLD'] = 2
+    configurar_pool(app)
+    configurar_replica(app)
     
     csrf.init_app(app)
     db.init_app(app)
@@ -35,14 +63,28 @@ def create_app(config_name='default'):
     
     # En create_app, después de inicializar la base de datos
     with app.app_context():
-        db.create_all()
+        # Importar los modelos antes de create_all para que sus tablas queden registradas
+        from app.models import Role
+        from app.services.reference_service import registrar_eventos, asegurar_versiones
+        registrar_eventos()
+        tablas = set(db.inspect(db.engine).get_table_names())
+        if not tablas:
+            # BD nueva: se crea con el esquema actual y se marca en la última migración.
+            # El esquema de una BD existente lo actualizan las migraciones (flask db upgrade)
+            db.create_all()
+            marcar_ultima_migracion(app)
+            tablas = set(db.inspect(db.engine).get_table_names())
+        if 'versiones_tabla' in tablas:
+            asegurar_versiones()
         
         # Solo crear datos iniciales si no existen roles
-        from app.models import Role
         if not Role.query.first():
             from app.seeds import init_db
             init_db()
 
+    from app.utils.shards import registrar_enrutamiento
+    registrar_enrutamiento(app)
+    registrar_replica(app, db)
     
     from app.routes.auth import auth_bp #
     from app.routes.dashboard import dashboard_bp #
@@ -55,6 +97,7 @@ def create_app(config_name='default'):
     from app.routes.staff import staff_bp
     from app.routes.cities import cities_bp #
     from app.routes.main import main_bp
+    from app.routes.api import api_bp
     
     app.register_blueprint(auth_bp)
     app.register_blueprint(dashboard_bp, url_prefix='/dashboard')#
@@ -68,6 +111,14 @@ def create_app(config_name='default'):
     app.register_blueprint(cities_bp, url_prefix='/cities') #
     app.register_blueprint(main_bp)
     
+    # La API JSON se autentica con la cookie de sesión: sigue protegida por CSRF
+    # (token en la cabecera X-CSRFToken, ver GET /api/v1/csrf-token)
+    app.register_blueprint(api_bp, url_prefix='/api/v1')
+
+    # Los importes se guardan en centavos enteros: {{ venta.total_centavos|dinero }}
+    from app.utils.formatters import formatear_centavos
+    app.jinja_env.filters['dinero'] = formatear_centavos
+    
     @app.route('/')
     def index():
         return redirect(url_for('auth.login'))
@@ -1,4 +1,5 @@
 from flask_wtf import FlaskForm
+from flask_wtf.file import FileField, FileRequired, FileAllowed
 from wtforms import StringField, PasswordField, EmailField, DecimalField, IntegerField, DateTimeField, BooleanField, SelectField, SubmitField, RadioField, DateField
 from wtforms.validators import DataRequired, Email, Length, NumberRange, Optional, EqualTo
 from wtforms import ValidationError
@@ -126,6 +127,15 @@ class StockForm(FlaskForm):
     
     submit = SubmitField('Actualizar stock')
 
+#----------Importación de productos-------------
+class ProductImportForm(FlaskForm):
+    archivo = FileField('Archivo CSV', validators=[
+        FileRequired(message='Debe seleccionar un archivo'),
+        FileAllowed(['csv'], message='Solo se permiten archivos .csv')
+    ])
+    
+    submit = SubmitField('Importar')
+
 #----------Cliente-------------
 
 class ClienteForm(FlaskForm):
@@ -234,15 +244,6 @@ class SaleProductForm(FlaskForm):
         ]
     )
     
-    precio_unitario = DecimalField(
-        'Precio unitario',
-        places=2,
-        validators=[
-            DataRequired(message='Debe indicar el subtotal'),
-            NumberRange(min=0, message='El subtotal debe ser mayor o igual a 0')
-        ]
-    )
-    
     submit = SubmitField('Agregar Producto a Venta')
     
 #-----------Factura--------------
@@ -359,6 +360,9 @@ class SupplierOrderForm(FlaskForm):
         ('cancelada', 'Cancelada')
     ], validators=[DataRequired()])
     
+    # Tienda que recibe la mercancía; -1 = bodega central
+    tienda_id = SelectField('Destino', coerce=int, choices=[], validators=[Optional()])
+    
     submit = SubmitField('Guardar')
     
 #----------Orden, Producto proveedor---------
@@ -5,6 +5,7 @@ from .store import Store
 from .client import Client
 from .supplier import Supplier
 from .staff import Staff
+from .category import Category
 from .product import Product
 from .sale import Sale
 from .invoice import Invoice
@@ -13,9 +14,18 @@ from .supplier_order import SupplierOrder
 from .sale_product import SaleProduct
 from .client_order_product import ClientOrderProduct
 from .supplier_order_product import SupplierOrderProduct
+from .table_version import TableVersion
+from .client_summary import ClientSummary
+from .stock_reservation import StockReservation
+from .supplier_performance import SupplierPerformance
+from .store_inventory import StoreInventory
+from .product_daily_sales import ProductDailySales
+from .seller_monthly_sales import SellerMonthlySales
 
 __all__ = [
     'Role', 'User', 'City', 'Store', 'Client', 'Supplier', 'Staff', 
-    'Product', 'Sale', 'Invoice', 'ClientOrder', 'SupplierOrder',
-    'SaleProduct', 'ClientOrderProduct', 'SupplierOrderProduct'
+    'Category', 'Product', 'Sale', 'Invoice', 'ClientOrder', 'SupplierOrder',
+    'SaleProduct', 'ClientOrderProduct', 'SupplierOrderProduct', 'TableVersion', 'ClientSummary',
+    'StockReservation', 'SupplierPerformance', 'StoreInventory', 'ProductDailySales',
+    'SellerMonthlySales'
 ]
\ No newline at end of file
@@ -0,0 +1,23 @@
+from app import db
+from sqlalchemy.orm import relationship
+
+class Category(db.Model):
+    __tablename__ = 'categorias'
+    
+    id_categoria = db.Column(db.Integer, primary_key=True)
+    nombre = db.Column(db.String(100), nullable=False, unique=True)
+    activo = db.Column(db.Boolean, default=True)
+    
+    # Relaciones
+    productos = relationship('Product', back_populates='categoria')
+    
+    @classmethod
+    def get_activas(cls):
+        """Obtiene solo las categorías activas"""
+        return cls.query.filter_by(activo=True)
+    
+    def __str__(self):
+        return self.nombre
+    
+    def __repr__(self):
+        return f'<Categoria {self.nombre}>'
@@ -1,14 +1,25 @@
 from app import db
-from sqlalchemy.orm import relationship
+from sqlalchemy.orm import relationship, validates
 from datetime import datetime
+from app.utils.formatters import normalizar_texto, normalizar_telefono
 
 class Client(db.Model):
     __tablename__ = 'clientes'
+    __table_args__ = (
+        # Búsqueda por prefijo en PostgreSQL: índices con collation binaria (ver buscar)
+        db.Index('ix_clientes_nombre_normalizado_c', db.text('nombre_normalizado COLLATE "C"'))
+        .ddl_if(dialect='postgresql'),
+        db.Index('ix_clientes_telefono_normalizado_c', db.text('telefono_normalizado COLLATE "C"'))
+        .ddl_if(dialect='postgresql'),
+    )
     
     id_cliente = db.Column(db.Integer, primary_key=True)
     nombre = db.Column(db.String(100), nullable=False)
     direccion = db.Column(db.String(150))
     telefono = db.Column(db.String(50))
+    # Columnas derivadas para búsqueda por prefijo y detección de duplicados
+    nombre_normalizado = db.Column(db.String(100), index=True)
+    telefono_normalizado = db.Column(db.String(50), index=True)
     ciudad_id = db.Column(db.Integer, db.ForeignKey('ciudades.id_ciudad'))
     activo = db.Column(db.Boolean, default=True)
     fecha_eliminacion = db.Column(db.DateTime)
@@ -17,6 +28,39 @@ class Client(db.Model):
     ciudad = relationship('City', back_populates='clientes')
     ventas = relationship('Sale', back_populates='cliente')
     ordenes = relationship('ClientOrder', back_populates='cliente')
+    resumen = relationship('ClientSummary', back_populates='cliente', uselist=False)
+    
+    @validates('nombre', 'telefono')
+    def _normalizar(self, campo, valor):
+        """Mantiene sincronizadas las columnas normalizadas al asignar nombre o teléfono"""
+        setattr(self, f'{campo}_normalizado', Client.normalizar(campo, valor))
+        return valor
+    
+    @staticmethod
+    def normalizar(campo, valor):
+        return normalizar_texto(valor) if campo == 'nombre' else normalizar_telefono(valor)
+    
+    @classmethod
+    def completar_columnas(cls, datos):
+        """Agrega las columnas normalizadas a un dict de escritura masiva (executemany)"""
+        for campo in ('nombre', 'telefono'):
+            if campo in datos:
+                datos[f'{campo}_normalizado'] = cls.normalizar(campo, datos[campo])
+        return datos
+    
+    @classmethod
+    def buscar(cls, texto):
+        """Filtro por prefijo de teléfono (si el texto tiene dígitos) o de nombre, sobre índices"""
+        telefono = normalizar_telefono(texto)
+        if telefono and len(telefono) >= len(texto.strip()) / 2:
+            columna, prefijo = cls.telefono_normalizado, telefono
+        else:
+            columna, prefijo = cls.nombre_normalizado, normalizar_texto(texto)
+        # Rango en lugar de LIKE: usa el índice. Solo vale con collation binaria, así que
+        # en PostgreSQL se compara con COLLATE "C" (sobre su índice) sea cual sea la del servidor
+        if db.session.get_bind().dialect.name == 'postgresql':
+            columna = columna.collate('C')
+        return cls.query.filter(columna >= prefijo, columna < prefijo + '\uffff')
     
     def desactivar(self):
         """Marca el cliente como inactivo (soft delete)"""
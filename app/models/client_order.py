@@ -4,16 +4,27 @@ from datetime import datetime
 
 class ClientOrder(db.Model):
     __tablename__ = 'ordenes_cliente'
+    __table_args__ = (
+        db.UniqueConstraint('venta_id', name='uq_ordenes_cliente_venta_id'),
+        # Historial de un cliente filtrado por estado y ordenado por fecha
+        db.Index('ix_ordenes_cliente_cliente_estado_fecha', 'cliente_id', 'estado', 'fecha'),
+    )
+    
+    ESTADOS = ('pendiente', 'completada', 'cancelada')
     
     id_orden_cliente = db.Column(db.Integer, primary_key=True)
     fecha = db.Column(db.DateTime, nullable=False, default=datetime.utcnow)
     estado = db.Column(db.String(50), nullable=False, default='pendiente')
     descripcion = db.Column(db.String(150))
     cliente_id = db.Column(db.Integer, db.ForeignKey('clientes.id_cliente'), nullable=False)
+    # Venta generada al cumplir la orden
+    venta_id = db.Column(db.Integer, db.ForeignKey('ventas.id_venta'))
     
     # Relaciones
     cliente = relationship('Client', back_populates='ordenes')
-    productos = relationship('ClientOrderProduct', back_populates='orden')
+    productos = relationship('ClientOrderProduct', back_populates='orden', cascade='all, delete-orphan')
+    venta = relationship('Sale')
+    reservas = relationship('StockReservation', back_populates='orden')
 
     def __repr__(self):
         return f'<OrdenCliente id:{self.id_orden_cliente} cliente:{self.cliente_id} estado:{self.estado}>'
@@ -3,6 +3,10 @@ from sqlalchemy.orm import relationship
 
 class ClientOrderProduct(db.Model):
     __tablename__ = 'ordencliente_producto'
+    __table_args__ = (
+        # Una línea por producto en cada orden; destino del INSERT ... ON CONFLICT
+        db.UniqueConstraint('id_orden_cliente', 'id_producto', name='uq_ordencliente_producto'),
+    )
     
     id_orden_producto = db.Column(db.Integer, primary_key=True)
     id_orden_cliente = db.Column(db.Integer, db.ForeignKey('ordenes_cliente.id_orden_cliente'), nullable=False)
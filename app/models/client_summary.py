@@ -0,0 +1,24 @@
+from app import db
+from sqlalchemy.orm import relationship
+
+class ClientSummary(db.Model):
+    """Totales de compra por cliente, actualizados al registrar cada venta"""
+    __tablename__ = 'resumen_clientes'
+    
+    cliente_id = db.Column(db.Integer, db.ForeignKey('clientes.id_cliente'), primary_key=True)
+    total_gastado_centavos = db.Column(db.BigInteger, nullable=False, default=0)
+    num_compras = db.Column(db.Integer, nullable=False, default=0)
+    ultima_compra = db.Column(db.DateTime)
+    
+    # Relaciones
+    cliente = relationship('Client', back_populates='resumen')
+    
+    @property
+    def ticket_promedio(self):
+        """Gasto medio por compra, en centavos redondeados"""
+        if not self.num_compras:
+            return 0
+        return (self.total_gastado_centavos * 2 + self.num_compras) // (self.num_compras * 2)
+    
+    def __repr__(self):
+        return f'<ResumenCliente {self.cliente_id}: {self.num_compras} compras>'
@@ -8,7 +8,7 @@ class Invoice(db.Model):
     
     id_factura = db.Column(db.Integer, primary_key=True)
     fecha = db.Column(db.DateTime, nullable=False, default=datetime.utcnow)
-    total = db.Column(db.Numeric(10, 2), nullable=False)
+    total_centavos = db.Column(db.Integer, nullable=False)
     venta_id = db.Column(db.Integer, db.ForeignKey('ventas.id_venta'), nullable=False, unique=True)
     activo = db.Column(db.Boolean, default=True, nullable=False)
 
@@ -25,4 +25,4 @@ class Invoice(db.Model):
         self.activo = True
     
     def __repr__(self):
-        return f'<Factura {self.id_factura} - Venta {self.venta_id} - Total {self.total}>'
\ No newline at end of file
+        return f'<Factura {self.id_factura} - Venta {self.venta_id} - Total {self.total_centavos}c>'
\ No newline at end of file
@@ -1,4 +1,5 @@
 from app import db
+from flask import current_app
 from sqlalchemy.orm import relationship
 from datetime import datetime
 
@@ -7,19 +8,24 @@ class Product(db.Model):
     
     id_producto = db.Column(db.Integer, primary_key=True)
     nombre = db.Column(db.String(100), nullable=False)
-    categoria = db.Column(db.String(100), nullable=False)
+    categoria_id = db.Column(db.Integer, db.ForeignKey('categorias.id_categoria'), nullable=False, index=True)
     descripcion = db.Column(db.Text)
     precio = db.Column(db.Numeric(10, 2), nullable=False)
+    # Total de unidades: las ubicadas en tiendas (inventario_tiendas) más las de bodega central
     stock = db.Column(db.Integer, default=0)
+    # Suma de las reservas activas; disponible para vender = stock - reservado
+    reservado = db.Column(db.Integer, nullable=False, default=0, server_default='0')
     proveedor_id = db.Column(db.Integer, db.ForeignKey('proveedores.id_proveedor'))
     activo = db.Column(db.Boolean, default=True)  # Campo para soft delete
     fecha_eliminacion = db.Column(db.DateTime)    # Fecha de desactivación
     
     # Relaciones
+    categoria = relationship('Category', back_populates='productos')
     proveedor = relationship('Supplier', back_populates='productos')
     ventas = relationship('SaleProduct', back_populates='producto')
     ordenes_cliente = relationship('ClientOrderProduct', back_populates='producto')
     ordenes_proveedor = relationship('SupplierOrderProduct', back_populates='producto')
+    inventario = relationship('StoreInventory', back_populates='producto')
     
     def aumentar_stock(self, cantidad: int):
         """Aumenta el stock del producto"""
@@ -31,11 +37,36 @@ class Product(db.Model):
         """Reduce el stock del producto si hay suficiente disponibilidad"""
         if cantidad <= 0:
             raise ValueError("La cantidad a reducir debe ser mayor a 0")
-        if self.stock < cantidad:
-            raise ValueError('No hay suficiente stock disponible')    
+        libre = (self.stock or 0) - self.stock_minimo
+        if libre < cantidad:
+            raise ValueError(f'No hay suficiente stock libre en bodega central (disponible: {libre})')
         self.stock -= cantidad
         return True
     
+    @property
+    def disponible(self):
+        """Stock que no está apartado por órdenes pendientes"""
+        return (self.stock or 0) - (self.reservado or 0)
+    
+    @property
+    def en_tiendas(self):
+        """Unidades ubicadas en alguna tienda"""
+        if current_app.config.get('STORE_SHARDING'):
+            # El inventario está en la BD de cada tienda, no en la relación
+            from app.services.inventory_service import ubicadas
+            return ubicadas([self.id_producto]).get(self.id_producto, 0)
+        return sum(fila.stock for fila in self.inventario)
+    
+    @property
+    def en_bodega(self):
+        """Unidades sin ubicar en tiendas (bodega central); lo único que se ajusta desde el catálogo"""
+        return (self.stock or 0) - self.en_tiendas
+    
+    @property
+    def stock_minimo(self):
+        """Mínimo al que puede bajar el stock: lo ubicado en tiendas o lo reservado, lo que sea mayor"""
+        return max(self.en_tiendas, self.reservado or 0)
+    
     def desactivar(self):
         """Marca el producto como inactivo (soft delete)"""
         self.activo = False
@@ -0,0 +1,20 @@
+from app import db
+from sqlalchemy.orm import relationship
+
+class ProductDailySales(db.Model):
+    """Ventas por día, tienda y producto, sumadas al registrar cada venta"""
+    __tablename__ = 'ventas_producto_dia'
+    
+    fecha = db.Column(db.Date, primary_key=True)
+    tienda_id = db.Column(db.Integer, db.ForeignKey('tiendas.id_tienda'), primary_key=True)
+    id_producto = db.Column(db.Integer, db.ForeignKey('productos.id_producto'), primary_key=True)
+    ventas = db.Column(db.Integer, nullable=False, default=0)  # ventas que incluyen el producto
+    unidades = db.Column(db.Integer, nullable=False, default=0)
+    importe_centavos = db.Column(db.BigInteger, nullable=False, default=0)
+    
+    # Relaciones
+    tienda = relationship('Store')
+    producto = relationship('Product')
+    
+    def __repr__(self):
+        return f'<VentasProductoDia {self.fecha} tienda:{self.tienda_id} producto:{self.id_producto}>'
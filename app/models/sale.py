@@ -5,10 +5,14 @@ from datetime import datetime
 
 class Sale(db.Model):
     __tablename__ = 'ventas'
+    __table_args__ = (
+        # Historial de compras por cliente, más recientes primero
+        db.Index('ix_ventas_cliente_fecha', 'cliente_id', 'fecha'),
+    )
     
     id_venta = db.Column(db.Integer, primary_key=True)
     fecha = db.Column(db.DateTime, nullable=False, default=datetime.utcnow)
-    total = db.Column(db.Numeric(10, 2), nullable=False, default=0)
+    total_centavos = db.Column(db.Integer, nullable=False, default=0)  # importe en centavos
     estado = db.Column(db.String(20), nullable=False, default='activa')  # activa | anulada
     activo = db.Column(db.Boolean, default=True, nullable=False)
 
@@ -25,13 +29,12 @@ class Sale(db.Model):
     
     # --- Métodos de negocio ---
     def calcular_total(self):
-        """Recalcula el total de la venta sumando los subtotales de productos."""
-        total = 0
-        for producto_venta in self.productos:
-            total += producto_venta.precio_unitario * producto_venta.cantidad
-            
-        self.total = total
-        return self.total
+        """Recalcula el total (centavos) con un SUM entero sobre las líneas de la venta."""
+        from app.models.sale_product import SaleProduct
+        self.total_centavos = db.session.query(
+            db.func.coalesce(db.func.sum(SaleProduct.cantidad * SaleProduct.precio_unitario_centavos), 0)
+        ).filter(SaleProduct.id_venta == self.id_venta).scalar()
+        return self.total_centavos
         
 
     def anular(self):
@@ -49,4 +52,4 @@ class Sale(db.Model):
             producto_venta.activo = True
     
     def __repr__(self):
-        return f'<Venta {self.id_venta} - Total: {self.total}>'
+        return f'<Venta {self.id_venta} - Total: {self.total_centavos}c>'
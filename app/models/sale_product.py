@@ -7,7 +7,7 @@ class SaleProduct(db.Model):
     id_venta = db.Column(db.Integer, db.ForeignKey('ventas.id_venta'), primary_key=True)
     id_producto = db.Column(db.Integer, db.ForeignKey('productos.id_producto'), primary_key=True)
     cantidad = db.Column(db.Integer, nullable=False)
-    precio_unitario = db.Column(db.Numeric(10, 2), nullable=False)  # precio en el momento de la venta
+    precio_unitario_centavos = db.Column(db.Integer, nullable=False)  # precio en el momento de la venta
     activo = db.Column(db.Boolean, default=True, nullable=False)
     
     # Relaciones
@@ -16,8 +16,8 @@ class SaleProduct(db.Model):
     
     # --- Métodos de negocio ---
     def subtotal(self):
-        """Calcula el subtotal del producto en la venta."""
-        return float(self.cantidad) * float(self.precio_unitario)
+        """Calcula el subtotal del producto en la venta, en centavos."""
+        return self.cantidad * self.precio_unitario_centavos
 
     def desactivar(self):
         """Soft delete del producto en la venta."""
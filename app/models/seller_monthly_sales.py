@@ -0,0 +1,28 @@
+from app import db
+from sqlalchemy.orm import relationship
+
+class SellerMonthlySales(db.Model):
+    """Totales de cada vendedor por mes, sumados al registrar cada venta; la comisión la fija el cierre"""
+    __tablename__ = 'ventas_vendedor_mes'
+    
+    periodo = db.Column(db.Date, primary_key=True)  # primer día del mes
+    empleado_id = db.Column(db.Integer, db.ForeignKey('personal.id_empleado'), primary_key=True)
+    ventas = db.Column(db.Integer, nullable=False, default=0)
+    unidades = db.Column(db.Integer, nullable=False, default=0)
+    importe_centavos = db.Column(db.BigInteger, nullable=False, default=0)
+    # Fijadas por calcular_comisiones con los tramos vigentes al cerrar el periodo
+    comision_centavos = db.Column(db.BigInteger)
+    comision_calculada = db.Column(db.DateTime)
+    
+    # Relaciones
+    empleado = relationship('Staff')
+    
+    @property
+    def ticket_promedio(self):
+        """Importe medio por venta, en centavos redondeados"""
+        if not self.ventas:
+            return 0
+        return (self.importe_centavos * 2 + self.ventas) // (self.ventas * 2)
+    
+    def __repr__(self):
+        return f'<VentasVendedorMes {self.periodo} empleado:{self.empleado_id}>'
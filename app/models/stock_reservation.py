@@ -0,0 +1,25 @@
+from app import db
+from sqlalchemy.orm import relationship
+from datetime import datetime
+
+class StockReservation(db.Model):
+    """Unidades apartadas por una orden de cliente pendiente hasta que vence"""
+    __tablename__ = 'reservas_stock'
+    __table_args__ = (
+        db.UniqueConstraint('id_orden_cliente', 'id_producto', name='uq_reservas_stock_orden_producto'),
+    )
+    
+    id_reserva = db.Column(db.Integer, primary_key=True)
+    id_orden_cliente = db.Column(db.Integer, db.ForeignKey('ordenes_cliente.id_orden_cliente'), nullable=False)
+    id_producto = db.Column(db.Integer, db.ForeignKey('productos.id_producto'), nullable=False, index=True)
+    cantidad = db.Column(db.Integer, nullable=False)
+    fecha = db.Column(db.DateTime, nullable=False, default=datetime.utcnow)
+    # El barrido periódico libera las reservas vencidas
+    expira = db.Column(db.DateTime, nullable=False, index=True)
+    
+    # Relaciones
+    orden = relationship('ClientOrder', back_populates='reservas')
+    producto = relationship('Product')
+    
+    def __repr__(self):
+        return f'<Reserva orden:{self.id_orden_cliente} producto:{self.id_producto} cantidad:{self.cantidad}>'
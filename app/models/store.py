@@ -16,6 +16,7 @@ class Store(db.Model):
     ciudad = relationship('City', back_populates='tiendas')
     personal = relationship('Staff', back_populates='tienda')
     ventas = relationship('Sale', back_populates='tienda')
+    inventario = relationship('StoreInventory', back_populates='tienda')
     
     def desactivar(self):
         """Marca la tienda como inactiva (soft delete) y desactiva su personal"""
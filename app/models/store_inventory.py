@@ -0,0 +1,21 @@
+from app import db
+from sqlalchemy.orm import relationship
+
+class StoreInventory(db.Model):
+    """Unidades de un producto ubicadas en una tienda"""
+    __tablename__ = 'inventario_tiendas'
+    __table_args__ = (
+        db.CheckConstraint('stock >= 0', name='ck_inventario_tiendas_stock'),
+    )
+    
+    # La clave (tienda, producto) sirve a las consultas por tienda; id_producto tiene su propio índice
+    tienda_id = db.Column(db.Integer, db.ForeignKey('tiendas.id_tienda'), primary_key=True)
+    id_producto = db.Column(db.Integer, db.ForeignKey('productos.id_producto'), primary_key=True, index=True)
+    stock = db.Column(db.Integer, nullable=False, default=0)
+    
+    # Relaciones
+    tienda = relationship('Store', back_populates='inventario')
+    producto = relationship('Product', back_populates='inventario')
+    
+    def __repr__(self):
+        return f'<InventarioTienda {self.tienda_id}/{self.id_producto}: {self.stock}>'
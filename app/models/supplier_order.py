@@ -4,26 +4,46 @@ from datetime import datetime
 
 class SupplierOrder(db.Model):
     __tablename__ = 'ordenes_proveedor'
+    __table_args__ = (
+        # Listados por estado (administrador) y por proveedor, más recientes primero
+        db.Index('ix_ordenes_proveedor_estado_fecha', 'estado', 'fecha'),
+        db.Index('ix_ordenes_proveedor_proveedor_estado_fecha', 'proveedor_id', 'estado', 'fecha'),
+    )
+    
+    ESTADOS = ('pendiente', 'recibida', 'cancelada')
     
     id_orden_proveedor = db.Column(db.Integer, primary_key=True)
     fecha = db.Column(db.DateTime, nullable=False, default=datetime.utcnow)
     estado = db.Column(db.String(50), nullable=False, default='pendiente')
     proveedor_id = db.Column(db.Integer, db.ForeignKey('proveedores.id_proveedor'), nullable=False)
+    # Tienda donde se recibe la mercancía; NULL = bodega central
+    tienda_id = db.Column(db.Integer, db.ForeignKey('tiendas.id_tienda'))
+    # Totales precalculados al crear la orden, para no recorrer las líneas en los listados
+    num_lineas = db.Column(db.Integer, nullable=False, default=0, server_default='0')
+    valor_total = db.Column(db.Numeric(14, 2), nullable=False, default=0, server_default='0')
+    # Marcas de tiempo de cada transición de estado (`fecha` la elige el usuario)
+    fecha_creacion = db.Column(db.DateTime, default=datetime.utcnow)
+    fecha_recepcion = db.Column(db.DateTime)
+    fecha_cancelacion = db.Column(db.DateTime)
     
     # Relaciones
     proveedor = relationship('Supplier', back_populates='ordenes')
+    tienda = relationship('Store')
     productos = relationship('SupplierOrderProduct', back_populates='orden')
     
     # --- Métodos de negocio ---
     def recibir_orden(self):
-        """Marca la orden como recibida y actualiza el inventario"""
+        """Marca la orden como recibida y suma sus unidades al inventario de la tienda destino"""
+        from app.services.inventory_service import ingresar
         if self.estado == 'pendiente':
             self.estado = 'recibida'
+            self.fecha_recepcion = datetime.utcnow()
             
-            # Actualizar stock de productos
+            # Actualizar stock de productos (total y tienda destino)
+            cantidades = {}
             for item in self.productos:
-                producto = item.producto
-                producto.stock += item.cantidad
+                cantidades[item.id_producto] = cantidades.get(item.id_producto, 0) + item.cantidad
+            ingresar(self.tienda_id, cantidades)
                 
             db.session.commit()
    
@@ -31,6 +51,7 @@ class SupplierOrder(db.Model):
         """Cancela la orden si aún está pendiente"""
         if self.estado == 'pendiente':
             self.estado = 'cancelada'
+            self.fecha_cancelacion = datetime.utcnow()
             db.session.commit()
             
     def __repr__(self):
@@ -5,7 +5,7 @@ class SupplierOrderProduct(db.Model):
     __tablename__ = 'ordenproveedor_producto'
     
     id_proveedor_producto = db.Column(db.Integer, primary_key=True)
-    id_orden_proveedor = db.Column(db.Integer, db.ForeignKey('ordenes_proveedor.id_orden_proveedor'))
+    id_orden_proveedor = db.Column(db.Integer, db.ForeignKey('ordenes_proveedor.id_orden_proveedor'), index=True)
     id_producto = db.Column(db.Integer, db.ForeignKey('productos.id_producto'))
     cantidad = db.Column(db.Integer, nullable=False)
     
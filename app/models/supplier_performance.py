@@ -0,0 +1,31 @@
+from app import db
+from sqlalchemy.orm import relationship
+
+class SupplierPerformance(db.Model):
+    """Indicadores por proveedor, recalculados por el rollup nocturno"""
+    __tablename__ = 'rendimiento_proveedores'
+    
+    proveedor_id = db.Column(db.Integer, db.ForeignKey('proveedores.id_proveedor'), primary_key=True)
+    ordenes = db.Column(db.Integer, nullable=False, default=0)
+    recibidas = db.Column(db.Integer, nullable=False, default=0)
+    canceladas = db.Column(db.Integer, nullable=False, default=0)
+    pendientes = db.Column(db.Integer, nullable=False, default=0)
+    unidades_recibidas = db.Column(db.Integer, nullable=False, default=0)
+    valor_recibido = db.Column(db.Numeric(14, 2), nullable=False, default=0)
+    # Horas entre la creación y la recepción, solo de órdenes con ambas marcas
+    lead_time_promedio = db.Column(db.Float)
+    lead_time_maximo = db.Column(db.Float)
+    desde = db.Column(db.DateTime, nullable=False)
+    actualizado = db.Column(db.DateTime, nullable=False)
+    
+    # Relaciones
+    proveedor = relationship('Supplier')
+    
+    @property
+    def tasa_cumplimiento(self):
+        """Fracción de las órdenes cerradas que se recibieron (no canceladas)"""
+        cerradas = self.recibidas + self.canceladas
+        return self.recibidas / cerradas if cerradas else None
+    
+    def __repr__(self):
+        return f'<RendimientoProveedor {self.proveedor_id}: {self.ordenes} órdenes>'
@@ -0,0 +1,11 @@
+from app import db
+
+class TableVersion(db.Model):
+    """Contador de cambios por tabla; las cachés de referencia y de analítica lo comparan"""
+    __tablename__ = 'versiones_tabla'
+    
+    tabla = db.Column(db.String(50), primary_key=True)
+    version = db.Column(db.Integer, nullable=False, default=0)
+    
+    def __repr__(self):
+        return f'<VersionTabla {self.tabla}={self.version}>'
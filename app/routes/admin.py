@@ -2,7 +2,10 @@ from flask import Blueprint, render_template, redirect, url_for, flash, request,
 from flask_login import login_required, current_user
 from app import db
 from app.models import User, Product, Role, Sale, Staff, Store
-from app.utils.decorators import admin_required, active_user_required, roles_required
+from app.utils.decorators import admin_required, active_user_required, roles_required, solo_lectura
+from app.services.reference_service import opciones
+from app.services.sale_service import contar_ventas, ventas_por_dia
+from app.services.report_service import reporte_ventas
 from sqlalchemy.exc import IntegrityError
 from app.forms import UserForm, RolForm, ConfirmDeleteForm, EmptyForm
 from app.utils.security import sanitize_form_data
@@ -50,8 +53,8 @@ def create_user():
     form = UserForm()
 
     # Cargar roles y asignar choices antes de validar
-    roles = Role.query.all()
-    form.rol_id.choices = [(role.id_rol, role.nombre) for role in roles]
+    roles = opciones('roles')
+    form.rol_id.choices = roles
 
     if request.method == 'POST' and not form.validate_on_submit():
         current_app.logger.debug('Formulario no validó. Errores: %s', form.errors)
@@ -156,8 +159,8 @@ def edit_user(user_id):
     form = UserForm()
     
     #Cargar roles
-    roles = Role.query.all()
-    form.rol_id.choices = [(role.id_rol, role.nombre) for role in roles]
+    roles = opciones('roles')
+    form.rol_id.choices = roles
     
     if form.validate_on_submit():
         try:  
@@ -383,6 +386,7 @@ def activate_role(role_id):
 @login_required
 @admin_required
 @active_user_required
+@solo_lectura
 def dashboard():
     """Panel de control principal de administración"""
     try:
@@ -394,7 +398,7 @@ def dashboard():
         
         # Ventas de los últimos 7 días
         fecha_inicio = datetime.utcnow() - timedelta(days=7)
-        ventas_recientes = Sale.query.filter(Sale.fecha >= fecha_inicio).count()
+        ventas_recientes, _ = contar_ventas(fecha_inicio)
         
         # Usuarios recientes (últimos 30 días)
         usuarios_recientes = User.query.filter(User.fecha_registro >= datetime.utcnow() - timedelta(days=30)).count()
@@ -483,6 +487,7 @@ def manage_staff():
 @login_required
 @admin_required
 @active_user_required
+@solo_lectura
 def sales_report():
     """Reporte de ventas"""
     try:
@@ -492,8 +497,8 @@ def sales_report():
         # Si no se proporcionan fechas, usar el mes actual
         if not fecha_inicio or not fecha_fin:
             hoy = datetime.utcnow()
-            fecha_inicio = hoy.replace(day=1).date()  # Primer día del mes
-            fecha_fin = hoy.date()
+            fecha_inicio = hoy.replace(day=1, hour=0, minute=0, second=0, microsecond=0)  # Primer día del mes
+            fecha_fin = hoy
         
         # Convertir a objetos datetime si son strings
         if isinstance(fecha_inicio, str):
@@ -504,22 +509,15 @@ def sales_report():
         # Ajustar fecha_fin para incluir todo el día
         fecha_fin = fecha_fin.replace(hour=23, minute=59, second=59)
         
-        # Obtener ventas en el rango de fechas
-        ventas = Sale.query.filter(
-            Sale.fecha >= fecha_inicio,
-            Sale.fecha <= fecha_fin
-        ).all()
-        
-        # Calcular totales
-        total_ventas = sum(venta.total for venta in ventas if venta.total)
-        total_articulos = sum(len(venta.productos) for venta in ventas)
+        # Totales, percentiles y desgloses sin cargar las ventas como objetos
+        reporte = reporte_ventas(fecha_inicio, fecha_fin)
         
         return render_template('admin/sales_report.html',
-                             ventas=ventas,
+                             reporte=reporte,
                              fecha_inicio=fecha_inicio.date(),
                              fecha_fin=fecha_fin.date(),
-                             total_ventas=total_ventas,
-                             total_articulos=total_articulos)
+                             total_ventas=reporte['total_centavos'],
+                             total_articulos=reporte['unidades'])
     
     except Exception as e:
         flash(f'Error al generar reporte de ventas: {str(e)}', 'danger')
@@ -530,6 +528,7 @@ def sales_report():
 @admin_bp.route('/api/sales-data')
 @login_required
 @roles_required('Administrador', 'Vendedor')  # Usando el decorador mejorado
+@solo_lectura
 def api_sales_data():
     """Endpoint de API para datos de ventas (para gráficos)"""
     try:
@@ -540,35 +539,19 @@ def api_sales_data():
         fecha_fin = datetime.utcnow()
         fecha_inicio = fecha_fin - timedelta(days=dias)
         
-        # Consultar ventas agrupadas por día
-        resultados = db.session.query(
-            db.func.date(Sale.fecha).label('fecha'),
-            db.func.count(Sale.id_venta).label('ventas'),
-            db.func.sum(Sale.total).label('ingresos')
-        ).filter(
-            Sale.fecha >= fecha_inicio,
-            Sale.fecha <= fecha_fin
-        ).group_by(
-            db.func.date(Sale.fecha)
-        ).order_by(
-            db.func.date(Sale.fecha)
-        ).all()
+        # Consultar ventas agrupadas por día (en todas las tiendas)
+        resultados = ventas_por_dia(fecha_inicio, fecha_fin)
         
         # Formatear datos para el gráfico
-        fechas = []
-        ventas_por_dia = []
-        ingresos_por_dia = []
-        
-        for resultado in resultados:
-            fechas.append(resultado.fecha.strftime('%Y-%m-%d'))
-            ventas_por_dia.append(resultado.ventas)
-            ingresos_por_dia.append(float(resultado.ingresos) if resultado.ingresos else 0)
+        fechas = [fecha for fecha, _, _ in resultados]
+        ventas_diarias = [ventas for _, ventas, _ in resultados]
+        ingresos_por_dia = [ingresos / 100 for _, _, ingresos in resultados]  # centavos -> unidades
         
         return jsonify({
             'success': True,
             'data': {
                 'fechas': fechas,
-                'ventas': ventas_por_dia,
+                'ventas': ventas_diarias,
                 'ingresos': ingresos_por_dia
             }
         })
@@ -582,6 +565,7 @@ def api_sales_data():
 @admin_bp.route('/api/user-stats')
 @login_required
 @admin_required
+@solo_lectura
 def api_user_stats():
     """Endpoint de API para estadísticas de usuarios"""
     try:
@@ -624,7 +608,7 @@ def api_system_health():
     """Endpoint de API para verificar el estado del sistema"""
     try:
         # Verificar conexión a la base de datos
-        db.session.execute('SELECT 1')
+        db.session.execute(db.text('SELECT 1'))
         
         # Contar registros en tablas importantes
         usuarios_activos = User.query.filter_by(activo=True).count()
@@ -635,6 +619,8 @@ def api_system_health():
             'success': True,
             'data': {
                 'database': 'online',
+                'motor': db.engine.dialect.name,
+                'pool': db.engine.pool.status(),
                 'usuarios_activos': usuarios_activos,
                 'productos_activos': productos_activos,
                 'tiendas_activas': tiendas_activas,
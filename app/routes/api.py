@@ -0,0 +1,402 @@
+from datetime import date, datetime
+from flask import Blueprint, jsonify, request, current_app
+from flask_login import current_user, login_required
+from flask_wtf.csrf import CSRFError, generate_csrf
+from app import db
+from sqlalchemy.exc import SQLAlchemyError
+from app.models import Product, Client, Supplier, City, Category, ClientOrder, Staff, SupplierPerformance
+from app.schemas import PRODUCT_SCHEMA, CLIENT_SCHEMA, SUPPLIER_SCHEMA
+from app.services.bulk_service import bulk_write, IN_CHUNK_SIZE
+from app.services.inventory_service import ajustar_stock_masivo, transferir_lote, stock_tienda
+from app.services.catalog_service import resolver_categorias
+from app.services.client_order_service import upsert_lineas, cumplir_ordenes
+from app.services.reservation_service import disponibilidad
+from app.services.report_service import top_productos, mezcla_categorias, clasificacion_abc
+from app.services.seller_service import ranking_vendedores, comision, CRITERIOS
+from app.utils.decorators import api_roles_required, solo_lectura
+from app.utils.shards import en_tienda
+
+# La API usa la sesión de Flask-Login, así que las peticiones que escriben
+# (POST, PUT, PATCH, DELETE) deben enviar el token CSRF en la cabecera
+# X-CSRFToken. Las integraciones lo obtienen, ya autenticadas, con
+# GET /api/v1/csrf-token; vale mientras dure la sesión (WTF_CSRF_TIME_LIMIT).
+api_bp = Blueprint('api', __name__)
+
+# Método HTTP -> modo de escritura masiva
+MODOS_POR_METODO = {
+    'POST': 'create',
+    'PATCH': 'update',
+    'PUT': 'upsert',
+}
+
+# Recurso -> (modelo, esquema, referencias, campos únicos, roles permitidos)
+RECURSOS = {
+    'products': (Product, PRODUCT_SCHEMA, {'proveedor_id': Supplier.id_proveedor, 'categoria_id': Category.id_categoria},
+                 [], ('Administrador',)),
+    'clients': (Client, CLIENT_SCHEMA, {'ciudad_id': City.id_ciudad}, ['telefono_normalizado'],
+                ('Administrador', 'Vendedor')),
+    'suppliers': (Supplier, SUPPLIER_SCHEMA, {'ciudad_id': City.id_ciudad}, [], ('Administrador',)),
+}
+
+
+@api_bp.errorhandler(CSRFError)
+def csrf_invalido(e):
+    return jsonify({'success': False, 'error': f'Token CSRF inválido o ausente (cabecera X-CSRFToken): {e.description}'}), 400
+
+
+@api_bp.route('/csrf-token', methods=['GET'])
+@login_required
+def csrf_token():
+    """Token CSRF de la sesión actual, para la cabecera X-CSRFToken de las peticiones que escriben"""
+    return jsonify({'success': True, 'data': {'csrf_token': generate_csrf()}})
+
+
+def _leer_lote():
+    """Extrae y valida el cuerpo {'rows': [...], 'partial': bool} de la petición"""
+    cuerpo = request.get_json(silent=True)
+    if not isinstance(cuerpo, dict) or not isinstance(cuerpo.get('rows'), list):
+        return None, None, "El cuerpo debe ser un objeto JSON con una lista 'rows'"
+
+    filas = cuerpo['rows']
+    maximo = current_app.config.get('API_BULK_MAX_ROWS', 10000)
+    if not filas:
+        return None, None, 'El lote está vacío'
+    if len(filas) > maximo:
+        return None, None, f'El lote excede el máximo de {maximo} filas'
+
+    return filas, bool(cuerpo.get('partial', False)), None
+
+
+def _respuesta_lote(resultado):
+    escrito = resultado.get('creadas', 0) + resultado.get('actualizadas', 0) > 0
+    exito = not resultado['errores']
+    codigo = 200 if exito or escrito else 422
+    return jsonify({'success': exito, 'data': resultado}), codigo
+
+
+def _bulk_recurso(recurso):
+    modelo, esquema, referencias, unicos, _ = RECURSOS[recurso]
+    filas, parcial, error = _leer_lote()
+    if error:
+        return jsonify({'success': False, 'error': error}), 400
+
+    try:
+        if modelo is Product:
+            # Se acepta el nombre de la categoría ('categoria') además de 'categoria_id'
+            filas = resolver_categorias(filas)
+        resultado = bulk_write(
+            modelo, esquema, filas, MODOS_POR_METODO[request.method],
+            referencias=referencias, unicos=unicos, parcial=parcial
+        )
+        return _respuesta_lote(resultado)
+    except SQLAlchemyError as e:
+        current_app.logger.error(f'Error de BD en carga masiva de {recurso}: {str(e)}')
+        return jsonify({'success': False, 'error': 'Error de base de datos, el lote no fue aplicado'}), 500
+
+
+@api_bp.route('/products/bulk', methods=['POST', 'PATCH', 'PUT'])
+@api_roles_required(*RECURSOS['products'][4])
+def bulk_products():
+    """Crea (POST), actualiza (PATCH) o hace upsert (PUT) de productos en lote"""
+    return _bulk_recurso('products')
+
+
+@api_bp.route('/clients/bulk', methods=['POST', 'PATCH', 'PUT'])
+@api_roles_required(*RECURSOS['clients'][4])
+def bulk_clients():
+    """Crea (POST), actualiza (PATCH) o hace upsert (PUT) de clientes en lote"""
+    return _bulk_recurso('clients')
+
+
+@api_bp.route('/suppliers/bulk', methods=['POST', 'PATCH', 'PUT'])
+@api_roles_required(*RECURSOS['suppliers'][4])
+def bulk_suppliers():
+    """Crea (POST), actualiza (PATCH) o hace upsert (PUT) de proveedores en lote"""
+    return _bulk_recurso('suppliers')
+
+
+@api_bp.route('/stock/bulk', methods=['POST'])
+@api_roles_required('Administrador')
+def bulk_stock():
+    """Fija o ajusta el stock de muchos productos en una sola transacción"""
+    filas, parcial, error = _leer_lote()
+    if error:
+        return jsonify({'success': False, 'error': error}), 400
+
+    try:
+        return _respuesta_lote(ajustar_stock_masivo(filas, parcial=parcial))
+    except ValueError as e:
+        return jsonify({'success': False, 'error': str(e)}), 409
+    except SQLAlchemyError as e:
+        current_app.logger.error(f'Error de BD en ajuste masivo de stock: {str(e)}')
+        return jsonify({'success': False, 'error': 'Error de base de datos, el lote no fue aplicado'}), 500
+
+
+@api_bp.route('/stock/transfer', methods=['POST'])
+@api_roles_required('Administrador')
+def transfer_stock():
+    """
+    Mueve unidades entre tiendas en una sola transacción. Cuerpo:
+    {'origen': id o null, 'destino': id o null, 'rows': [{'id_producto', 'cantidad'}]};
+    null es la bodega central
+    """
+    filas, _, error = _leer_lote()
+    if error:
+        return jsonify({'success': False, 'error': error}), 400
+    cuerpo = request.get_json()
+    origen, destino = cuerpo.get('origen'), cuerpo.get('destino')
+    if any(t is not None and (not isinstance(t, int) or isinstance(t, bool)) for t in (origen, destino)):
+        return jsonify({'success': False, 'error': "'origen' y 'destino' deben ser ids de tienda o null"}), 400
+    if origen == destino:
+        return jsonify({'success': False, 'error': 'El origen y el destino deben ser distintos'}), 400
+
+    try:
+        return _respuesta_lote(transferir_lote(origen, destino, filas))
+    except ValueError as e:
+        return jsonify({'success': False, 'error': str(e)}), 409
+    except SQLAlchemyError as e:
+        current_app.logger.error(f'Error de BD en transferencia de stock: {str(e)}')
+        return jsonify({'success': False, 'error': 'Error de base de datos, la transferencia no fue aplicada'}), 500
+
+
+@api_bp.route('/products/availability', methods=['GET'])
+@api_roles_required('Administrador', 'Vendedor')
+def product_availability():
+    """
+    Stock, unidades reservadas y disponibles (stock - reservado) de los productos
+    ?ids=1,2,3; con ?tienda_id=N agrega las unidades ubicadas en esa tienda
+    """
+    try:
+        ids = {int(i) for i in request.args.get('ids', '').split(',') if i.strip()}
+    except ValueError:
+        return jsonify({'success': False, 'error': "'ids' debe ser una lista de enteros separados por coma"}), 400
+    if not ids or len(ids) > IN_CHUNK_SIZE:
+        return jsonify({'success': False, 'error': f'Indique entre 1 y {IN_CHUNK_SIZE} ids'}), 400
+
+    tienda_id = request.args.get('tienda_id', type=int)
+    de_tienda = stock_tienda(tienda_id, ids) if tienda_id is not None else None
+    datos = []
+    for p, (stock, reservado) in sorted(disponibilidad(ids).items()):
+        fila = {'id_producto': p, 'stock': stock, 'reservado': reservado, 'disponible': stock - reservado}
+        if de_tienda is not None:
+            fila['en_tienda'] = de_tienda.get(p, 0)
+        datos.append(fila)
+    return jsonify({'success': True, 'data': datos})
+
+
+@api_bp.route('/clients/lookup', methods=['GET'])
+@api_roles_required('Administrador', 'Vendedor')
+def lookup_clients():
+    """Busca clientes activos por prefijo de nombre o teléfono (selector de clientes)"""
+    texto = request.args.get('q', '').strip()
+    if len(texto) < 2:
+        return jsonify({'success': True, 'data': []})
+
+    limite = min(request.args.get('limit', current_app.config.get('CLIENT_LOOKUP_LIMIT', 20), type=int), 50)
+    clientes = Client.buscar(texto).filter(Client.activo == True) \
+        .with_entities(Client.id_cliente, Client.nombre, Client.telefono) \
+        .order_by(Client.nombre_normalizado, Client.id_cliente).limit(limite)
+    return jsonify({'success': True, 'data': [
+        {'id': id_cliente, 'nombre': nombre, 'telefono': telefono} for id_cliente, nombre, telefono in clientes
+    ]})
+
+
+@api_bp.route('/client-orders/<int:order_id>/lines', methods=['POST', 'PUT'])
+@api_roles_required('Administrador', 'Vendedor')
+def upsert_client_order_lines(order_id):
+    """Agrega (POST, suma cantidades) o fija (PUT) líneas de una orden y devuelve sus totales"""
+    orden = db.session.get(ClientOrder, order_id)
+    if orden is None:
+        return jsonify({'success': False, 'error': 'Orden no encontrada'}), 404
+
+    filas, parcial, error = _leer_lote()
+    if error:
+        return jsonify({'success': False, 'error': error}), 400
+
+    try:
+        resultado = upsert_lineas(orden, filas, reemplazar=(request.method == 'PUT'), parcial=parcial)
+    except ValueError as e:
+        return jsonify({'success': False, 'error': str(e)}), 409
+    except SQLAlchemyError as e:
+        current_app.logger.error(f'Error de BD al escribir líneas de la orden {order_id}: {str(e)}')
+        return jsonify({'success': False, 'error': 'Error de base de datos, el lote no fue aplicado'}), 500
+
+    exito = not resultado['errores']
+    return jsonify({'success': exito, 'data': resultado}), 200 if exito or resultado['escritas'] else 422
+
+
+@api_bp.route('/client-orders/fulfil', methods=['POST'])
+@api_roles_required('Administrador', 'Vendedor')
+def fulfil_client_orders():
+    """Convierte órdenes pendientes en ventas con sus facturas, en una sola transacción"""
+    cuerpo = request.get_json(silent=True)
+    ordenes = cuerpo.get('orders') if isinstance(cuerpo, dict) else None
+    if not isinstance(ordenes, list) or not ordenes or \
+            not all(isinstance(o, int) and not isinstance(o, bool) for o in ordenes):
+        return jsonify({'success': False, 'error': "El cuerpo debe incluir 'orders', una lista de ids"}), 400
+    maximo = current_app.config.get('API_BULK_MAX_ROWS', 10000)
+    if len(ordenes) > maximo:
+        return jsonify({'success': False, 'error': f'El lote excede el máximo de {maximo} órdenes'}), 400
+
+    # Las ventas se registran a nombre del empleado indicado o del usuario actual
+    empleado_id = cuerpo.get('empleado_id')
+    if empleado_id is not None and (not isinstance(empleado_id, int) or isinstance(empleado_id, bool)):
+        return jsonify({'success': False, 'error': "'empleado_id' debe ser un id de empleado"}), 400
+    if empleado_id is not None and current_user.rol.nombre == 'Administrador':
+        empleado = db.session.get(Staff, empleado_id)
+    else:
+        empleado = Staff.query.filter_by(usuario_id=current_user.id_usuario).first()
+    if not empleado or not empleado.activo or not empleado.tienda_id:
+        return jsonify({'success': False, 'error': 'No hay un empleado activo con tienda para registrar las ventas'}), 409
+
+    try:
+        # En modo por tienda las ventas van a la BD de la tienda del empleado
+        with en_tienda(empleado.tienda_id):
+            resultado = cumplir_ordenes(ordenes, empleado)
+    except ValueError as e:
+        return jsonify({'success': False, 'error': str(e)}), 409
+    except SQLAlchemyError as e:
+        current_app.logger.error(f'Error de BD al cumplir órdenes: {str(e)}')
+        return jsonify({'success': False, 'error': 'Error de base de datos, no se cumplió ninguna orden'}), 500
+
+    exito = not resultado['rechazadas']
+    return jsonify({'success': exito, 'data': resultado}), 200 if exito or resultado['cumplidas'] else 422
+
+
+@api_bp.route('/suppliers/performance', methods=['GET'])
+@api_roles_required('Administrador')
+@solo_lectura
+def supplier_performance():
+    """Lead time, tasa de cumplimiento y volumen por proveedor, leídos solo del rollup"""
+    filas = db.session.query(SupplierPerformance, Supplier.nombre) \
+        .join(Supplier, Supplier.id_proveedor == SupplierPerformance.proveedor_id) \
+        .order_by(Supplier.nombre).all()
+    return jsonify({'success': True, 'data': [{
+        'proveedor_id': r.proveedor_id,
+        'proveedor': nombre,
+        'ordenes': r.ordenes,
+        'recibidas': r.recibidas,
+        'canceladas': r.canceladas,
+        'pendientes': r.pendientes,
+        'tasa_cumplimiento': round(r.tasa_cumplimiento, 4) if r.tasa_cumplimiento is not None else None,
+        'lead_time_promedio_horas': round(r.lead_time_promedio, 2) if r.lead_time_promedio is not None else None,
+        'lead_time_maximo_horas': round(r.lead_time_maximo, 2) if r.lead_time_maximo is not None else None,
+        'unidades_recibidas': r.unidades_recibidas,
+        'valor_recibido': float(r.valor_recibido),
+        'desde': r.desde.isoformat(),
+        'actualizado': r.actualizado.isoformat(),
+    } for r, nombre in filas]})
+
+
+def _leer_periodo():
+    """(desde, hasta, error) de ?desde=AAAA-MM-DD&hasta=AAAA-MM-DD; por defecto el mes en curso"""
+    hoy = datetime.utcnow().date()
+    try:
+        desde = date.fromisoformat(request.args['desde']) if request.args.get('desde') else hoy.replace(day=1)
+        hasta = date.fromisoformat(request.args['hasta']) if request.args.get('hasta') else hoy
+    except ValueError:
+        return None, None, "'desde' y 'hasta' deben tener el formato AAAA-MM-DD"
+    if desde > hasta:
+        return None, None, "'desde' no puede ser posterior a 'hasta'"
+    return desde, hasta, None
+
+
+@api_bp.route('/analytics/products/top', methods=['GET'])
+@api_roles_required('Administrador')
+@solo_lectura
+def top_products():
+    """
+    Productos más vendidos del periodo, leídos del agregado por día:
+    ?por=importe|unidades, ?limit=N, ?tienda_id=N y ?por_tienda=1 (ranking de cada tienda)
+    """
+    desde, hasta, error = _leer_periodo()
+    if error:
+        return jsonify({'success': False, 'error': error}), 400
+    criterio = request.args.get('por', 'importe')
+    if criterio not in ('importe', 'unidades'):
+        return jsonify({'success': False, 'error': "'por' debe ser 'importe' o 'unidades'"}), 400
+    limite = min(max(request.args.get('limit', 10, type=int), 1), 100)
+    por_tienda = request.args.get('por_tienda', '').lower() in ('1', 'true', 'si')
+
+    ranking = top_productos(desde, hasta, request.args.get('tienda_id', type=int), limite, criterio, por_tienda)
+    datos = {'desde': desde.isoformat(), 'hasta': hasta.isoformat(), 'por': criterio}
+    if por_tienda:
+        datos['tiendas'] = [{'tienda_id': t, 'productos': filas} for t, filas in sorted(ranking.items())]
+    else:
+        datos['productos'] = ranking
+    return jsonify({'success': True, 'data': datos})
+
+
+@api_bp.route('/analytics/categories/mix', methods=['GET'])
+@api_roles_required('Administrador')
+@solo_lectura
+def category_mix():
+    """Participación de cada categoría en el importe del periodo (?tienda_id=N), desde el agregado por día"""
+    desde, hasta, error = _leer_periodo()
+    if error:
+        return jsonify({'success': False, 'error': error}), 400
+    return jsonify({'success': True, 'data': {
+        'desde': desde.isoformat(),
+        'hasta': hasta.isoformat(),
+        'categorias': mezcla_categorias(desde, hasta, request.args.get('tienda_id', type=int)),
+    }})
+
+
+@api_bp.route('/analytics/products/abc', methods=['GET'])
+@api_roles_required('Administrador')
+@solo_lectura
+def product_abc():
+    """Clasificación ABC de los productos por importe del periodo (?tienda_id=N), desde el agregado por día"""
+    desde, hasta, error = _leer_periodo()
+    if error:
+        return jsonify({'success': False, 'error': error}), 400
+    return jsonify({'success': True, 'data': {
+        'desde': desde.isoformat(),
+        'hasta': hasta.isoformat(),
+        **clasificacion_abc(desde, hasta, request.args.get('tienda_id', type=int)),
+    }})
+
+
+@api_bp.route('/sellers/leaderboard', methods=['GET'])
+@api_roles_required('Administrador', 'Vendedor')
+@solo_lectura
+def seller_leaderboard():
+    """
+    Ranking de vendedores de un mes (?periodo=AAAA-MM, por defecto el actual),
+    leído solo de los totales mensuales: ?por=importe|ventas|unidades,
+    ?tienda_id=N y ?limit=N. Un vendedor solo ve su propia comisión.
+    """
+    try:
+        periodo = datetime.strptime(request.args['periodo'], '%Y-%m').date() if request.args.get('periodo') \
+            else datetime.utcnow().date().replace(day=1)
+    except ValueError:
+        return jsonify({'success': False, 'error': "'periodo' debe tener el formato AAAA-MM"}), 400
+    criterio = request.args.get('por', 'importe')
+    if criterio not in CRITERIOS:
+        return jsonify({'success': False, 'error': f"'por' debe ser uno de: {', '.join(CRITERIOS)}"}), 400
+    limite = min(max(request.args.get('limit', 20, type=int), 1), 100)
+
+    es_admin = current_user.rol.nombre == 'Administrador'
+    propio = current_user.empleado_asociado.id_empleado if current_user.empleado_asociado else None
+    tramos = current_app.config['COMMISSION_TIERS']
+    datos = []
+    for puesto, fila, nombre, tienda_id in ranking_vendedores(
+            periodo, request.args.get('tienda_id', type=int), limite, criterio):
+        registro = {
+            'puesto': puesto,
+            'empleado_id': fila.empleado_id,
+            'empleado': nombre,
+            'tienda_id': tienda_id,
+            'ventas': fila.ventas,
+            'unidades': fila.unidades,
+            'importe_centavos': fila.importe_centavos,
+            'ticket_promedio_centavos': fila.ticket_promedio,
+        }
+        if es_admin or fila.empleado_id == propio:
+            # Estimada con los tramos actuales; la fijada existe tras el cierre del periodo
+            registro['comision_estimada_centavos'] = comision(fila.importe_centavos, tramos)
+            registro['comision_centavos'] = fila.comision_centavos
+            registro['comision_calculada'] = fila.comision_calculada.isoformat() if fila.comision_calculada else None
+        datos.append(registro)
+    return jsonify({'success': True, 'data': {'periodo': periodo.strftime('%Y-%m'), 'por': criterio,
+                                              'vendedores': datos}})
@@ -3,6 +3,7 @@ from flask_login import login_user, logout_user, current_user
 from app.models import User, Role
 from app.forms import LoginForm, RegisterForm, ChangePasswordForm, ProfileForm
 from app.utils.decorators import admin_required, login_required
+from app.services.reference_service import opciones
 from app import bcrypt, db
 from sqlalchemy.exc import SQLAlchemyError, IntegrityError
 
@@ -103,7 +104,7 @@ def register():
     form = RegisterForm()
     
     # Cargar opciones para el campo de rol
-    form.rol_id.choices = [(r.id_rol, r.nombre) for r in Role.query.all()]
+    form.rol_id.choices = opciones('roles')
     
     if form.validate_on_submit():
         try:
@@ -1,18 +1,23 @@
-from flask import Blueprint, render_template, redirect, url_for, flash, request
+from flask import Blueprint, render_template, redirect, url_for, flash, request, current_app
 from flask_login import login_required, current_user
 from datetime import datetime
 from app import db
 from sqlalchemy.exc import IntegrityError
-from app.models import Client, City, ClientOrder, ClientOrderProduct, Product
+from sqlalchemy.orm import joinedload
+from app.models import Client, City, ClientOrder, ClientOrderProduct, Product, ClientSummary, Sale, Staff
 from app.forms import ClienteForm, ClientOrderForm, ClientOrderProductForm, ConfirmDeleteForm, EmptyForm
 from app.utils.decorators import admin_required, seller_required
+from app.services.reference_service import opciones
+from app.services.client_order_service import upsert_lineas, totales_orden, cumplir_ordenes
+from app.services.reservation_service import reservar_orden, liberar_reservas
+from app.utils.formatters import normalizar_telefono
+from app.utils.helpers import PaginaPorClave
 
 clients_bp = Blueprint('clients', __name__)
 
 @clients_bp.route('/')
 @login_required
 def list_clients():
-    clients = Client.query.all()
     form = EmptyForm()
     try:
         # Solo administradores y vendedores pueden ver los clientes
@@ -21,13 +26,22 @@ def list_clients():
             return redirect(url_for('dashboard.dashboard'))
         
         mostrar_inactivos = request.args.get('mostrar_inactivos', 'false').lower() in ['1', 'true', 'yes']
+        busqueda = request.args.get('q', '').strip()
         
-        if mostrar_inactivos and current_user.rol.nombre == 'Administrador' or current_user.rol.nombre == 'Vendedor':
-            clients = Client.get_todos().all()
-        else:
-            clients = Client.get_activos().all()
+        query = Client.buscar(busqueda) if busqueda else Client.query
+        if not (mostrar_inactivos and current_user.rol.nombre == 'Administrador' or current_user.rol.nombre == 'Vendedor'):
+            query = query.filter(Client.activo == True)
+        
+        pagination = query.options(joinedload(Client.ciudad)) \
+            .order_by(Client.nombre_normalizado, Client.id_cliente) \
+            .paginate(
+                page=request.args.get('page', 1, type=int),
+                per_page=current_app.config.get('CLIENTS_PER_PAGE', 50),
+                error_out=False
+            )
         
-        return render_template('clients/list.html', clients=clients, mostrar_inactivos=mostrar_inactivos, form=form)
+        return render_template('clients/list.html', clients=pagination.items, pagination=pagination,
+                               busqueda=busqueda, mostrar_inactivos=mostrar_inactivos, form=form)
     except Exception as e:
         flash(f'Error al cargar clientes: {str(e)}', 'danger')
         return redirect(url_for('dashboard.dashboard'))
@@ -37,11 +51,11 @@ def list_clients():
 @seller_required
 def create_client():
     form = ClienteForm()
-    form.ciudad_id.choices = [(c.id_ciudad, c.nombre) for c in City.query.order_by(City.nombre).all()]
+    form.ciudad_id.choices = opciones('ciudades')
     
     if form.validate_on_submit():
         try:
-            if Client.query.filter_by(telefono=form.telefono.data).first():
+            if Client.query.filter_by(telefono_normalizado=normalizar_telefono(form.telefono.data)).first():
                 flash('El teléfono ya está registrado', 'danger')
                 return redirect(url_for('clients.create_client'))
             
@@ -79,7 +93,7 @@ def create_client():
 def edit_client(client_id):
     client = Client.query.get_or_404(client_id)
     form = ClienteForm(object=client)
-    form.ciudad_id.choices = [(c.id_ciudad, c.nombre) for c in City.query.order_by(City.nombre).all()]
+    form.ciudad_id.choices = opciones('ciudades')
     
     if form.validate_on_submit():
         try:
@@ -154,8 +168,15 @@ def activate_client(client_id):
 def view_client(client_id):
     client = Client.query.get_or_404(client_id)
     form = EmptyForm()
-    # Aquí luego agregaremos el historial de compras
-    return render_template('clients/detail.html', client=client, form=form)
+    # Totales desde una sola fila; el historial se pagina en lugar de recorrer client.ventas
+    resumen = db.session.get(ClientSummary, client_id)
+    page = request.args.get('page', 1, type=int)
+    historial = (Sale.query.options(joinedload(Sale.tienda))
+                 .filter(Sale.cliente_id == client_id)
+                 .order_by(Sale.fecha.desc(), Sale.id_venta.desc())
+                 .paginate(page=page, per_page=current_app.config['CLIENT_HISTORY_PER_PAGE'], error_out=False))
+    return render_template('clients/detail.html', client=client, form=form,
+                           resumen=resumen, ventas=historial.items, pagination=historial)
 
 ################################################################
 #                                                              #
@@ -174,38 +195,52 @@ def list_client_orders(client_id):
         flash('No tienes permisos para acceder a esta página', 'danger')
         return redirect(url_for('dashboard.dashboard'))
 
-    # Base query: todas las órdenes del cliente
-    query = ClientOrder.query.filter_by(cliente_id=client_id)
+    # Base query: órdenes del cliente (índice cliente_id, estado, fecha)
+    query = ClientOrder.query.filter(ClientOrder.cliente_id == client_id)
 
     # --- Filtros desde request.args ---
     estado = request.args.get('estado', type=str)
-    mostrar_completadas = request.args.get('mostrar_completadas', '1') == '1'
-    mostrar_canceladas = request.args.get('mostrar_canceladas', '1') == '1'
-    orden_id = request.args.get('orden_id', type=str)
-
-    # Filtro por estado específico
-    if estado and estado in ['pendiente', 'completada', 'cancelada']:
+    # Sin envío del formulario ambas casillas están marcadas; al enviarlo cuenta su presencia
+    formulario_enviado = 'estado' in request.args
+    mostrar_completadas = request.args.get('mostrar_completadas') == '1' or not formulario_enviado
+    mostrar_canceladas = request.args.get('mostrar_canceladas') == '1' or not formulario_enviado
+    orden_id = request.args.get('orden_id', '', type=str).strip()
+
+    # Estado: igualdad cuando se elige uno, lista cerrada cuando se ocultan algunos
+    if estado in ClientOrder.ESTADOS:
         query = query.filter(ClientOrder.estado == estado)
+    else:
+        estados = [e for e in ClientOrder.ESTADOS
+                   if (e != 'completada' or mostrar_completadas) and (e != 'cancelada' or mostrar_canceladas)]
+        if len(estados) < len(ClientOrder.ESTADOS):
+            query = query.filter(ClientOrder.estado.in_(estados))
 
-    # Filtro por ID de orden
+    # ID exacto ('125') o rango ('100-200') sobre la clave primaria
     if orden_id:
-        query = query.filter(ClientOrder.id_orden_cliente.like(f"%{orden_id}%"))
-
-    # Ocultar completadas si el usuario lo pide
-    if not mostrar_completadas:
-        query = query.filter(ClientOrder.estado != 'completada')
-
-    # Ocultar canceladas si el usuario lo pide
-    if not mostrar_canceladas:
-        query = query.filter(ClientOrder.estado != 'cancelada')
+        desde, separador, hasta = orden_id.partition('-')
+        try:
+            desde = int(desde) if desde.strip() else None
+            hasta = int(hasta) if hasta.strip() else None
+        except ValueError:
+            flash('El ID de orden debe ser un número o un rango (ej. 100-200)', 'warning')
+        else:
+            if not separador:
+                query = query.filter(ClientOrder.id_orden_cliente == desde)
+            else:
+                if desde is not None:
+                    query = query.filter(ClientOrder.id_orden_cliente >= desde)
+                if hasta is not None:
+                    query = query.filter(ClientOrder.id_orden_cliente <= hasta)
 
-    # Ejecutar query final
-    ordenes = query.order_by(ClientOrder.id_orden_cliente.desc()).all()
+    # Paginación por clave: más recientes primero, sin OFFSET
+    pagina = PaginaPorClave(query, ClientOrder.fecha, ClientOrder.id_orden_cliente,
+                            request.args.get('cursor'), current_app.config['CLIENT_ORDERS_PER_PAGE'])
 
     return render_template(
         'clients/order/orders.html',
         cliente=cliente,
-        ordenes=ordenes,
+        ordenes=pagina.items,
+        pagina=pagina,
         form=form,
         # Pasamos los filtros a la vista para mantener estado
         filtros={
@@ -263,10 +298,27 @@ def edit_client_order(order_id):
     form = ClientOrderForm(obj=orden)
 
     if form.validate_on_submit():
+        # Aquí solo se puede cancelar una orden pendiente: se completa al
+        # cumplirla, y una vez convertida en venta su estado ya no cambia
+        if form.estado.data != orden.estado and (orden.venta_id is not None or
+                                                 (orden.estado, form.estado.data) != ('pendiente', 'cancelada')):
+            flash(f'No se puede pasar una orden {orden.estado} a {form.estado.data}', 'danger')
+            return render_template("clients/order/edit_order.html", orden=orden, form=form)
+
         orden.descripcion = form.descripcion.data
         orden.fecha = form.fecha.data
         orden.estado = form.estado.data
-        db.session.commit()
+        try:
+            # Solo las órdenes pendientes apartan stock
+            if orden.estado == 'pendiente':
+                reservar_orden(orden.id_orden_cliente)
+            else:
+                liberar_reservas([orden.id_orden_cliente])
+            db.session.commit()
+        except ValueError as e:
+            db.session.rollback()
+            flash(str(e), 'danger')
+            return render_template("clients/order/edit_order.html", orden=orden, form=form)
         flash("Orden actualizada correctamente", "success")
         return redirect(url_for('clients.view_client_order', order_id=orden.id_orden_cliente))
 
@@ -277,60 +329,74 @@ def edit_client_order(order_id):
 @login_required
 def delete_client_order(order_id):
     orden = ClientOrder.query.get_or_404(order_id)
+    liberar_reservas([orden.id_orden_cliente])
     db.session.delete(orden)
     db.session.commit()
     flash("Orden eliminada correctamente", "success")
     return redirect(url_for('clients.list_client_orders', client_id=orden.cliente_id))
 
+# Convertir una orden pendiente en venta
+@clients_bp.route('/orders/<int:order_id>/fulfil', methods=['POST'])
+@login_required
+@seller_required
+def fulfil_client_order(order_id):
+    orden = ClientOrder.query.get_or_404(order_id)
+    empleado = Staff.query.filter_by(usuario_id=current_user.id_usuario).first()
+    if not empleado or not empleado.tienda_id:
+        flash('No se encontró el vendedor asociado', 'danger')
+        return redirect(url_for('clients.view_client_order', order_id=order_id))
+
+    try:
+        resultado = cumplir_ordenes([orden.id_orden_cliente], empleado)
+    except ValueError as e:
+        flash(str(e), 'danger')
+        return redirect(url_for('clients.view_client_order', order_id=order_id))
+    except Exception as e:
+        db.session.rollback()
+        flash(f'Error al convertir la orden en venta: {str(e)}', 'danger')
+        return redirect(url_for('clients.view_client_order', order_id=order_id))
+
+    if resultado['rechazadas']:
+        flash(resultado['rechazadas'][0]['motivo'], 'danger')
+        return redirect(url_for('clients.view_client_order', order_id=order_id))
+
+    flash('Orden convertida en venta exitosamente', 'success')
+    return redirect(url_for('sales.view_sale', sale_id=resultado['cumplidas'][0]['venta']))
+
 # Agregar productos a una orden existente
 @clients_bp.route('/orders/<int:order_id>/add_product', methods=['GET', 'POST'])
 @login_required
 def add_product_to_order(order_id):
     orden = ClientOrder.query.get_or_404(order_id)
     form = ClientOrderProductForm()
-    form.id_producto.choices = [(p.id_producto, p.nombre) for p in Product.query.all()]
+    form.id_producto.choices = [tuple(p) for p in Product.get_activos()
+                                .with_entities(Product.id_producto, Product.nombre).order_by(Product.nombre)]
 
     if form.validate_on_submit():
-        producto = Product.query.get(form.id_producto.data)
-        cantidad = form.cantidad.data
-        print ("formulario válido:", form.id_producto.data, form.cantidad.data)
-
-        if not producto:
-            flash('Producto no encontrado', 'danger')
-        elif producto.stock < cantidad:
-            flash('Stock insuficiente', 'danger')
-        else:
-            # Verificar si el producto ya está en la orden
-            orden_producto = ClientOrderProduct.query.filter_by(
-                id_orden_cliente=orden.id_orden_cliente,
-                id_producto=producto.id_producto
-            ).first()
-
-            if orden_producto:
-                # Ya existe → sumamos la cantidad
-                orden_producto.cantidad += cantidad
-                flash(f'Se actualizó {producto.nombre} con {cantidad} más', 'info')
+        try:
+            # Suma la cantidad si el producto ya está en la orden (INSERT ... ON CONFLICT)
+            resultado = upsert_lineas(orden, [{'id_producto': form.id_producto.data,
+                                               'cantidad': form.cantidad.data}])
+            if resultado['errores']:
+                for mensaje in resultado['errores'][0]['errores'].values():
+                    flash(mensaje, 'danger')
             else:
-                # Nuevo registro
-                orden_producto = ClientOrderProduct(
-                    id_orden_cliente=orden.id_orden_cliente,
-                    id_producto=producto.id_producto,
-                    cantidad=cantidad
-                )
-                db.session.add(orden_producto)
-                flash(f'{producto.nombre} agregado a la orden', 'success')
-
-            db.session.commit()
+                flash('Producto agregado a la orden', 'success')
+        except ValueError as e:
+            flash(str(e), 'danger')
+        except Exception as e:
+            db.session.rollback()
+            flash(f'Error al agregar el producto: {str(e)}', 'danger')
 
         return redirect(url_for('clients.add_product_to_order', order_id=orden.id_orden_cliente))
 
-    else:
-        print("Errores:", form.errors)
-    productos_en_orden = ClientOrderProduct.query.filter_by(id_orden_cliente=orden.id_orden_cliente).all()
+    productos_en_orden = ClientOrderProduct.query.options(joinedload(ClientOrderProduct.producto)) \
+        .filter_by(id_orden_cliente=orden.id_orden_cliente).all()
 
     return render_template(
         'clients/order/add_product.html',
         form=form,
         orden=orden,
-        productos=productos_en_orden
+        productos=productos_en_orden,
+        totales=totales_orden(orden.id_orden_cliente)
     )
\ No newline at end of file
@@ -1,7 +1,10 @@
 from flask import Blueprint, render_template, jsonify, request, flash, current_app
 from app.models import Product, Sale, Client, Staff, Store, Supplier, User, SupplierOrder
 from app.forms import DateRangeForm, SalesFilterForm, QuickStatsForm
-from app.utils.decorators import login_required, roles_required, current_user
+from app.utils.decorators import login_required, roles_required, current_user, solo_lectura
+from app.services.sale_service import contar_ventas, ventas_recientes
+from app.utils.helpers import dia
+from app.utils.formatters import formatear_centavos
 from app import db
 from datetime import datetime, timedelta
 from sqlalchemy.exc import SQLAlchemyError
@@ -12,6 +15,7 @@ dashboard_bp = Blueprint('dashboard', __name__)
 @dashboard_bp.route('/dashboard/')
 @login_required
 @roles_required('Administrador', 'Vendedor', 'Proveedor')
+@solo_lectura
 def dashboard():
     """Panel de control principal con estadísticas adaptadas al rol del usuario"""
     try:
@@ -24,15 +28,15 @@ def dashboard():
         # Estadísticas básicas para todos los roles
         stats = {
             'total_products': Product.get_activos().count(),
-            'total_sales_today': Sale.query.filter(Sale.fecha >= today_start).count(),
+            'total_sales_today': contar_ventas(today_start)[0],
             'total_clients': Client.get_activos().count(),
             'store_sales_today': 0,
             'store_recent_sales': [], 
             'total_stores': Store.query.count(),
             'total_staff': Staff.query.count(),
             'total_suppliers': Supplier.query.count(),
-            'low_stock_products': Product.query.filter(Product.stock <= 5, Product.activo == 1).all(),
-            'recent_sales': Sale.query.order_by(Sale.fecha.desc()).limit(5).all()
+            'low_stock_products': Product.query.filter(Product.stock <= 5, Product.activo == True).all(),
+            'recent_sales': ventas_recientes(5)
         }
 
         # Estadísticas específicas según el rol
@@ -42,7 +46,7 @@ def dashboard():
                     'total_stores': Store.get_activas().count(),
                     'total_staff': Staff.get_activos().count(),
                     'total_suppliers': Supplier.get_activos().count(),
-                    'recent_sales': Sale.query.order_by(Sale.fecha.desc()).limit(10).all(),
+                    'recent_sales': ventas_recientes(10),
                     'low_stock_products': Product.query.filter(Product.stock <= threshold).limit(5).all()
                 })
             
@@ -96,6 +100,7 @@ def dashboard():
 
 @dashboard_bp.route('/sales-data', methods=['GET', 'POST'])
 @login_required
+@solo_lectura
 def sales_data():
     """Endpoint de API para datos de ventas (para gráficos)"""
     form = SalesFilterForm()
@@ -167,14 +172,15 @@ def sales_data():
             })
         
         # Agrupar por día y calcular totales
+        fecha_dia = dia(Sale.fecha)
         sales_data = query.with_entities(
-            db.func.date(Sale.fecha_venta).label('date'),
+            fecha_dia.label('date'),
             db.func.count(Sale.id_venta).label('sales_count'),
-            db.func.sum(Sale.total).label('sales_total')
+            db.func.sum(Sale.total_centavos).label('sales_total')
         ).group_by(
-            db.func.date(Sale.fecha_venta)
+            fecha_dia
         ).order_by(
-            db.func.date(Sale.fecha_venta)
+            fecha_dia
         ).all()
         
         # Formatear datos para el gráfico
@@ -183,9 +189,9 @@ def sales_data():
         sales_total = []
         
         for data in sales_data:
-            dates.append(data.date.strftime('%Y-%m-%d'))
+            dates.append(data.date)
             sales_count.append(data.sales_count)
-            sales_total.append(float(data.sales_total) if data.sales_total else 0)
+            sales_total.append((data.sales_total or 0) / 100)  # centavos -> unidades para el gráfico
         
         return jsonify({
             'success': True,
@@ -220,6 +226,7 @@ def sales_data():
 
 @dashboard_bp.route('/quick-stats', methods=['GET', 'POST'])
 @login_required
+@solo_lectura
 def quick_stats():
     """Endpoint de API para estadísticas rápidas"""
     form = QuickStatsForm()
@@ -230,18 +237,13 @@ def quick_stats():
             
             # Estadísticas para administradores
             if current_user.rol.nombre == 'Administrador':
+                ventas_hoy, ingresos_hoy = contar_ventas(datetime.utcnow().date())
                 stats = {
                     'total_users': User.query.filter_by(activo=True).count(),
                     'total_stores': Store.get_activas().count(),
                     'total_products': Product.get_activos().count(),
-                    'today_sales': Sale.query.filter(
-                        Sale.fecha >= datetime.utcnow().date()
-                    ).count(),
-                    'today_revenue': db.session.query(
-                        db.func.sum(Sale.total)
-                    ).filter(
-                        Sale.fecha >= datetime.utcnow().date()
-                    ).scalar() or 0
+                    'today_sales': ventas_hoy,
+                    'today_revenue': formatear_centavos(ingresos_hoy)
                 }
             
             # Estadísticas para vendedores
@@ -251,12 +253,12 @@ def quick_stats():
                         Sale.tienda_id == current_user.empleado_asociado.tienda.id_tienda,
                         Sale.fecha >= datetime.utcnow().date()
                     ).count(),
-                    'store_revenue_today': db.session.query(
-                        db.func.sum(Sale.total)
+                    'store_revenue_today': formatear_centavos(db.session.query(
+                        db.func.sum(Sale.total_centavos)
                     ).filter(
                         Sale.tienda_id == current_user.empleado_asociado.tienda.id_tienda,
                         Sale.fecha >= datetime.utcnow().date()
-                    ).scalar() or 0,
+                    ).scalar()),
                     'store_clients': Client.query.filter(
                         Client.tienda_id == current_user.empleado_asociado.tienda.id_tienda
                     ).count()
@@ -310,6 +312,7 @@ def quick_stats():
 
 @dashboard_bp.route('/recent-activity', methods=['GET', 'POST'])
 @login_required
+@solo_lectura
 def recent_activity():
     """Endpoint de API para actividad reciente"""
     form = DateRangeForm()
@@ -344,7 +347,7 @@ def recent_activity():
             for sale in recent_sales:
                 activities.append({
                     'type': 'sale',
-                    'description': f'Venta #{sale.id_venta} por ${sale.total}',
+                    'description': f'Venta #{sale.id_venta} por ${formatear_centavos(sale.total_centavos)}',
                     'timestamp': sale.fecha,
                     'icon': 'shopping-cart'
                 })
@@ -363,7 +366,7 @@ def recent_activity():
             for sale in recent_sales:
                 activities.append({
                     'type': 'sale',
-                    'description': f'Venta #{sale.id_venta} por ${sale.total}',
+                    'description': f'Venta #{sale.id_venta} por ${formatear_centavos(sale.total_centavos)}',
                     'timestamp': sale.fecha,
                     'icon': 'shopping-cart'
                 })
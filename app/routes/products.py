@@ -1,48 +1,59 @@
-from flask import Blueprint, render_template, redirect, url_for, flash, request, jsonify
+from flask import Blueprint, render_template, redirect, url_for, flash, request, jsonify, current_app
 from flask_login import login_required, current_user
 from app import db
-from app.models import Product, Supplier
-from sqlalchemy import distinct
+from app.models import Product, Supplier, Category
 from sqlalchemy.exc import IntegrityError
-from app.forms import ProductForm, StockForm, ConfirmDeleteForm, EmptyForm
+from sqlalchemy.orm import joinedload, contains_eager
+from app.forms import ProductForm, StockForm, ConfirmDeleteForm, EmptyForm, ProductImportForm
 from app.utils.decorators import admin_required, seller_required
+from app.services.import_service import importar_productos_csv
+from app.services.catalog_service import categorias_producto, id_categoria
+from app.services.reference_service import opciones
 from datetime import datetime
+import io
 
 products_bp = Blueprint('products', __name__)
 
+# Criterio de orden -> columnas del ORDER BY (el id desempata para una paginación estable)
+ORDENES_PRODUCTO = {
+    'nombre': (Product.nombre, Product.id_producto),
+    'categoria': (Category.nombre, Product.nombre, Product.id_producto),
+    'precio': (Product.precio, Product.id_producto),
+    'stock': (Product.stock, Product.id_producto),
+    'reciente': (Product.id_producto.desc(),),
+}
+
 @products_bp.route('/')
 @login_required
 def list_products():
-    products = Product.query.all()
     # Solo administradores y vendedores pueden ver los productos
     if current_user.rol.nombre not in ['Administrador', 'Vendedor']:
         flash('No tienes permisos para acceder a esta página', 'danger')
         return redirect(url_for('dashboard.dashboard'))
     
-    categorias = [row[0] for row in db.session.query(distinct(Product.categoria)).all() if row[0]]
-    proveedores = Supplier.query.filter_by(activo=True).all()
-    
-    # Verificar si se deben mostrar productos inactivos (solo para administradores)
-    try:    
-        mostrar_inactivos = request.args.get('mostrar_inactivos', 'false').lower() in ['1', 'true', 'yes']
+    try:
+        categorias = categorias_producto()
+        proveedores = opciones('proveedores', activos=True)
         
-        if mostrar_inactivos:
-            products = Product.query.all()
-        else:
-            products = Product.query.filter_by(activo=True).all()
+        # Verificar si se deben mostrar productos inactivos (solo para administradores)
+        mostrar_inactivos = request.args.get('mostrar_inactivos', 'false').lower() in ['1', 'true', 'yes']
             
         # Filtros
-        categoria = request.args.get('categoria', '').strip()
+        categoria_id = request.args.get('categoria', type=int)
         disponibilidad = request.args.get('disponibilidad', '').strip()
         proveedor_id = request.args.get('proveedor', '').strip()
+        orden = request.args.get('orden', 'nombre')
+        if orden not in ORDENES_PRODUCTO:
+            orden = 'nombre'
         
-        query = Product.query
+        query = Product.query.join(Product.categoria) \
+            .options(contains_eager(Product.categoria), joinedload(Product.proveedor))
         
         if not (mostrar_inactivos and current_user.rol.nombre == 'Administrador'):
             query = query.filter(Product.activo == True)
             
-        if categoria:
-            query = query.filter(Product.categoria.ilike(f"%{categoria}%"))
+        if categoria_id:
+            query = query.filter(Product.categoria_id == categoria_id)
             
         if disponibilidad == 'disponible':
             query = query.filter(Product.stock > 0)      
@@ -52,15 +63,21 @@ def list_products():
         if proveedor_id:
             query = query.filter(Product.proveedor_id == int(proveedor_id))
         
-        products = query.all()
+        pagination = query.order_by(*ORDENES_PRODUCTO[orden]).paginate(
+            page=request.args.get('page', 1, type=int),
+            per_page=current_app.config.get('PRODUCTS_PER_PAGE', 50),
+            error_out=False
+        )
         form = EmptyForm()
         
         return render_template(
             'products/list.html',                  
-            products=products, 
+            products=pagination.items, 
+            pagination=pagination,
             mostrar_inactivos=mostrar_inactivos,
             proveedores=proveedores,
             categorias=categorias,
+            orden=orden,
             form=form
             )
     except Exception as e:
@@ -72,14 +89,14 @@ def list_products():
 @admin_required
 def create_product():
     form = ProductForm()
-    form.proveedor_id.choices = [(p.id_proveedor, p.nombre) for p in Supplier.query.order_by(Supplier.nombre).all()]
+    form.proveedor_id.choices = opciones('proveedores')
     
     # if not nombre or not precio or not proveedor_id:
     if form.validate_on_submit():
         try:
             nuevo_producto = Product(
                 nombre = form.nombre.data.strip(),
-                categoria = form.categoria.data,
+                categoria_id = id_categoria(form.categoria.data),
                 descripcion = form.descripcion.data,
                 precio = form.precio.data,
                 stock = form.stock.data,
@@ -107,6 +124,29 @@ def create_product():
         
     return render_template('products/create.html', form=form)
 
+@products_bp.route('/import', methods=['GET', 'POST'])
+@login_required
+@admin_required
+def import_products():
+    form = ProductImportForm()
+    resumen = None
+    
+    if form.validate_on_submit():
+        try:
+            archivo = io.TextIOWrapper(form.archivo.data.stream, encoding='utf-8-sig', newline='')
+            resumen = importar_productos_csv(archivo, max_errores=100)
+            
+            flash(f"Importación finalizada: {resumen['creadas']} creados, "
+                  f"{resumen['actualizadas']} actualizados, {resumen['con_error']} con error",
+                  'success' if not resumen['con_error'] else 'warning')
+        except (ValueError, UnicodeDecodeError) as e:
+            flash(f'Error en el archivo: {str(e)}', 'danger')
+        except Exception as e:
+            db.session.rollback()
+            flash(f'Error al importar productos: {str(e)}', 'danger')
+    
+    return render_template('products/import.html', form=form, resumen=resumen)
+
 @products_bp.route('/<int:product_id>')
 @login_required
 def view_product(product_id):
@@ -125,20 +165,21 @@ def edit_product(product_id):
     product = Product.query.get_or_404(product_id)
     form = ProductForm(obj=product)
     
-    form.proveedor_id.choices = [(p.id_proveedor, p.nombre) for p in Supplier.query.order_by(Supplier.nombre).all()]
-    
-    categorias = [row[0] for row in db.session.query(distinct(Product.categoria)).all() if row[0]]
-    categoria = request.args.get('categoria', '').strip()
-    
-    query = Product.query
+    form.proveedor_id.choices = opciones('proveedores')
     
-    if categoria:
-        query = query.filter(Product.categoria.ilike(f"%{categoria}%"))
+    categorias = list(categorias_producto().values())
     
     if form.validate_on_submit():
         try:
+            # El catálogo solo ajusta la bodega central: lo ubicado en tiendas se mueve con
+            # transferencias, y lo reservado por órdenes pendientes debe seguir cubierto
+            if form.stock.data < product.stock_minimo:
+                raise ValueError(f'el stock no puede ser menor que las unidades en tiendas ({product.en_tiendas}) '
+                                 f'ni que las reservadas ({product.reservado})')
+            # Se resuelve antes de modificar el producto: crear la categoría confirma la sesión
+            categoria_id = id_categoria(form.categoria.data)
             product.nombre = form.nombre.data.strip()
-            product.categoria = form.categoria.data
+            product.categoria_id = categoria_id
             product.descripcion = form.descripcion.data
             product.precio = form.precio.data
             product.stock = form.stock.data
@@ -228,11 +269,11 @@ def update_stock(product_id):
 def api_inventory():
     # API para consultar inventario (útil para AJAX)
     try:
-        productos = Product.query.filter_by(activo=True).all()
+        productos = Product.query.options(joinedload(Product.categoria)).filter_by(activo=True).all()
         return jsonify([{
             'id': p.id_producto,
             'nombre': p.nombre,
-            'categoria': p.categoria,
+            'categoria': p.categoria.nombre,
             'stock': p.stock,
             'precio': float(p.precio),
             'activo': p.activo
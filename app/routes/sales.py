@@ -1,10 +1,14 @@
 from flask import Blueprint, render_template, redirect, url_for, flash, request, jsonify
 from flask_login import login_required, current_user
 from app import db
-from app.models import Sale, Invoice, SaleProduct, Client, Staff, Store, Product
+from app.models import Sale, Invoice, SaleProduct, Client, Staff, Store, Product, StoreInventory
 from app.forms import SaleForm, SaleProductForm, InvoiceForm
 from app.utils.decorators import seller_required
 from app.utils.security import sanitize_form_data
+from app.services.sale_service import registrar_compra, registrar_ventas_producto
+from app.services.seller_service import registrar_ventas_vendedor, periodo_de
+from app.services.inventory_service import stock_tienda, descontar_venta
+from app.utils.formatters import a_centavos
 from datetime import datetime
 from sqlalchemy.exc import IntegrityError
 import json
@@ -56,12 +60,23 @@ def list_sales():
 def create_sale():
     form = SaleForm()
 
-    # cargar clientes y productos
-    clientes = Client.get_activos().all()
-    productos = Product.get_activos().filter(Product.stock > 0).all()
+    empleado = Staff.query.filter_by(usuario_id=current_user.id_usuario).first()
+    if not empleado or not empleado.tienda_id:
+        flash('No se encontró el vendedor asociado o no tiene tienda asignada', 'danger')
+        return redirect(url_for('sales.list_sales'))
+
+    # Se vende lo que está en la tienda del vendedor y no está reservado por órdenes pendientes
+    productos = db.session.query(Product, StoreInventory.stock) \
+        .join(StoreInventory, StoreInventory.id_producto == Product.id_producto) \
+        .filter(StoreInventory.tienda_id == empleado.tienda_id, StoreInventory.stock > 0,
+                Product.activo == True, Product.stock > Product.reservado) \
+        .order_by(Product.nombre).all()
 
-    # asignar choices al campo del formulario
-    form.cliente_id.choices = [(c.id_cliente, c.nombre) for c in clientes]
+    # Los clientes se buscan desde la página (/api/v1/clients/lookup); como opción
+    # válida solo se carga el cliente enviado, si existe y está activo
+    cliente_enviado = request.form.get('cliente_id', type=int)
+    cliente = Client.get_activos().filter_by(id_cliente=cliente_enviado).first() if cliente_enviado else None
+    form.cliente_id.choices = [(cliente.id_cliente, cliente.nombre)] if cliente else []
 
     if form.validate_on_submit():
         try:
@@ -72,54 +87,61 @@ def create_sale():
                 flash('Debes seleccionar un cliente y al menos un producto', 'danger')
                 return redirect(url_for('sales.create_sale'))
 
-            empleado = Staff.query.filter_by(usuario_id=current_user.id_usuario).first()
-            if not empleado:
-                flash('No se encontró el vendedor asociado', 'danger')
-                return redirect(url_for('sales.create_sale'))
+            cantidades = {}
+            for item in productos_data:
+                producto_id = int(item.get('producto_id'))
+                cantidades[producto_id] = cantidades.get(producto_id, 0) + int(item.get('cantidad', 1))
+
+            en_tienda = stock_tienda(empleado.tienda_id, cantidades)
+            precios = {}
+            for producto_id, cantidad in cantidades.items():
+                producto = db.session.get(Product, producto_id)
+                if not producto:
+                    flash(f'Producto {producto_id} no encontrado', 'danger')
+                    return redirect(url_for('sales.create_sale'))
+
+                if min(producto.disponible, en_tienda.get(producto_id, 0)) < cantidad:
+                    flash(f'Stock insuficiente para {producto.nombre} en esta tienda', 'danger')
+                    return redirect(url_for('sales.create_sale'))
+                precios[producto_id] = a_centavos(producto.precio)
 
             nueva_venta = Sale(
                 cliente_id=cliente_id,
                 empleado_id=empleado.id_empleado,
                 tienda_id=empleado.tienda_id,
-                total=0
+                total_centavos=0
             )
             db.session.add(nueva_venta)
             db.session.flush()  # genera id_venta
 
             total_venta = 0
-            for item in productos_data:
-                producto_id = item.get('producto_id')
-                cantidad = int(item.get('cantidad', 1))
-
-                producto = Product.query.get(producto_id)
-                if not producto:
-                    db.session.rollback()
-                    flash(f'Producto {producto_id} no encontrado', 'danger')
-                    return redirect(url_for('sales.create_sale'))
-
-                if producto.stock < cantidad:
-                    db.session.rollback()
-                    flash(f'Stock insuficiente para {producto.nombre}', 'danger')
-                    return redirect(url_for('sales.create_sale'))
-
+            for producto_id, cantidad in cantidades.items():
                 venta_producto = SaleProduct(
                     id_venta=nueva_venta.id_venta,
                     id_producto=producto_id,
                     cantidad=cantidad,
-                    precio_unitario=producto.precio
+                    precio_unitario_centavos=precios[producto_id]
                 )
                 db.session.add(venta_producto)
-
-                producto.stock -= cantidad
                 total_venta += venta_producto.subtotal()
 
-            nueva_venta.total = total_venta
+            # Descuento atómico en la tienda y en el total del producto
+            descontar_venta(empleado.tienda_id, cantidades)
+            nueva_venta.total_centavos = total_venta
 
             factura = Invoice(
                 venta_id=nueva_venta.id_venta,
-                total=total_venta
+                total_centavos=total_venta
             )
             db.session.add(factura)
+            registrar_compra(cliente_id, total_venta, nueva_venta.fecha)
+            registrar_ventas_producto({
+                (nueva_venta.fecha.date(), empleado.tienda_id, producto_id): (1, cantidad, cantidad * precios[producto_id])
+                for producto_id, cantidad in cantidades.items()
+            })
+            registrar_ventas_vendedor({
+                (periodo_de(nueva_venta.fecha), empleado.id_empleado): (1, sum(cantidades.values()), total_venta)
+            })
 
             db.session.commit()
             flash('Venta y factura creadas exitosamente', 'success')
@@ -130,7 +152,7 @@ def create_sale():
     else:
         print('Errores de validación', form.errors)
 
-    return render_template('sales/create.html', form=form, clientes=clientes, productos=productos)
+    return render_template('sales/create.html', form=form, productos=productos)
 
 @sales_bp.route('/<int:sale_id>/add_product', methods=['GET', 'POST'])
 @login_required
@@ -138,36 +160,63 @@ def create_sale():
 def add_product_to_sale(sale_id):
     venta = Sale.query.get_or_404(sale_id)
     form = SaleProductForm()
+    form.id_venta.choices = [(venta.id_venta, f'Venta #{venta.id_venta}')]
 
-    if form.validate_on_submit():
-       
-        producto = Product.query.get(['id_producto'])
-        if not producto:
-            flash('Producto no encontrado', 'danger')
-            return redirect(url_for('sales.view_sale', sale_id=sale_id))
+    # Como en create_sale: lo que está en la tienda de la venta y no está reservado
+    productos = db.session.query(Product, StoreInventory.stock) \
+        .join(StoreInventory, StoreInventory.id_producto == Product.id_producto) \
+        .filter(StoreInventory.tienda_id == venta.tienda_id, StoreInventory.stock > 0,
+                Product.activo == True, Product.stock > Product.reservado) \
+        .order_by(Product.nombre).all()
+    form.id_producto.choices = [(p.id_producto, f'{p.nombre} ({min(p.disponible, stock)} disponibles)')
+                                for p, stock in productos]
 
-        if producto.stock < ['cantidad']:
-            flash(f'Stock insuficiente para {producto.nombre}', 'danger')
+    if form.validate_on_submit():
+        if not venta.activo:
+            flash('No se pueden agregar productos a una venta anulada', 'danger')
             return redirect(url_for('sales.view_sale', sale_id=sale_id))
 
-        subtotal = producto.precio * ['cantidad']
-
-        venta_producto = SaleProduct(
-            id_venta=venta.id_venta,
-            id_producto=producto.id_producto,
-            cantidad=['cantidad'],
-            subtotal=subtotal
-        )
-        db.session.add(venta_producto)
-
-        # Actualizamos stock y totales
-        producto.stock -= ['cantidad']
-        venta.total += subtotal
-        venta.factura.total = venta.total  # sincronizamos la factura
+        try:
+            producto = db.session.get(Product, form.id_producto.data)
+            cantidad = form.cantidad.data
+            en_tienda = stock_tienda(venta.tienda_id, [producto.id_producto])
+            if min(producto.disponible, en_tienda.get(producto.id_producto, 0)) < cantidad:
+                flash(f'Stock insuficiente para {producto.nombre} en esta tienda', 'danger')
+                return redirect(url_for('sales.add_product_to_sale', sale_id=sale_id))
+
+            # Si el producto ya está en la venta se suma a su línea, con el precio ya registrado
+            venta_producto = db.session.get(SaleProduct, (venta.id_venta, producto.id_producto))
+            nueva_linea = venta_producto is None
+            if nueva_linea:
+                venta_producto = SaleProduct(
+                    id_venta=venta.id_venta,
+                    id_producto=producto.id_producto,
+                    cantidad=0,
+                    precio_unitario_centavos=a_centavos(producto.precio)
+                )
+                db.session.add(venta_producto)
+            venta_producto.cantidad += cantidad
+            subtotal = cantidad * venta_producto.precio_unitario_centavos
+
+            # Descuento atómico en la tienda y en el total del producto; totales en centavos
+            descontar_venta(venta.tienda_id, {producto.id_producto: cantidad})
+            venta.total_centavos += subtotal
+            if venta.factura:
+                venta.factura.total_centavos = venta.total_centavos  # sincronizamos la factura
+            registrar_compra(venta.cliente_id, subtotal, venta.fecha, compras=0)
+            registrar_ventas_producto({(venta.fecha.date(), venta.tienda_id, producto.id_producto):
+                                       (int(nueva_linea), cantidad, subtotal)})
+            registrar_ventas_vendedor({(periodo_de(venta.fecha), venta.empleado_id): (0, cantidad, subtotal)})
 
-        db.session.commit()
-        flash('Producto agregado correctamente a la venta', 'success')
-        return redirect(url_for('sales.view_sale', sale_id=sale_id))
+            db.session.commit()
+            flash('Producto agregado correctamente a la venta', 'success')
+            return redirect(url_for('sales.view_sale', sale_id=sale_id))
+        except ValueError as e:
+            db.session.rollback()
+            flash(str(e), 'danger')
+        except Exception as e:
+            db.session.rollback()
+            flash(f'Error al agregar el producto: {str(e)}', 'danger')
 
     return render_template('sales/add_product.html', form=form, venta=venta)
 
@@ -197,7 +246,7 @@ def create_invoice(sale_id):
 
         nueva_factura = Invoice(
             venta_id=venta.id_venta,
-            total=Invoice.query.get('total', venta.total)
+            total_centavos=venta.total_centavos
         )
         db.session.add(nueva_factura)
         db.session.commit()
@@ -227,5 +276,6 @@ def api_product_detail(product_id):
         'id': producto.id_producto,
         'nombre': producto.nombre,
         'precio': float(producto.precio),
-        'stock': producto.stock
+        'stock': producto.stock,
+        'disponible': producto.disponible
     })
\ No newline at end of file
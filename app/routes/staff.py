@@ -4,6 +4,7 @@ from app import db
 from app.models import Staff, Store, City, User, Supplier
 from app.forms import StaffForm, ConfirmDeleteForm, EmptyForm
 from app.utils.decorators import admin_required
+from app.services.reference_service import opciones
 from sqlalchemy.exc import SQLAlchemyError
 
 staff_bp = Blueprint('staff', __name__)
@@ -42,10 +43,10 @@ def create_staff():
     form = StaffForm()
     
     # Cargar opciones para los campos de selección
-    form.ciudad_id.choices = [(c.id_ciudad, c.nombre) for c in City.query.all()]
-    form.tienda_id.choices = [(-1, '-- Seleccione una tienda --')] + [(t.id_tienda, t.nombre) for t in Store.get_activas().all()]
+    form.ciudad_id.choices = opciones('ciudades')
+    form.tienda_id.choices = opciones('tiendas', activos=True, vacia='-- Seleccione una tienda --')
     form.usuario_id.choices = [(-1, '-- Seleccione un usuario --')] + [(u.id_usuario, u.nombre) for u in User.get_activos().all()]
-    form.proveedor_id.choices = [(-1, '-- Seleccione un proveedor --')] + [(p.id_proveedor, p.nombre) for p in Supplier.get_activos().all()]
+    form.proveedor_id.choices = opciones('proveedores', activos=True, vacia='-- Seleccione un proveedor --')
 
     if form.validate_on_submit():
         try:
@@ -91,10 +92,10 @@ def edit_staff(staff_id):
     form = StaffForm(obj=empleado)
     
     # Cargar opciones para los campos de selección
-    form.ciudad_id.choices = [(c.id_ciudad, c.nombre) for c in City.query.all()]
-    form.tienda_id.choices = [(-1, '-- Ninguna --')] + [(t.id_tienda, t.nombre) for t in Store.get_activas().all()]
+    form.ciudad_id.choices = opciones('ciudades')
+    form.tienda_id.choices = opciones('tiendas', activos=True, vacia='-- Ninguna --')
     form.usuario_id.choices = [(-1, '-- Ninguno --')] + [(u.id_usuario, u.nombre) for u in User.get_activos().all()]
-    form.proveedor_id.choices = [(-1, '-- Ninguno --')] + [(p.id_proveedor, p.nombre) for p in Supplier.get_activas().all()]
+    form.proveedor_id.choices = opciones('proveedores', activos=True, vacia='-- Ninguno --')
     
     if request.method == 'GET':
         # Ajustar valores actuales para los selects
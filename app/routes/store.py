@@ -4,6 +4,7 @@ from app import db
 from app.models import Store, City
 from app.forms import StoreForm, ConfirmDeleteForm
 from app.utils.decorators import admin_required
+from app.services.reference_service import opciones
 from datetime import datetime
 
 store_bp = Blueprint('store', __name__)
@@ -33,7 +34,7 @@ def create_store():
     form = StoreForm()
     
     # Cargar opciones para el campo de ciudad
-    form.ciudad_id.choices = [(c.id_ciudad, c.nombre) for c in City.query.all()]
+    form.ciudad_id.choices = opciones('ciudades')
 
     if form.validate_on_submit():
         try:
@@ -63,7 +64,7 @@ def edit_store(store_id):
     form = StoreForm(obj=tienda)
     
     # Cargar opciones para el campo de ciudad
-    form.ciudad_id.choices = [(c.id_ciudad, c.nombre) for c in City.query.all()]
+    form.ciudad_id.choices = opciones('ciudades')
 
     if form.validate_on_submit():
         try:
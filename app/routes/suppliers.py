@@ -1,12 +1,15 @@
-from flask import Blueprint, render_template, redirect, url_for, flash, request
+from flask import Blueprint, render_template, redirect, url_for, flash, request, current_app
 # from flask_login import login_required, current_user
 from app.utils.decorators import login_required, current_user
 from app import db
-from app.models import City, Supplier, SupplierOrder, Product, SupplierOrderProduct
+from app.models import City, Supplier, SupplierOrder, SupplierOrderProduct
 from app.forms import SupplierForm, SupplierOrderForm, EmptyForm
 from app.utils.decorators import admin_required, role_required
+from app.services.reference_service import opciones
+from app.services.supplier_order_service import validar_lineas, crear_orden
 from app.utils.security import sanitize_form_data, sanitize_input
 from sqlalchemy.exc import SQLAlchemyError
+from sqlalchemy.orm import joinedload, selectinload
 
 
 suppliers_bp = Blueprint('suppliers', __name__, url_prefix='/suppliers')
@@ -40,7 +43,7 @@ def list_suppliers():
 def create_supplier():
     form = SupplierForm()
     # Cargar opciones para el campo de ciudad
-    form.ciudad_id.choices = [(c.id_ciudad, c.nombre) for c in City.query.all()]
+    form.ciudad_id.choices = opciones('ciudades')
 
     if form.validate_on_submit():
         try:
@@ -76,7 +79,7 @@ def edit_supplier(supplier_id):
     form = SupplierForm(obj=proveedor)
     
     # Cargar opciones para el campo de ciudad
-    form.ciudad_id.choices = [(c.id_ciudad, c.nombre) for c in City.query.all()]
+    form.ciudad_id.choices = opciones('ciudades')
 
     if form.validate_on_submit():
         try:
@@ -193,13 +196,28 @@ def list_orders():
     if current_user.rol.nombre == 'Proveedor' and current_user.empleado_asociado:
         supplier_id = current_user.empleado_asociado.proveedor_id
         proveedor = Supplier.query.get_or_404(supplier_id)
-        orders = SupplierOrder.query.filter_by(proveedor_id=supplier_id).all()
+        query = SupplierOrder.query.filter(SupplierOrder.proveedor_id == supplier_id)
     else:
-        # Para administradores, mostrar todas las órdenes
+        # Para administradores, todas las órdenes (paginadas)
         proveedor = None
-        orders = SupplierOrder.query.all()
+        query = SupplierOrder.query
+
+    estado = request.args.get('estado', '')
+    if estado in SupplierOrder.ESTADOS:
+        query = query.filter(SupplierOrder.estado == estado)
+
+    # Líneas y productos en dos consultas IN para toda la página, no una por orden
+    page = request.args.get('page', 1, type=int)
+    pagination = query.options(
+        joinedload(SupplierOrder.proveedor),
+        joinedload(SupplierOrder.tienda),
+        selectinload(SupplierOrder.productos).joinedload(SupplierOrderProduct.producto),
+    ).order_by(SupplierOrder.fecha.desc(), SupplierOrder.id_orden_proveedor.desc()) \
+        .paginate(page=page, per_page=current_app.config['SUPPLIER_ORDERS_PER_PAGE'], error_out=False)
+    orders = pagination.items
     
-    return render_template('suppliers/orders/list.html', proveedor=proveedor, orders=orders, form=form)
+    return render_template('suppliers/orders/list.html', proveedor=proveedor, orders=orders, form=form,
+                           pagination=pagination, estado=estado, estados=SupplierOrder.ESTADOS)
 
 @suppliers_bp.route('/orders/create', methods=['GET', 'POST'])
 @login_required
@@ -208,83 +226,39 @@ def create_order():
     form = SupplierOrderForm()
 
     # Cargar opciones para el campo de proveedor
-    form.proveedor_id.choices = [
-        (p.id_proveedor, p.nombre) for p in Supplier.get_activos().all()
-    ]
+    form.proveedor_id.choices = opciones('proveedores', activos=True)
+    form.tienda_id.choices = opciones('tiendas', activos=True, vacia='Bodega central')
 
+    lineas_enviadas = []
     if form.validate_on_submit():
-        try:
-            # Validar productos y cantidades ANTES de crear la orden
-            productos = request.form.getlist('productos[]')
-            cantidades = request.form.getlist('cantidades[]')
-
-            if not productos or not cantidades:
-                flash('Debe agregar al menos un producto a la orden', 'error')
-                return render_template(
-                    'suppliers/orders/create.html',
-                    form=form,
-                    productos=Product.get_activos().all()
-                )
-
-            # Validar que todos los productos existan y cantidades sean válidas
-            productos_validados = []
-            for i in range(len(productos)):
-                producto_id = sanitize_input(productos[i])
-                cantidad = sanitize_input(cantidades[i])
+        productos = request.form.getlist('productos[]')
+        cantidades = request.form.getlist('cantidades[]')
+        lineas_enviadas = list(zip(productos, cantidades))
 
+        if not productos or not cantidades:
+            flash('Debe agregar al menos un producto a la orden', 'error')
+        else:
+            # Todas las líneas se validan juntas (una consulta IN) antes de crear la orden
+            lineas, errores = validar_lineas(productos, cantidades)
+            if errores:
+                for error in errores:
+                    flash(error, 'error')
+            else:
                 try:
-                    cantidad = int(cantidad)
-                    if cantidad <= 0:
-                        raise ValueError("Cantidad inválida")
-                except ValueError:
-                    flash('Cantidad inválida', 'error')
-                    return render_template(
-                        'suppliers/orders/create.html',
-                        form=form,
-                        productos=Product.get_activos().all()
-                    )
-
-                producto = Product.query.get(producto_id)
-                if not producto:
-                    flash(f'El producto con ID {producto_id} no existe', 'error')
-                    return render_template(
-                        'suppliers/orders/create.html',
-                        form=form,
-                        productos=Product.get_activos().all()
-                    )
-
-                productos_validados.append((producto_id, cantidad))
-
-            # Crear la orden (ahora sí)
-            nueva_orden = SupplierOrder(
-                fecha=form.fecha.data,
-                estado=form.estado.data,
-                proveedor_id=form.proveedor_id.data
-            )
-            db.session.add(nueva_orden)
-            db.session.flush()  # Para obtener el ID de la nueva orden
-
-            # Agregar los productos a la orden
-            for producto_id, cantidad in productos_validados:
-                orden_producto = SupplierOrderProduct(
-                    id_orden_proveedor=nueva_orden.id_orden_proveedor,
-                    id_producto=producto_id,
-                    cantidad=cantidad
-                )
-                db.session.add(orden_producto)
-
-            db.session.commit()
-            flash('Orden de proveedor creada exitosamente', 'success')
-            return redirect(url_for('suppliers.list_orders'))
-
-        except Exception as e:
-            db.session.rollback()
-            flash(f'Error al crear orden: {str(e)}', 'error')
+                    tienda_id = form.tienda_id.data if form.tienda_id.data not in (None, -1) else None
+                    crear_orden(form.proveedor_id.data, form.fecha.data, form.estado.data, lineas, tienda_id)
+                    db.session.commit()
+                    flash('Orden de proveedor creada exitosamente', 'success')
+                    return redirect(url_for('suppliers.list_orders'))
+                except Exception as e:
+                    db.session.rollback()
+                    flash(f'Error al crear orden: {str(e)}', 'error')
 
     return render_template(
         'suppliers/orders/create.html',
         form=form,
-        productos=Product.get_activos().all()
+        productos=opciones('productos', activos=True),
+        lineas=lineas_enviadas or [('', '')]
     )
 
 @suppliers_bp.route('/orders/<int:order_id>/update-status', methods=['POST'])
@@ -324,7 +298,9 @@ def update_order_status(order_id):
 @suppliers_bp.route('/orders/<int:order_id>')
 @login_required
 def view_order(order_id):
-    orden = SupplierOrder.query.get_or_404(order_id)
+    orden = SupplierOrder.query.options(
+        selectinload(SupplierOrder.productos).joinedload(SupplierOrderProduct.producto)
+    ).get_or_404(order_id)
     
     # Verificar permisos
     if (current_user.rol.nombre == 'Proveedor' and 
@@ -0,0 +1,51 @@
+from app.utils.validators import Campo, compilar_esquema
+
+# Esquemas precompilados para la API JSON (/api/v1).
+# Los límites replican las validaciones de los formularios en app/forms.py
+
+PRODUCT_SCHEMA = compilar_esquema({
+    'id_producto': Campo('int', min_value=1),
+    'nombre': Campo('str', requerido=True, min_len=2, max_len=100),
+    'categoria_id': Campo('int', requerido=True, min_value=1),
+    'descripcion': Campo('str', max_len=150),
+    'precio': Campo('decimal', requerido=True, min_value=0),
+    'stock': Campo('int', default=0, min_value=0),
+    'proveedor_id': Campo('int', requerido=True, min_value=1),
+    'activo': Campo('bool', default=True),
+})
+
+CLIENT_SCHEMA = compilar_esquema({
+    'id_cliente': Campo('int', min_value=1),
+    'nombre': Campo('str', requerido=True, min_len=3, max_len=100),
+    'direccion': Campo('str', min_len=3, max_len=150),
+    'telefono': Campo('str', requerido=True, min_len=3, max_len=15),
+    'ciudad_id': Campo('int', requerido=True, min_value=1),
+    'activo': Campo('bool', default=True),
+})
+
+SUPPLIER_SCHEMA = compilar_esquema({
+    'id_proveedor': Campo('int', min_value=1),
+    'nombre': Campo('str', requerido=True, max_len=100),
+    'contacto': Campo('str', max_len=100),
+    'ciudad_id': Campo('int', min_value=1),
+    'activo': Campo('bool', default=True),
+})
+
+# Ajustes de inventario: 'stock' fija el valor, 'delta' suma o resta unidades
+STOCK_SCHEMA = compilar_esquema({
+    'id_producto': Campo('int', requerido=True, min_value=1),
+    'stock': Campo('int', min_value=0),
+    'delta': Campo('int'),
+})
+
+# Líneas de una transferencia de stock entre tiendas
+TRANSFER_SCHEMA = compilar_esquema({
+    'id_producto': Campo('int', requerido=True, min_value=1),
+    'cantidad': Campo('int', requerido=True, min_value=1),
+})
+
+# Líneas de una orden de cliente: 'cantidad' se suma (POST) o reemplaza (PUT)
+ORDER_LINE_SCHEMA = compilar_esquema({
+    'id_producto': Campo('int', requerido=True, min_value=1),
+    'cantidad': Campo('int', requerido=True, min_value=1),
+})
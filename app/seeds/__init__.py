@@ -1,5 +1,5 @@
 from app import db
-from app.models import Role, User, City, Store, Supplier, Staff, Product
+from app.models import Role, User, City, Store, Supplier, Staff, Product, Category
 
 def init_db():
     """Inicializa la base de datos con datos de ejemplo"""
@@ -209,13 +209,18 @@ def create_products():
         }
     ]
     
+    categorias = {}
     for prod_data in productos:
         if not Product.query.filter_by(nombre=prod_data['nombre']).first():
             proveedor = Supplier.query.filter_by(nombre=prod_data['proveedor']).first()
             if proveedor:
+                nombre_categoria = prod_data['categoria']
+                if nombre_categoria not in categorias:
+                    categorias[nombre_categoria] = (Category.query.filter_by(nombre=nombre_categoria).first()
+                                                    or Category(nombre=nombre_categoria))
                 producto = Product(
                     nombre=prod_data['nombre'],
-                    categoria=prod_data['categoria'],
+                    categoria=categorias[nombre_categoria],
                     descripcion=prod_data['descripcion'],
                     precio=prod_data['precio'],
                     stock=prod_data['stock'],
@@ -0,0 +1,253 @@
+import random
+from datetime import datetime, timedelta
+from decimal import Decimal
+from app import db, bcrypt
+from app.models import (Role, User, City, Store, Client, Supplier, Staff, Product,
+                        Sale, SaleProduct, Invoice, StoreInventory)
+from app.utils.helpers import chunked
+from app.utils.formatters import a_centavos
+from app.services.bulk_service import sincronizar_secuencias
+from app.services.catalog_service import ids_categorias
+from app.services.reference_service import registrar_cambio
+from app.services.sale_service import reconstruir_resumenes, reconstruir_ventas_producto
+from app.services.seller_service import reconstruir_ventas_vendedor
+
+# Volúmenes predefinidos para pruebas de carga y benchmarks
+TAMANOS = {
+    'tiny': {'ciudades': 5, 'tiendas': 3, 'vendedores_por_tienda': 1, 'proveedores': 3,
+             'productos': 50, 'clientes': 200, 'ventas': 1000},
+    'small': {'ciudades': 10, 'tiendas': 10, 'vendedores_por_tienda': 2, 'proveedores': 10,
+              'productos': 500, 'clientes': 5000, 'ventas': 20000},
+    'medium': {'ciudades': 30, 'tiendas': 100, 'vendedores_por_tienda': 3, 'proveedores': 50,
+               'productos': 5000, 'clientes': 50000, 'ventas': 300000},
+    'large': {'ciudades': 60, 'tiendas': 400, 'vendedores_por_tienda': 4, 'proveedores': 200,
+              'productos': 20000, 'clientes': 500000, 'ventas': 2000000},
+}
+
+# Tiendas entre las que se reparte el stock de cada producto generado
+TIENDAS_POR_PRODUCTO = 8
+
+# Contraseña común de los usuarios generados (se hashea una sola vez)
+PASSWORD_GENERADA = 'Bench123!'
+
+CATEGORIAS = ['Granos', 'Aceite', 'Dulces', 'Condimento', 'Lácteos', 'Bebidas',
+              'Enlatados', 'Panadería', 'Aseo', 'Snacks', 'Frutas', 'Verduras']
+ADJETIVOS = ['Premium', 'Clásico', 'Orgánico', 'Light', 'Familiar', 'Económico',
+             'Natural', 'Integral', 'Tradicional', 'Gourmet']
+NOMBRES = ['Ana', 'Luis', 'María', 'Carlos', 'Laura', 'Andrés', 'Sofía', 'Jorge',
+           'Valentina', 'Felipe', 'Camila', 'Juan', 'Daniela', 'Santiago', 'Paula']
+APELLIDOS = ['Gómez', 'Rodríguez', 'Pérez', 'López', 'Martínez', 'García', 'Hernández',
+             'Díaz', 'Moreno', 'Álvarez', 'Ramírez', 'Torres', 'Vargas', 'Castro']
+
+
+def dominio_correo(semilla):
+    """Dominio de los correos generados; debe pasar la validación de LoginForm"""
+    return f'coquito-gen{semilla}.com'
+
+
+def _siguiente_id(columna):
+    return (db.session.query(db.func.max(columna)).scalar() or 0) + 1
+
+
+def _insertar(modelo, filas, lote):
+    """Inserta filas con executemany en bloques, confirmando cada bloque"""
+    tabla = modelo.__table__
+    for bloque in chunked(filas, lote):
+        db.session.execute(tabla.insert(), bloque)
+        db.session.commit()
+
+
+def _roles():
+    roles = {r.nombre: r.id_rol for r in Role.query.all()}
+    faltantes = {'Administrador', 'Vendedor', 'Proveedor'} - set(roles)
+    if faltantes:
+        from app.seeds import create_roles
+        create_roles()
+        db.session.commit()
+        roles = {r.nombre: r.id_rol for r in Role.query.all()}
+    return roles
+
+
+def generar_datos(tamano='small', semilla=42, fecha_fin=None, dias=365, lote=10000, progreso=None, **volumenes):
+    """
+    Genera un conjunto de datos sintético y determinista con inserciones masivas.
+
+    El mismo `tamano`, `semilla` y `fecha_fin` producen siempre los mismos datos.
+    Los volúmenes del tamaño elegido pueden sobrescribirse con argumentos
+    (p. ej. ventas=50000). Devuelve el número de filas creadas por tabla.
+    """
+    config = dict(TAMANOS[tamano])
+    config.update(volumenes)
+    rng = random.Random(semilla)
+    fecha_fin = fecha_fin or datetime.utcnow().replace(hour=0, minute=0, second=0, microsecond=0)
+    fecha_inicio = fecha_fin - timedelta(days=dias)
+    prefijo = f'gen{semilla}'
+    dominio = dominio_correo(semilla)
+    creados = {}
+
+    def avisar(tabla, cantidad):
+        creados[tabla] = cantidad
+        if progreso:
+            progreso(tabla, cantidad)
+
+    roles = _roles()
+    hash_password = bcrypt.generate_password_hash(PASSWORD_GENERADA).decode('utf-8')
+
+    # Ciudades
+    primer_ciudad = _siguiente_id(City.id_ciudad)
+    ciudades = [{'id_ciudad': primer_ciudad + i, 'nombre': f'Ciudad {prefijo}-{i}', 'activo': True}
+                for i in range(config['ciudades'])]
+    _insertar(City, ciudades, lote)
+    ids_ciudad = [c['id_ciudad'] for c in ciudades]
+    avisar('ciudades', len(ciudades))
+
+    # Tiendas
+    primer_tienda = _siguiente_id(Store.id_tienda)
+    tiendas = [{'id_tienda': primer_tienda + i, 'nombre': f'Tienda {prefijo}-{i}',
+                'direccion': f'Calle {rng.randint(1, 150)} # {rng.randint(1, 99)}-{rng.randint(1, 99)}',
+                'ciudad_id': rng.choice(ids_ciudad), 'activo': True}
+               for i in range(config['tiendas'])]
+    _insertar(Store, tiendas, lote)
+    avisar('tiendas', len(tiendas))
+
+    # Proveedores con un usuario cada uno
+    primer_proveedor = _siguiente_id(Supplier.id_proveedor)
+    proveedores = [{'id_proveedor': primer_proveedor + i, 'nombre': f'Proveedor {prefijo}-{i}',
+                    'contacto': f'contacto{i}@{dominio}', 'ciudad_id': rng.choice(ids_ciudad),
+                    'activo': True}
+                   for i in range(config['proveedores'])]
+    _insertar(Supplier, proveedores, lote)
+    avisar('proveedores', len(proveedores))
+
+    # Las inserciones con executemany no pasan por el ORM: invalidar cachés de referencia
+    registrar_cambio('ciudades', 'tiendas', 'proveedores')
+    db.session.commit()
+
+    # Usuarios y personal: vendedores por tienda y un usuario por proveedor
+    siguiente_usuario = _siguiente_id(User.id_usuario)
+    siguiente_empleado = _siguiente_id(Staff.id_empleado)
+    usuarios = []
+    personal = []
+    vendedores = []
+    ahora = datetime.utcnow()
+
+    for tienda in tiendas:
+        for n in range(config['vendedores_por_tienda']):
+            nombre = f'{rng.choice(NOMBRES)} {rng.choice(APELLIDOS)}'
+            usuarios.append({'id_usuario': siguiente_usuario, 'nombre': nombre,
+                             'email': f"vendedor{tienda['id_tienda']}-{n}@{dominio}",
+                             'password': hash_password, 'rol_id': roles['Vendedor'],
+                             'activo': True, 'fecha_registro': ahora})
+            personal.append({'id_empleado': siguiente_empleado, 'nombre': nombre, 'cargo': 'Vendedor',
+                             'salario': Decimal(rng.randint(1300, 4000) * 1000),
+                             'ciudad_id': tienda['ciudad_id'], 'tienda_id': tienda['id_tienda'],
+                             'usuario_id': siguiente_usuario, 'proveedor_id': None, 'activo': True})
+            vendedores.append((siguiente_empleado, tienda['id_tienda']))
+            siguiente_usuario += 1
+            siguiente_empleado += 1
+
+    for proveedor in proveedores:
+        usuarios.append({'id_usuario': siguiente_usuario, 'nombre': proveedor['nombre'],
+                         'email': f"proveedor{proveedor['id_proveedor']}@{dominio}",
+                         'password': hash_password, 'rol_id': roles['Proveedor'],
+                         'activo': True, 'fecha_registro': ahora})
+        personal.append({'id_empleado': siguiente_empleado, 'nombre': proveedor['nombre'],
+                         'cargo': 'Representante', 'salario': None, 'ciudad_id': proveedor['ciudad_id'],
+                         'tienda_id': None, 'usuario_id': siguiente_usuario, 'proveedor_id': proveedor['id_proveedor'],
+                         'activo': True})
+        siguiente_usuario += 1
+        siguiente_empleado += 1
+
+    _insertar(User, usuarios, lote)
+    _insertar(Staff, personal, lote)
+    avisar('usuarios', len(usuarios))
+    avisar('personal', len(personal))
+
+    # Categorías y productos
+    ids_categoria = ids_categorias(CATEGORIAS)
+    primer_producto = _siguiente_id(Product.id_producto)
+    productos = []
+    for i in range(config['productos']):
+        categoria = rng.choice(CATEGORIAS)
+        productos.append({'id_producto': primer_producto + i,
+                          'nombre': f'{categoria} {rng.choice(ADJETIVOS)} {prefijo}-{i}',
+                          'categoria_id': ids_categoria[categoria.lower()], 'descripcion': None,
+                          'precio': Decimal(rng.randint(10, 5000) * 50),
+                          'stock': rng.randint(0, 10000),
+                          'proveedor_id': rng.choice(proveedores)['id_proveedor'], 'activo': True})
+    _insertar(Product, productos, lote)
+    registrar_cambio('productos')
+    db.session.commit()
+    precios = [(p['id_producto'], a_centavos(p['precio'])) for p in productos]
+    avisar('productos', len(productos))
+
+    # Inventario por tienda: el stock de cada producto se reparte entre algunas tiendas.
+    # Usa su propio generador para no alterar los datos que siguen con la misma semilla
+    rng_inventario = random.Random(semilla + 1)
+    inventario = []
+    for producto in productos:
+        elegidas = rng_inventario.sample(tiendas, min(TIENDAS_POR_PRODUCTO, len(tiendas)))
+        cortes = sorted(rng_inventario.randint(0, producto['stock']) for _ in range(len(elegidas) - 1))
+        for tienda, desde, hasta in zip(elegidas, [0] + cortes, cortes + [producto['stock']]):
+            inventario.append({'tienda_id': tienda['id_tienda'], 'id_producto': producto['id_producto'],
+                               'stock': hasta - desde})
+    _insertar(StoreInventory, inventario, lote)
+    avisar('inventario_tiendas', len(inventario))
+
+    # Clientes; la dirección sale del índice y no de rng, así las ventas que
+    # siguen son las mismas que antes para cada semilla
+    primer_cliente = _siguiente_id(Client.id_cliente)
+    clientes = (Client.completar_columnas({'id_cliente': primer_cliente + i,
+                                           'nombre': f'{rng.choice(NOMBRES)} {rng.choice(APELLIDOS)}',
+                                           'direccion': f'Carrera {i % 150 + 1} # {i // 150 % 99 + 1}-{i % 97 + 1}',
+                                           'telefono': f'3{semilla % 100:02d}{i:07d}',
+                                           'ciudad_id': rng.choice(ids_ciudad), 'activo': True})
+                for i in range(config['clientes']))
+    _insertar(Client, clientes, lote)
+    avisar('clientes', config['clientes'])
+
+    # Ventas, líneas y facturas, generadas por bloques para acotar la memoria
+    primer_venta = _siguiente_id(Sale.id_venta)
+    primer_factura = _siguiente_id(Invoice.id_factura)
+    segundos_rango = int((fecha_fin - fecha_inicio).total_seconds())
+    total_lineas = 0
+
+    for inicio_bloque in range(0, config['ventas'], lote):
+        ventas, lineas, facturas = [], [], []
+        for i in range(inicio_bloque, min(inicio_bloque + lote, config['ventas'])):
+            id_venta = primer_venta + i
+            empleado_id, tienda_id = rng.choice(vendedores)
+            fecha = fecha_inicio + timedelta(seconds=rng.randrange(segundos_rango))
+            total = 0
+            for id_producto, precio in rng.sample(precios, min(rng.randint(1, 5), len(precios))):
+                cantidad = rng.randint(1, 6)
+                total += precio * cantidad
+                lineas.append({'id_venta': id_venta, 'id_producto': id_producto, 'cantidad': cantidad,
+                               'precio_unitario_centavos': precio, 'activo': True})
+            ventas.append({'id_venta': id_venta, 'fecha': fecha, 'total_centavos': total, 'estado': 'activa',
+                           'activo': True, 'cliente_id': primer_cliente + rng.randrange(config['clientes']),
+                           'empleado_id': empleado_id, 'tienda_id': tienda_id})
+            facturas.append({'id_factura': primer_factura + i, 'fecha': fecha, 'total_centavos': total,
+                             'venta_id': id_venta, 'activo': True})
+
+        db.session.execute(Sale.__table__.insert(), ventas)
+        db.session.execute(SaleProduct.__table__.insert(), lineas)
+        db.session.execute(Invoice.__table__.insert(), facturas)
+        db.session.commit()
+        total_lineas += len(lineas)
+        if progreso:
+            progreso('ventas', inicio_bloque + len(ventas))
+
+    # Las ventas se insertaron con executemany: los resúmenes por cliente, producto y vendedor se recalculan aparte
+    reconstruir_resumenes()
+    reconstruir_ventas_producto()
+    reconstruir_ventas_vendedor()
+    # Los ids se asignaron aquí: en PostgreSQL las secuencias deben quedar detrás de ellos
+    sincronizar_secuencias(*(modelo.__table__ for modelo in
+                             (City, Store, Supplier, User, Staff, Product, Client, Sale, Invoice)))
+    db.session.commit()
+
+    avisar('ventas', config['ventas'])
+    avisar('venta_producto', total_lineas)
+    avisar('facturas', config['ventas'])
+    return creados
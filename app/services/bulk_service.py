@@ -0,0 +1,172 @@
+from datetime import datetime
+from sqlalchemy.dialects import postgresql, sqlite
+from app import db
+from app.utils.helpers import chunked
+from app.services.reference_service import registrar_cambio
+
+# Tamaño de bloque para las consultas IN (SQLite limita los parámetros por sentencia)
+IN_CHUNK_SIZE = 500
+
+MODOS = ('create', 'update', 'upsert')
+
+# Dialectos con INSERT ... ON CONFLICT
+_INSERT_POR_DIALECTO = {
+    'sqlite': sqlite.insert,
+    'postgresql': postgresql.insert,
+}
+
+
+def insert_on_conflict(tabla):
+    """INSERT del dialecto actual, que admite .on_conflict_do_update/.on_conflict_do_nothing"""
+    dialecto = db.session.get_bind().dialect.name
+    if dialecto not in _INSERT_POR_DIALECTO:
+        raise NotImplementedError(f'INSERT ... ON CONFLICT no soportado en {dialecto}')
+    return _INSERT_POR_DIALECTO[dialecto](tabla)
+
+
+def sincronizar_secuencias(*tablas):
+    """
+    En PostgreSQL adelanta la secuencia de la clave primaria de cada tabla más
+    allá del mayor id, después de insertar ids explícitos. En SQLite no hace falta.
+    """
+    if db.session.get_bind().dialect.name != 'postgresql':
+        return
+    for tabla in tablas:
+        columna = list(tabla.primary_key.columns)[0]
+        db.session.execute(db.select(db.func.setval(
+            db.func.pg_get_serial_sequence(tabla.name, columna.name),
+            db.func.coalesce(db.select(db.func.max(columna)).scalar_subquery(), 0) + 1,
+            False,
+        )))
+
+
+def valores_existentes(columna, valores):
+    """Devuelve el subconjunto de `valores` presente en `columna`, en bloques IN"""
+    encontrados = set()
+    for bloque in chunked(set(valores), IN_CHUNK_SIZE):
+        encontrados.update(v for (v,) in db.session.query(columna).filter(columna.in_(bloque)))
+    return encontrados
+
+
+def _pares_existentes(columna, pk, valores):
+    """Mapea valor -> pk para los valores de `columna` que ya existen"""
+    pares = {}
+    for bloque in chunked(set(valores), IN_CHUNK_SIZE):
+        pares.update(db.session.query(columna, pk).filter(columna.in_(bloque)))
+    return pares
+
+
+def bulk_write(model, esquema, filas, modo, referencias=None, unicos=None, parcial=False):
+    """
+    Crea, actualiza o inserta/actualiza (upsert) un lote de filas en una sola transacción.
+
+    - referencias: {'campo_fk': Modelo.columna_pk} validadas con una consulta IN por campo.
+    - unicos: campos que no pueden repetirse ni en el lote ni en la base de datos.
+    - parcial: si es False, cualquier error de fila cancela el lote completo.
+
+    Devuelve un diccionario con los contadores y los errores por fila.
+    """
+    if modo not in MODOS:
+        raise ValueError(f'Modo no válido: {modo}')
+
+    referencias = referencias or {}
+    unicos = unicos or []
+    pk = model.__mapper__.primary_key[0]
+    pk_nombre = pk.key
+    tiene_fecha_eliminacion = 'fecha_eliminacion' in model.__table__.c
+
+    errores = {}
+    validas = []
+
+    # Columnas derivadas que el modelo mantiene con @validates (no aplica a executemany)
+    completar_columnas = getattr(model, 'completar_columnas', None)
+
+    # 1. Validación de esquema (sin tocar la base de datos)
+    for indice, fila in enumerate(filas):
+        datos, errores_fila = esquema.validar(fila, parcial=(modo == 'update'))
+        if not errores_fila and modo == 'update' and datos.get(pk_nombre) is None:
+            errores_fila = {pk_nombre: 'Campo requerido para actualizar'}
+        if errores_fila:
+            errores[indice] = errores_fila
+        else:
+            validas.append((indice, completar_columnas(datos) if completar_columnas else datos))
+
+    # 2. Claves foráneas: una consulta IN por referencia
+    for campo, columna in referencias.items():
+        valores = {d[campo] for _, d in validas if d.get(campo) is not None}
+        existentes = valores_existentes(columna, valores)
+        for indice, datos in validas:
+            if datos.get(campo) is not None and datos[campo] not in existentes:
+                errores.setdefault(indice, {})[campo] = f'No existe el registro {datos[campo]}'
+
+    # 3. Claves primarias existentes
+    pks = {d[pk_nombre] for _, d in validas if d.get(pk_nombre) is not None}
+    pks_existentes = valores_existentes(pk, pks)
+
+    # 4. Unicidad en el lote y contra la base de datos
+    for campo in unicos:
+        vistos = {}
+        valores = {d[campo] for _, d in validas if d.get(campo) is not None}
+        en_bd = _pares_existentes(getattr(model, campo), pk, valores)
+        for indice, datos in validas:
+            valor = datos.get(campo)
+            if valor is None:
+                continue
+            if valor in vistos:
+                errores.setdefault(indice, {})[campo] = f'Valor repetido en la fila {vistos[valor]}'
+            elif valor in en_bd and en_bd[valor] != datos.get(pk_nombre):
+                errores.setdefault(indice, {})[campo] = 'Ya está registrado'
+            vistos.setdefault(valor, indice)
+
+    inserciones = []
+    actualizaciones = []
+    for indice, datos in validas:
+        if indice in errores:
+            continue
+        id_fila = datos.get(pk_nombre)
+        existe = id_fila is not None and id_fila in pks_existentes
+
+        if modo == 'create' and existe:
+            errores[indice] = {pk_nombre: 'Ya existe'}
+            continue
+        if modo == 'update' and not existe:
+            errores[indice] = {pk_nombre: 'No existe'}
+            continue
+
+        if tiene_fecha_eliminacion and 'activo' in datos:
+            datos['fecha_eliminacion'] = None if datos['activo'] else datetime.utcnow()
+
+        if existe:
+            actualizaciones.append(datos)
+        else:
+            if id_fila is None:
+                datos.pop(pk_nombre, None)
+            inserciones.append(datos)
+
+    resultado = {
+        'procesadas': len(filas),
+        'creadas': 0,
+        'actualizadas': 0,
+        'errores': [{'fila': i, 'errores': errores[i]} for i in sorted(errores)]
+    }
+
+    if errores and not parcial:
+        return resultado
+
+    try:
+        if inserciones:
+            db.session.bulk_insert_mappings(model, inserciones)
+            if any(pk_nombre in datos for datos in inserciones):
+                sincronizar_secuencias(model.__table__)
+        if actualizaciones:
+            db.session.bulk_update_mappings(model, actualizaciones)
+        # bulk_*_mappings no pasa por after_flush: se versiona la tabla a mano
+        registrar_cambio(model.__tablename__)
+        db.session.commit()
+    except Exception:
+        db.session.rollback()
+        raise
+
+    resultado['creadas'] = len(inserciones)
+    resultado['actualizadas'] = len(actualizaciones)
+    return resultado
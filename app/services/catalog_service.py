@@ -0,0 +1,91 @@
+import threading
+import time
+from flask import current_app
+from sqlalchemy import func
+from app import db
+from app.models import Category
+from app.services.bulk_service import insert_on_conflict
+
+_lock = threading.Lock()
+
+
+def _cache():
+    """Caché del catálogo de la aplicación actual (una por app, no por proceso)"""
+    return current_app.extensions.setdefault('catalogo_cache', {'categorias': None, 'expira': 0.0})
+
+
+def _categorias():
+    """Filas (id, nombre, activo) de todas las categorías, recargadas si la caché venció"""
+    cache = _cache()
+    ahora = time.monotonic()
+    with _lock:
+        if cache['categorias'] is None or ahora >= cache['expira']:
+            filas = db.session.query(Category.id_categoria, Category.nombre, Category.activo) \
+                .order_by(Category.nombre).all()
+            cache['categorias'] = {
+                'por_id': {id_categoria: nombre for id_categoria, nombre, activo in filas if activo},
+                'por_nombre': {nombre.lower(): id_categoria for id_categoria, nombre, _ in filas},
+            }
+            cache['expira'] = ahora + current_app.config.get('CATEGORY_CACHE_TTL', 300)
+        return cache['categorias']
+
+
+def categorias_producto():
+    """
+    id_categoria -> nombre de las categorías activas, ordenadas por nombre.
+
+    Se sirve desde una caché en memoria que se invalida al crear categorías;
+    CATEGORY_CACHE_TTL acota el desfase entre procesos.
+    """
+    return _categorias()['por_id']
+
+
+def invalidar_categorias():
+    """Descarta las categorías en caché; llamar después de escribir en categorias"""
+    with _lock:
+        _cache()['categorias'] = None
+
+
+def ids_categorias(nombres, crear=True):
+    """
+    Devuelve {nombre en minúsculas: id_categoria} para los nombres dados.
+    Las categorías que no existen se crean en un solo INSERT ... ON CONFLICT
+    DO NOTHING si `crear` es True, dentro de la transacción de quien llama:
+    no confirma, así que un lote rechazado tampoco deja sus categorías.
+    """
+    nombres = {n.strip().lower(): n.strip() for n in nombres if n and n.strip()}
+    por_nombre = _categorias()['por_nombre']
+    resultado = {clave: por_nombre[clave] for clave in nombres if clave in por_nombre}
+    faltantes = [original for clave, original in nombres.items() if clave not in resultado]
+
+    if faltantes and crear:
+        # Si otro proceso creó la misma categoría al mismo tiempo, el conflicto se ignora
+        db.session.execute(insert_on_conflict(Category.__table__).on_conflict_do_nothing(),
+                           [{'nombre': n, 'activo': True} for n in faltantes])
+        # Los ids se leen de la sesión y no de la caché compartida, que no debe
+        # ver filas sin confirmar; se invalida para recargarla en la próxima lectura
+        resultado.update(
+            (nombre.lower(), id_) for id_, nombre in db.session.query(Category.id_categoria, Category.nombre)
+            .filter(func.lower(Category.nombre).in_([n.lower() for n in faltantes]))
+        )
+        invalidar_categorias()
+
+    return resultado
+
+
+def id_categoria(nombre, crear=True):
+    """id_categoria de un nombre de categoría (None si no existe y no se crea)"""
+    return ids_categorias([nombre], crear=crear).get((nombre or '').strip().lower())
+
+
+def resolver_categorias(filas):
+    """
+    Reemplaza el nombre 'categoria' de cada fila (dict) por su 'categoria_id',
+    creando las categorías nuevas. Usado por la API JSON de productos.
+    """
+    validas = [f for f in filas if isinstance(f, dict) and isinstance(f.get('categoria'), str)]
+    ids = ids_categorias(f['categoria'] for f in validas if 2 <= len(f['categoria'].strip()) <= 100)
+    for fila in validas:
+        nombre = fila.pop('categoria').strip().lower()
+        fila.setdefault('categoria_id', ids.get(nombre))
+    return filas
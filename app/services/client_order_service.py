@@ -0,0 +1,269 @@
+import time
+from datetime import datetime
+from app import db
+from app.models import ClientOrder, ClientOrderProduct, Product, Sale, SaleProduct, Invoice, StockReservation
+from app.schemas import ORDER_LINE_SCHEMA
+from app.services.bulk_service import IN_CHUNK_SIZE, insert_on_conflict
+from app.services.sale_service import registrar_compras, registrar_ventas_producto
+from app.services.seller_service import registrar_ventas_vendedor, periodo_de
+from app.services.reservation_service import reservar_orden, liberar_reservas
+from app.services.inventory_service import stock_tienda, descontar_venta
+from app.utils.helpers import chunked
+from app.utils.formatters import a_centavos
+
+_lineas = ClientOrderProduct.__table__
+_ordenes = ClientOrder.__table__
+_ventas = Sale.__table__
+
+
+def totales_orden(orden_id):
+    """
+    Líneas, unidades y total estimado en centavos (precio actual) de una
+    orden, en una consulta; cada precio se redondea con a_centavos como al
+    cumplir la orden, así que coincide con el total de la venta.
+    """
+    lineas = db.session.query(ClientOrderProduct.cantidad, Product.precio) \
+        .join(Product, Product.id_producto == ClientOrderProduct.id_producto) \
+        .filter(ClientOrderProduct.id_orden_cliente == orden_id).all()
+    return {
+        'lineas': len(lineas),
+        'unidades': sum(cantidad for cantidad, _ in lineas),
+        'total_centavos': sum(cantidad * a_centavos(precio) for cantidad, precio in lineas),
+    }
+
+
+def upsert_lineas(orden, filas, reemplazar=False, parcial=False):
+    """
+    Agrega o actualiza muchas líneas de una orden con un solo INSERT ... ON CONFLICT.
+
+    Con `reemplazar=False` la cantidad se suma a la existente; con True la
+    sustituye. Las filas repetidas del lote se combinan antes de escribir.
+    Devuelve contadores, errores por fila y los totales actualizados de la orden.
+    """
+    if orden.estado != 'pendiente':
+        raise ValueError(f'La orden está {orden.estado} y no admite cambios')
+
+    errores = {}
+    validas = []
+    for indice, fila in enumerate(filas):
+        datos, errores_fila = ORDER_LINE_SCHEMA.validar(fila)
+        if errores_fila:
+            errores[indice] = errores_fila
+        else:
+            validas.append((indice, datos))
+
+    # Productos del lote: existencia, estado y stock libre (stock - reservado) en bloques IN
+    productos = {}
+    for bloque in chunked({d['id_producto'] for _, d in validas}, IN_CHUNK_SIZE):
+        productos.update(
+            (id_producto, (activo, (stock or 0) - reservado)) for id_producto, activo, stock, reservado in
+            db.session.query(Product.id_producto, Product.activo, Product.stock, Product.reservado)
+            .filter(Product.id_producto.in_(bloque))
+        )
+    # Lo que la orden ya tiene y ya reservó no cuenta contra el stock libre
+    actuales = dict(db.session.query(ClientOrderProduct.id_producto, ClientOrderProduct.cantidad)
+                    .filter(ClientOrderProduct.id_orden_cliente == orden.id_orden_cliente))
+    propias = dict(db.session.query(StockReservation.id_producto, StockReservation.cantidad)
+                   .filter(StockReservation.id_orden_cliente == orden.id_orden_cliente))
+
+    cantidades = {}
+    for indice, datos in validas:
+        id_producto = datos['id_producto']
+        if id_producto not in productos:
+            errores[indice] = {'id_producto': f'No existe el producto {id_producto}'}
+            continue
+        activo, libre = productos[id_producto]
+        if reemplazar:
+            nueva = datos['cantidad']
+        else:
+            nueva = cantidades.get(id_producto, 0) + datos['cantidad']
+        if not activo:
+            errores[indice] = {'id_producto': 'El producto está inactivo'}
+        elif (nueva if reemplazar else actuales.get(id_producto, 0) + nueva) - propias.get(id_producto, 0) > libre:
+            errores[indice] = {'cantidad': f'Stock insuficiente (disponible: {max(libre, 0)})'}
+        else:
+            cantidades[id_producto] = nueva
+
+    resultado = {
+        'procesadas': len(filas),
+        'escritas': 0,
+        'errores': [{'fila': i, 'errores': errores[i]} for i in sorted(errores)]
+    }
+
+    if cantidades and (parcial or not errores):
+        sentencia = insert_on_conflict(_lineas)
+        nueva_cantidad = sentencia.excluded.cantidad if reemplazar \
+            else _lineas.c.cantidad + sentencia.excluded.cantidad
+        sentencia = sentencia.on_conflict_do_update(
+            index_elements=[_lineas.c.id_orden_cliente, _lineas.c.id_producto],
+            set_={'cantidad': nueva_cantidad},
+        )
+        try:
+            db.session.execute(sentencia, [
+                {'id_orden_cliente': orden.id_orden_cliente, 'id_producto': id_producto, 'cantidad': cantidad}
+                for id_producto, cantidad in cantidades.items()
+            ])
+            reservar_orden(orden.id_orden_cliente)
+            db.session.commit()
+        except Exception:
+            db.session.rollback()
+            raise
+        resultado['escritas'] = len(cantidades)
+
+    resultado['totales'] = totales_orden(orden.id_orden_cliente)
+    return resultado
+
+
+def cumplir_ordenes(orden_ids, empleado):
+    """
+    Convierte órdenes pendientes en ventas, en una sola transacción.
+
+    Las órdenes se atienden por id mientras alcance el stock; las que no
+    (sin líneas, productos inactivos o stock insuficiente) quedan pendientes
+    y se devuelven en 'rechazadas'. Cada orden usa primero sus propias
+    reservas y solo el resto sale del stock libre (stock - reservado); todas
+    las unidades deben estar en la tienda del empleado. El stock se
+    descuenta con UPDATE condicionales por producto; ventas,
+    líneas y facturas se insertan con executemany. Lanza ValueError si otra
+    transacción consumió el stock.
+    """
+    inicio = time.perf_counter()
+    orden_ids = sorted(set(orden_ids))
+    rechazadas = {}
+
+    pendientes = {}
+    for bloque in chunked(orden_ids, IN_CHUNK_SIZE):
+        pendientes.update(db.session.query(ClientOrder.id_orden_cliente, ClientOrder.cliente_id)
+                          .filter(ClientOrder.id_orden_cliente.in_(bloque), ClientOrder.estado == 'pendiente'))
+    for orden_id in orden_ids:
+        if orden_id not in pendientes:
+            rechazadas[orden_id] = 'No existe o no está pendiente'
+
+    lineas_por_orden = {}
+    for bloque in chunked(pendientes, IN_CHUNK_SIZE):
+        for orden_id, id_producto, cantidad in db.session.query(
+                ClientOrderProduct.id_orden_cliente, ClientOrderProduct.id_producto, ClientOrderProduct.cantidad
+        ).filter(ClientOrderProduct.id_orden_cliente.in_(bloque)):
+            lineas_por_orden.setdefault(orden_id, []).append((id_producto, cantidad))
+
+    productos = {}
+    ids_producto = {p for lineas in lineas_por_orden.values() for p, _ in lineas}
+    for bloque in chunked(ids_producto, IN_CHUNK_SIZE):
+        productos.update(
+            (id_producto, (a_centavos(precio), (stock or 0) - reservado, activo))
+            for id_producto, precio, stock, reservado, activo in
+            db.session.query(Product.id_producto, Product.precio, Product.stock, Product.reservado, Product.activo)
+            .filter(Product.id_producto.in_(bloque))
+        )
+
+    propias = {}
+    for bloque in chunked(pendientes, IN_CHUNK_SIZE):
+        for orden_id, id_producto, cantidad in db.session.query(
+                StockReservation.id_orden_cliente, StockReservation.id_producto, StockReservation.cantidad
+        ).filter(StockReservation.id_orden_cliente.in_(bloque)):
+            propias.setdefault(orden_id, {})[id_producto] = cantidad
+
+    # Reparto del stock libre y del de la tienda entre las órdenes, en orden de id
+    disponible = {id_producto: libre for id_producto, (_, libre, _) in productos.items()}
+    en_tienda = stock_tienda(empleado.tienda_id, ids_producto)
+    aceptadas = []
+    for orden_id in sorted(pendientes):
+        lineas = lineas_por_orden.get(orden_id)
+        if not lineas:
+            rechazadas[orden_id] = 'La orden no tiene productos'
+            continue
+        inactivo = next((p for p, _ in lineas if not productos[p][2]), None)
+        if inactivo is not None:
+            rechazadas[orden_id] = f'El producto {inactivo} está inactivo'
+            continue
+        extra = {p: c - propias.get(orden_id, {}).get(p, 0) for p, c in lineas}
+        faltante = next((p for p, c in extra.items() if disponible[p] < c), None)
+        if faltante is not None:
+            rechazadas[orden_id] = f'Stock insuficiente del producto {faltante} ' \
+                                   f'(disponible: {max(disponible[faltante], 0)})'
+            continue
+        faltante = next((p for p, c in lineas if en_tienda.get(p, 0) < c), None)
+        if faltante is not None:
+            rechazadas[orden_id] = f'Stock insuficiente del producto {faltante} en la tienda ' \
+                                   f'(disponible: {en_tienda.get(faltante, 0)})'
+            continue
+        for id_producto, cantidad in extra.items():
+            disponible[id_producto] -= cantidad
+        for id_producto, cantidad in lineas:
+            en_tienda[id_producto] -= cantidad
+        aceptadas.append(orden_id)
+
+    resultado = {
+        'procesadas': len(orden_ids),
+        'cumplidas': [],
+        'rechazadas': [{'orden': o, 'motivo': rechazadas[o]} for o in sorted(rechazadas)],
+    }
+
+    if aceptadas:
+        fecha = datetime.utcnow()
+        # Importes en centavos enteros: sin Decimal en el bucle de totales
+        totales = {o: sum(productos[p][0] * c for p, c in lineas_por_orden[o]) for o in aceptadas}
+        consumo = {}
+        for o in aceptadas:
+            for p, c in lineas_por_orden[o]:
+                consumo[p] = consumo.get(p, 0) + c
+        try:
+            # Las reservas de las órdenes atendidas vuelven al stock libre y se consumen enseguida
+            liberar_reservas(aceptadas)
+            descontar_venta(empleado.tienda_id, consumo)
+
+            ids_venta = db.session.execute(
+                _ventas.insert().returning(_ventas.c.id_venta, sort_by_parameter_order=True),
+                [{'fecha': fecha, 'total_centavos': totales[o], 'estado': 'activa', 'activo': True,
+                  'cliente_id': pendientes[o], 'empleado_id': empleado.id_empleado,
+                  'tienda_id': empleado.tienda_id} for o in aceptadas],
+            ).scalars().all()
+            venta_por_orden = dict(zip(aceptadas, ids_venta))
+
+            db.session.execute(SaleProduct.__table__.insert(), [
+                {'id_venta': venta_por_orden[o], 'id_producto': p, 'cantidad': c,
+                 'precio_unitario_centavos': productos[p][0], 'activo': True}
+                for o in aceptadas for p, c in lineas_por_orden[o]
+            ])
+            db.session.execute(Invoice.__table__.insert(), [
+                {'fecha': fecha, 'total_centavos': totales[o], 'venta_id': venta_por_orden[o], 'activo': True}
+                for o in aceptadas
+            ])
+
+            cambiadas = db.session.execute(
+                _ordenes.update().where(
+                    _ordenes.c.id_orden_cliente == db.bindparam('p_orden'),
+                    _ordenes.c.estado == 'pendiente',
+                ).values(estado='completada', venta_id=db.bindparam('p_venta')),
+                [{'p_orden': o, 'p_venta': venta_por_orden[o]} for o in aceptadas],
+            ).rowcount
+            if cambiadas != -1 and cambiadas < len(aceptadas):
+                raise ValueError('Otra operación modificó las órdenes, intente de nuevo')
+
+            por_cliente = {}
+            for o in aceptadas:
+                gasto, compras = por_cliente.get(pendientes[o], (0, 0))
+                por_cliente[pendientes[o]] = (gasto + totales[o], compras + 1)
+            registrar_compras(por_cliente, fecha)
+
+            por_producto = {}
+            for o in aceptadas:
+                for p, c in lineas_por_orden[o]:
+                    clave = (fecha.date(), empleado.tienda_id, p)
+                    ventas, unidades, centavos = por_producto.get(clave, (0, 0, 0))
+                    por_producto[clave] = (ventas + 1, unidades + c, centavos + productos[p][0] * c)
+            registrar_ventas_producto(por_producto)
+            registrar_ventas_vendedor({(periodo_de(fecha), empleado.id_empleado): (
+                len(aceptadas), sum(consumo.values()), sum(totales.values()))})
+
+            db.session.commit()
+        except Exception:
+            db.session.rollback()
+            raise
+
+        resultado['cumplidas'] = [{'orden': o, 'venta': venta_por_orden[o], 'total_centavos': totales[o]} for o in aceptadas]
+
+    duracion = time.perf_counter() - inicio
+    resultado['duracion_ms'] = round(duracion * 1000, 3)
+    resultado['ordenes_por_segundo'] = round(len(aceptadas) / duracion, 1) if duracion else None
+    return resultado
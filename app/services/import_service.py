@@ -0,0 +1,171 @@
+import csv
+from datetime import datetime
+from sqlalchemy import case
+from app import db
+from app.models import Product, Supplier
+from app.schemas import PRODUCT_SCHEMA
+from app.services.catalog_service import ids_categorias
+from app.services.inventory_service import completar_ubicadas, stock_minimo
+from app.services.reference_service import registrar_cambio
+
+# Filas por lote de escritura (un executemany + commit por lote)
+IMPORT_BATCH_SIZE = 5000
+
+COLUMNAS_PRODUCTO = ('nombre', 'categoria_id', 'descripcion', 'precio', 'stock', 'activo')
+# Columnas opcionales del CSV: en una actualización solo se escriben si vienen en la cabecera
+COLUMNAS_OPCIONALES = ('descripcion', 'stock', 'activo')
+
+
+def _mapa_proveedores():
+    """Nombre de proveedor (en minúsculas) -> id_proveedor, en una sola consulta"""
+    return {
+        nombre.strip().lower(): id_proveedor
+        for id_proveedor, nombre in db.session.query(Supplier.id_proveedor, Supplier.nombre)
+    }
+
+
+def _mapa_productos(desde_id=0):
+    """(proveedor_id, nombre en minúsculas) -> id_producto para productos con id > desde_id"""
+    consulta = db.session.query(Product.id_producto, Product.proveedor_id, Product.nombre) \
+        .filter(Product.id_producto > desde_id)
+    return {(proveedor_id, nombre.lower()): id_producto for id_producto, proveedor_id, nombre in consulta}
+
+
+def _columnas_actualizables(cabecera):
+    """Columnas que actualiza el import según la cabecera del CSV; los valores por defecto son solo para altas"""
+    columnas = ('nombre', 'categoria_id', 'precio') + tuple(c for c in COLUMNAS_OPCIONALES if c in cabecera)
+    return columnas + (('fecha_eliminacion',) if 'activo' in cabecera else ())
+
+
+def _escribir_lote(inserciones, actualizaciones, columnas):
+    """Escribe un lote con un executemany de INSERT y otro de UPDATE de `columnas`"""
+    tabla = Product.__table__
+    try:
+        _ejecutar_lote(tabla, inserciones, actualizaciones, columnas)
+        db.session.commit()
+    except Exception:
+        db.session.rollback()
+        raise
+
+
+def _ejecutar_lote(tabla, inserciones, actualizaciones, columnas):
+    # Los executemany no pasan por el ORM: invalidar el selector de productos en caché
+    registrar_cambio('productos')
+    if inserciones:
+        db.session.execute(tabla.insert(), inserciones)
+    if actualizaciones:
+        valores = {col: db.bindparam(f'p_{col}') for col in columnas}
+        parametros = [{f'p_{col}': fila[col] for col in ('id',) + columnas} for fila in actualizaciones]
+        if 'stock' in columnas:
+            # El total no baja de las unidades ubicadas en tiendas ni de las reservadas
+            minimo = stock_minimo(tabla.c.id_producto)
+            valores['stock'] = case((db.bindparam('p_stock') >= minimo, db.bindparam('p_stock')), else_=minimo)
+            parametros = completar_ubicadas(parametros)
+        sentencia = tabla.update().where(tabla.c.id_producto == db.bindparam('p_id')).values(**valores)
+        db.session.execute(sentencia, parametros)
+
+
+def importar_productos_csv(archivo, tamano_lote=IMPORT_BATCH_SIZE, progreso=None, max_errores=1000):
+    """
+    Importa un catálogo de productos desde un CSV (objeto de texto) en lotes.
+
+    Columnas: nombre, categoria, precio, proveedor (nombre) o proveedor_id,
+    y opcionalmente descripcion, stock, activo. Un producto se identifica por
+    (proveedor, nombre): si ya existe se actualiza, si no se crea. Al
+    actualizar solo se escriben las columnas opcionales presentes en la
+    cabecera; sus valores por defecto se usan solo al crear. Las categorías
+    que no existen se crean.
+
+    Cada lote se confirma por separado: si falla uno, los anteriores quedan
+    guardados. `progreso(resumen)` se invoca después de confirmar cada lote.
+    """
+    lector = csv.DictReader(archivo)
+    columnas = set(lector.fieldnames or [])
+    faltantes = {'nombre', 'categoria', 'precio'} - columnas
+    if faltantes or not ({'proveedor', 'proveedor_id'} & columnas):
+        raise ValueError(
+            'El CSV debe tener las columnas nombre, categoria, precio y proveedor o proveedor_id'
+        )
+
+    actualizables = _columnas_actualizables(columnas)
+    proveedores = _mapa_proveedores()
+    ids_proveedor = set(proveedores.values())
+    ultimo_id = db.session.query(db.func.max(Product.id_producto)).scalar() or 0
+    productos = _mapa_productos()
+    categorias = {}
+
+    resumen = {'leidas': 0, 'creadas': 0, 'actualizadas': 0, 'con_error': 0, 'errores': []}
+    pendientes = {}
+
+    def registrar_error(linea, errores):
+        resumen['con_error'] += 1
+        if len(resumen['errores']) < max_errores:
+            resumen['errores'].append({'linea': linea, 'errores': errores})
+
+    def confirmar_lote():
+        nonlocal ultimo_id
+        inserciones = []
+        actualizaciones = []
+        for clave, datos in pendientes.items():
+            id_producto = productos.get(clave)
+            if id_producto is None:
+                inserciones.append(datos)
+            else:
+                datos['id'] = id_producto
+                actualizaciones.append(datos)
+
+        _escribir_lote(inserciones, actualizaciones, actualizables)
+        resumen['creadas'] += len(inserciones)
+        resumen['actualizadas'] += len(actualizaciones)
+        pendientes.clear()
+
+        # Los productos recién creados deben poder actualizarse en lotes siguientes
+        if inserciones:
+            nuevos = _mapa_productos(desde_id=ultimo_id)
+            productos.update(nuevos)
+            ultimo_id = max(nuevos.values(), default=ultimo_id)
+
+        if progreso:
+            progreso(resumen)
+
+    for linea, fila in enumerate(lector, start=2):
+        resumen['leidas'] += 1
+
+        proveedor_nombre = (fila.pop('proveedor', None) or '').strip()
+        proveedor_id = (fila.pop('proveedor_id', None) or '').strip()
+        if proveedor_nombre and not proveedor_id:
+            proveedor_id = proveedores.get(proveedor_nombre.lower())
+            if proveedor_id is None:
+                registrar_error(linea, {'proveedor': f'No existe el proveedor {proveedor_nombre}'})
+                continue
+
+        categoria = (fila.pop('categoria', None) or '').strip()
+        if not 2 <= len(categoria) <= 100:
+            registrar_error(linea, {'categoria': 'Debe tener entre 2 y 100 caracteres'})
+            continue
+        if categoria.lower() not in categorias:
+            categorias.update(ids_categorias([categoria]))
+
+        fila = {col: fila.get(col) for col in COLUMNAS_PRODUCTO if fila.get(col) not in (None, '')}
+        fila['proveedor_id'] = proveedor_id
+        fila['categoria_id'] = categorias.get(categoria.lower())
+        datos, errores = PRODUCT_SCHEMA.validar(fila)
+        if not errores and datos['proveedor_id'] not in ids_proveedor:
+            errores = {'proveedor_id': f"No existe el proveedor {datos['proveedor_id']}"}
+        if errores:
+            registrar_error(linea, errores)
+            continue
+
+        datos.pop('id_producto', None)
+        datos['fecha_eliminacion'] = None if datos['activo'] else datetime.utcnow()
+        # Dentro de un lote, la última aparición de un producto prevalece
+        clave = (datos['proveedor_id'], datos['nombre'].lower())
+        pendientes[clave] = datos
+
+        if len(pendientes) >= tamano_lote:
+            confirmar_lote()
+
+    if pendientes:
+        confirmar_lote()
+
+    return resumen
@@ -0,0 +1,341 @@
+from flask import current_app
+from sqlalchemy import func
+from app import db
+from app.models import Product, Store, StoreInventory
+from app.schemas import STOCK_SCHEMA, TRANSFER_SCHEMA
+from app.services.bulk_service import IN_CHUNK_SIZE, insert_on_conflict, valores_existentes
+from app.services.shard_service import federar
+from app.utils.helpers import chunked
+from app.utils.shards import en_tienda, stock_pendiente
+
+_inventario = StoreInventory.__table__
+_productos = Product.__table__
+
+
+def en_tiendas(id_producto):
+    """
+    Unidades del producto ubicadas en tiendas, para usar dentro de una sentencia:
+    subconsulta correlacionada o, en modo por tienda (el inventario está en otros
+    archivos), el parámetro p_ubicado que agrega completar_ubicadas()
+    """
+    if current_app.config.get('STORE_SHARDING'):
+        return db.bindparam('p_ubicado')
+    return db.select(func.coalesce(func.sum(_inventario.c.stock), 0)) \
+        .where(_inventario.c.id_producto == id_producto).scalar_subquery()
+
+
+def stock_minimo(id_producto):
+    """
+    Mínimo al que puede bajar el total de un producto dentro de una sentencia:
+    lo ubicado en tiendas o lo reservado por órdenes pendientes, lo que sea mayor
+    """
+    ubicado = en_tiendas(id_producto)
+    return db.case((ubicado >= _productos.c.reservado, ubicado), else_=_productos.c.reservado)
+
+
+def ubicadas(ids_producto):
+    """{id_producto: unidades en tiendas}, sumando la BD de cada tienda en modo por tienda"""
+    ids_producto = set(ids_producto)
+    resultado = {}
+    for bloque in chunked(ids_producto, IN_CHUNK_SIZE):
+        consulta = db.select(_inventario.c.id_producto, func.sum(_inventario.c.stock)) \
+            .where(_inventario.c.id_producto.in_(bloque)).group_by(_inventario.c.id_producto)
+        for id_producto, stock in federar(consulta):
+            resultado[id_producto] = resultado.get(id_producto, 0) + stock
+    # Lo vendido sin consolidar sigue contado en productos.stock: es de las tiendas hasta descontarse
+    for id_producto, unidades in vendidas_sin_consolidar(ids_producto).items():
+        resultado[id_producto] = resultado.get(id_producto, 0) + unidades
+    return resultado
+
+
+def vendidas_sin_consolidar(ids_producto):
+    """
+    {id_producto: unidades vendidas en las tiendas que productos.stock aún no
+    descuenta} (pendiente_stock, ver consolidar_tiendas); vacío sin modo por tienda
+    """
+    resultado = {}
+    if not current_app.config.get('STORE_SHARDING'):
+        return resultado
+    for bloque in chunked(set(ids_producto), IN_CHUNK_SIZE):
+        consulta = db.select(stock_pendiente.c.id_producto, stock_pendiente.c.unidades) \
+            .where(stock_pendiente.c.id_producto.in_(bloque))
+        for id_producto, unidades in federar(consulta):
+            resultado[id_producto] = resultado.get(id_producto, 0) + unidades
+    return resultado
+
+
+def completar_ubicadas(parametros, clave='p_id'):
+    """En modo por tienda agrega p_ubicado (ver en_tiendas) a los parámetros de un executemany"""
+    if current_app.config.get('STORE_SHARDING'):
+        ubicado = ubicadas(p[clave] for p in parametros)
+        for p in parametros:
+            p['p_ubicado'] = ubicado.get(p[clave], 0)
+    return parametros
+
+
+def stock_tienda(tienda_id, ids_producto):
+    """{id_producto: unidades en la tienda} por la clave (tienda_id, id_producto)"""
+    stock = {}
+    with en_tienda(tienda_id):
+        for bloque in chunked(set(ids_producto), IN_CHUNK_SIZE):
+            stock.update(db.session.query(StoreInventory.id_producto, StoreInventory.stock)
+                         .filter(StoreInventory.tienda_id == tienda_id, StoreInventory.id_producto.in_(bloque)))
+    return stock
+
+
+def _sumar_en_tienda(tienda_id, cantidades):
+    """Suma unidades a las filas (tienda, producto), creándolas si no existen"""
+    sentencia = insert_on_conflict(_inventario)
+    sentencia = sentencia.on_conflict_do_update(
+        index_elements=['tienda_id', 'id_producto'],
+        set_={'stock': _inventario.c.stock + sentencia.excluded.stock},
+    )
+    with en_tienda(tienda_id):
+        db.session.execute(sentencia, [{'tienda_id': tienda_id, 'id_producto': p, 'stock': c}
+                                       for p, c in sorted(cantidades.items())])
+
+
+def _restar_de_tienda(tienda_id, cantidades, mensaje):
+    """UPDATE condicional por producto; ValueError si alguna fila no tiene las unidades"""
+    with en_tienda(tienda_id):
+        restadas = db.session.execute(
+            _inventario.update().where(
+                _inventario.c.tienda_id == tienda_id,
+                _inventario.c.id_producto == db.bindparam('p_id'),
+                _inventario.c.stock >= db.bindparam('p_cantidad'),
+            ).values(stock=_inventario.c.stock - db.bindparam('p_cantidad')),
+            [{'p_id': p, 'p_cantidad': c} for p, c in sorted(cantidades.items())],
+        ).rowcount
+    if restadas != -1 and restadas < len(cantidades):
+        raise ValueError(mensaje)
+
+
+def descontar_venta(tienda_id, cantidades):
+    """
+    Descuenta unidades vendidas en una tienda, de su inventario y del total
+    del producto, con UPDATE condicionales: la tienda debe tenerlas y el
+    total no puede tocar lo reservado. Lanza ValueError si no alcanzan.
+    No confirma la transacción.
+
+    En modo por tienda el total no se toca: las unidades se suman a
+    pendiente_stock en la BD de la tienda, así la venta no escribe la BD
+    principal, y consolidar_tiendas las descuenta después.
+    """
+    cantidades = {p: c for p, c in cantidades.items() if c}
+    if not cantidades:
+        return
+    _restar_de_tienda(tienda_id, cantidades, 'Stock insuficiente en la tienda, intente de nuevo')
+    if current_app.config.get('STORE_SHARDING'):
+        with en_tienda(tienda_id):
+            _acumular_descuento(cantidades)
+        return
+    descontadas = db.session.execute(
+        _productos.update().where(
+            _productos.c.id_producto == db.bindparam('p_id'),
+            func.coalesce(_productos.c.stock, 0) - _productos.c.reservado >= db.bindparam('p_cantidad'),
+        ).values(stock=_productos.c.stock - db.bindparam('p_cantidad')),
+        [{'p_id': p, 'p_cantidad': c} for p, c in sorted(cantidades.items())],
+    ).rowcount
+    if descontadas != -1 and descontadas < len(cantidades):
+        raise ValueError('El stock cambió durante la operación, intente de nuevo')
+
+
+def _acumular_descuento(cantidades):
+    """
+    Suma las unidades vendidas a pendiente_stock de la tienda activa si el total
+    menos lo ya pendiente en ella cubre lo reservado. Va después del UPDATE del
+    inventario de la tienda, que ya tiene su bloqueo de escritura: las ventas de
+    la misma tienda leen lo pendiente de una en una. Lo pendiente de otras
+    tiendas no se ve hasta consolidarlo.
+    """
+    libres = dict(db.session.execute(
+        db.select(_productos.c.id_producto,
+                  func.coalesce(_productos.c.stock, 0) - _productos.c.reservado
+                  - func.coalesce(stock_pendiente.c.unidades, 0))
+        .outerjoin(stock_pendiente, stock_pendiente.c.id_producto == _productos.c.id_producto)
+        .where(_productos.c.id_producto.in_(sorted(cantidades)))
+    ).all())
+    if any(libres.get(p, 0) < c for p, c in cantidades.items()):
+        raise ValueError('El stock cambió durante la operación, intente de nuevo')
+    sentencia = insert_on_conflict(stock_pendiente)
+    sentencia = sentencia.on_conflict_do_update(
+        index_elements=['id_producto'],
+        set_={'unidades': stock_pendiente.c.unidades + sentencia.excluded.unidades},
+    )
+    db.session.execute(sentencia, [{'id_producto': p, 'unidades': c} for p, c in sorted(cantidades.items())])
+
+
+def ingresar(tienda_id, cantidades):
+    """Suma unidades recibidas al total y a la tienda (None = bodega central); no confirma"""
+    cantidades = {p: c for p, c in cantidades.items() if c}
+    if not cantidades:
+        return
+    db.session.execute(
+        _productos.update().where(_productos.c.id_producto == db.bindparam('p_id'))
+        .values(stock=func.coalesce(_productos.c.stock, 0) + db.bindparam('p_cantidad')),
+        [{'p_id': p, 'p_cantidad': c} for p, c in sorted(cantidades.items())],
+    )
+    if tienda_id is not None:
+        _sumar_en_tienda(tienda_id, cantidades)
+
+
+def transferir(origen, destino, cantidades):
+    """
+    Mueve unidades entre tiendas; None representa la bodega central. El total
+    del producto no cambia. Lanza ValueError si el origen no tiene las
+    unidades. No confirma la transacción.
+    """
+    if origen == destino:
+        raise ValueError('El origen y el destino deben ser distintos')
+    cantidades = {p: c for p, c in cantidades.items() if c}
+    if not cantidades:
+        return
+    if origen is None:
+        # UPDATE sin cambios que solo alcanza a los productos con unidades suficientes
+        # en bodega; además bloquea sus filas hasta el final de la transacción
+        cubiertas = db.session.execute(
+            _productos.update().where(
+                _productos.c.id_producto == db.bindparam('p_id'),
+                func.coalesce(_productos.c.stock, 0) - en_tiendas(_productos.c.id_producto)
+                >= db.bindparam('p_cantidad'),
+            ).values(stock=_productos.c.stock),
+            completar_ubicadas([{'p_id': p, 'p_cantidad': c} for p, c in sorted(cantidades.items())]),
+        ).rowcount
+        if cubiertas != -1 and cubiertas < len(cantidades):
+            raise ValueError('Stock insuficiente en bodega central')
+    else:
+        _restar_de_tienda(origen, cantidades, f'Stock insuficiente en la tienda {origen}')
+    if destino is not None:
+        _sumar_en_tienda(destino, cantidades)
+
+
+
+def transferir_lote(origen, destino, filas):
+    """
+    Valida y aplica una transferencia {'id_producto', 'cantidad'} por fila
+    entre dos tiendas activas (None = bodega central), todo o nada.
+    Lanza ValueError si el origen no tiene las unidades.
+    """
+    errores = {}
+    for campo, tienda_id in (('origen', origen), ('destino', destino)):
+        if tienda_id is not None and not Store.get_activas().filter_by(id_tienda=tienda_id).count():
+            errores.setdefault(-1, {})[campo] = f'No existe la tienda activa {tienda_id}'
+
+    validas = []
+    for indice, fila in enumerate(filas):
+        datos, errores_fila = TRANSFER_SCHEMA.validar(fila)
+        if errores_fila:
+            errores[indice] = errores_fila
+        else:
+            validas.append((indice, datos))
+
+    existentes = valores_existentes(Product.id_producto, [d['id_producto'] for _, d in validas])
+    cantidades = {}
+    for indice, datos in validas:
+        if datos['id_producto'] not in existentes:
+            errores[indice] = {'id_producto': f"No existe el producto {datos['id_producto']}"}
+        else:
+            cantidades[datos['id_producto']] = cantidades.get(datos['id_producto'], 0) + datos['cantidad']
+
+    resultado = {
+        'procesadas': len(filas),
+        'actualizadas': 0,
+        'errores': [{'fila': i, 'errores': errores[i]} for i in sorted(errores)]
+    }
+    if errores:
+        return resultado
+
+    try:
+        transferir(origen, destino, cantidades)
+        db.session.commit()
+    except Exception:
+        db.session.rollback()
+        raise
+
+    resultado['actualizadas'] = len(cantidades)
+    return resultado
+
+def ajustar_stock_masivo(filas, parcial=False):
+    """
+    Fija o ajusta el stock de muchos productos en una sola transacción.
+
+    Cada fila lleva 'id_producto' y exactamente uno de 'stock' (valor absoluto)
+    o 'delta' (unidades a sumar o restar). Las unidades ubicadas en tiendas
+    no se tocan y lo reservado por órdenes pendientes tampoco: el total no puede
+    bajar de lo mayor de ambos. Los ajustes se aplican con
+    un UPDATE condicional para no dejar stock negativo ante ventas concurrentes.
+    """
+    errores = {}
+    fijar = []
+    ajustar = []
+
+    for indice, fila in enumerate(filas):
+        datos, errores_fila = STOCK_SCHEMA.validar(fila)
+        if not errores_fila and (datos['stock'] is None) == (datos['delta'] is None):
+            errores_fila = {'_fila': "Debe indicar 'stock' o 'delta', no ambos"}
+        if errores_fila:
+            errores[indice] = errores_fila
+        elif datos['stock'] is not None:
+            fijar.append((indice, datos))
+        else:
+            ajustar.append((indice, datos))
+
+    # Stock actual de todos los productos del lote, en bloques IN
+    ids = {d['id_producto'] for _, d in fijar + ajustar}
+    stock_actual = {}
+    ubicado_actual = ubicadas(ids)
+    for bloque in chunked(ids, IN_CHUNK_SIZE):
+        stock_actual.update(
+            (id_producto, ((stock or 0), ubicado_actual.get(id_producto, 0), reservado))
+            for id_producto, stock, reservado in
+            db.session.query(Product.id_producto, Product.stock, Product.reservado).filter(Product.id_producto.in_(bloque))
+        )
+
+    for indice, datos in fijar + ajustar:
+        actual = stock_actual.get(datos['id_producto'])
+        if actual is None:
+            errores[indice] = {'id_producto': f"No existe el producto {datos['id_producto']}"}
+            continue
+        stock, ubicado, reservado = actual
+        minimo = max(ubicado, reservado)
+        if datos['stock'] is not None and datos['stock'] < minimo:
+            errores[indice] = {'stock': f'No puede ser menor que las unidades en tiendas ({ubicado}) '
+                                        f'ni que las reservadas ({reservado})'}
+        elif datos['delta'] is not None and stock - minimo + datos['delta'] < 0:
+            errores[indice] = {'delta': f'Stock insuficiente: se pueden restar {stock - minimo} unidades '
+                                        f'sin tocar las ubicadas en tiendas ni las reservadas'}
+
+    resultado = {
+        'procesadas': len(filas),
+        'actualizadas': 0,
+        'errores': [{'fila': i, 'errores': errores[i]} for i in sorted(errores)]
+    }
+
+    if errores and not parcial:
+        return resultado
+
+    valores_fijos = [{'id_producto': d['id_producto'], 'stock': d['stock']}
+                     for i, d in fijar if i not in errores]
+    # p_ubicado solo se usa en modo por tienda (ver en_tiendas)
+    deltas = [{'p_id': d['id_producto'], 'p_delta': d['delta'], 'p_ubicado': stock_actual[d['id_producto']][1]}
+              for i, d in ajustar if i not in errores]
+
+    try:
+        if valores_fijos:
+            db.session.bulk_update_mappings(Product, valores_fijos)
+        if deltas:
+            tabla = _productos
+            sentencia = tabla.update().where(
+                tabla.c.id_producto == db.bindparam('p_id'),
+                db.func.coalesce(tabla.c.stock, 0) - stock_minimo(tabla.c.id_producto) + db.bindparam('p_delta') >= 0
+            ).values(stock=db.func.coalesce(tabla.c.stock, 0) + db.bindparam('p_delta'))
+            filas_afectadas = db.session.execute(sentencia, deltas).rowcount
+            if filas_afectadas != -1 and filas_afectadas < len(deltas):
+                raise ValueError('El stock cambió durante el ajuste, intente de nuevo')
+        db.session.commit()
+    except Exception:
+        db.session.rollback()
+        raise
+
+    resultado['actualizadas'] = len(valores_fijos) + len(deltas)
+    return resultado
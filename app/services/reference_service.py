@@ -0,0 +1,109 @@
+import threading
+from flask import current_app, g
+from sqlalchemy import event
+from sqlalchemy.orm import Session
+from app import db
+from app.models import City, Store, Supplier, Role, Product, TableVersion
+
+# Tabla -> (modelo, columna id) de los datos de referencia que se cachean
+REFERENCIAS = {
+    'ciudades': (City, City.id_ciudad),
+    'tiendas': (Store, Store.id_tienda),
+    'proveedores': (Supplier, Supplier.id_proveedor),
+    'roles': (Role, Role.id_rol),
+    'productos': (Product, Product.id_producto),
+}
+# Tablas con contador: las de referencia y los agregados que se reconstruyen en bloque
+VERSIONADAS = set(REFERENCIAS) | {'ventas_producto_dia'}
+
+_lock = threading.Lock()
+_tabla_version = TableVersion.__table__
+
+
+def asegurar_versiones():
+    """Crea las filas de contador que falten (una por tabla versionada)"""
+    existentes = {t for (t,) in db.session.query(TableVersion.tabla)}
+    faltantes = [{'tabla': t, 'version': 0} for t in sorted(VERSIONADAS) if t not in existentes]
+    if faltantes:
+        db.session.execute(_tabla_version.insert(), faltantes)
+        db.session.commit()
+
+
+def _incrementar(conexion, tablas):
+    tablas = sorted(set(tablas) & VERSIONADAS)
+    if not tablas:
+        return
+    resultado = conexion.execute(
+        _tabla_version.update().where(_tabla_version.c.tabla.in_(tablas))
+        .values(version=_tabla_version.c.version + 1)
+    )
+    if resultado.rowcount < len(tablas):
+        existentes = {t for (t,) in conexion.execute(
+            db.select(_tabla_version.c.tabla).where(_tabla_version.c.tabla.in_(tablas)))}
+        conexion.execute(_tabla_version.insert(),
+                         [{'tabla': t, 'version': 1} for t in tablas if t not in existentes])
+
+
+def registrar_cambio(*tablas):
+    """
+    Incrementa el contador de las tablas dadas dentro de la transacción actual.
+    Necesario en escrituras que no pasan por el unit of work del ORM
+    (executemany, bulk_insert_mappings); las demás se detectan en after_flush.
+    """
+    _incrementar(db.session.connection(), tablas)
+
+
+def _despues_de_flush(session, contexto):
+    tablas = {
+        getattr(obj, '__tablename__', None)
+        for obj in list(session.new) + list(session.dirty) + list(session.deleted)
+    }
+    tablas.discard(None)
+    # Solo las de referencia: los agregados cambian con cada venta y se versionan a mano
+    tablas &= set(REFERENCIAS)
+    if tablas:
+        _incrementar(session.connection(), tablas)
+
+
+def registrar_eventos():
+    if not event.contains(Session, 'after_flush', _despues_de_flush):
+        event.listen(Session, 'after_flush', _despues_de_flush)
+
+
+def _versiones():
+    """Versión de cada tabla, leída una sola vez por contexto de app (petición)"""
+    if '_versiones_referencia' not in g:
+        g._versiones_referencia = dict(db.session.query(TableVersion.tabla, TableVersion.version))
+    return g._versiones_referencia
+
+
+def version(tabla):
+    """Versión actual del contador de una tabla versionada"""
+    return _versiones().get(tabla, 0)
+
+
+def _filas(tabla):
+    """(id, nombre, activo) ordenadas por nombre, recargadas solo si cambió la versión"""
+    version_tabla = version(tabla)
+    cache = current_app.extensions.setdefault('referencias_cache', {})
+    with _lock:
+        entrada = cache.get(tabla)
+        if entrada is None or entrada[0] != version_tabla:
+            modelo, pk = REFERENCIAS[tabla]
+            filas = db.session.query(pk, modelo.nombre, modelo.activo).order_by(modelo.nombre).all()
+            entrada = (version_tabla, [tuple(f) for f in filas])
+            cache[tabla] = entrada
+        return entrada[1]
+
+
+def opciones(tabla, activos=False, vacia=None):
+    """
+    Lista de (id, nombre) para los `choices` de un SelectField.
+
+    `activos` excluye los registros desactivados y `vacia` antepone una
+    opción (-1, texto) para selects opcionales.
+    """
+    resultado = [(id_, nombre) for id_, nombre, activo in _filas(tabla) if activo or not activos]
+    if vacia:
+        resultado.insert(0, (-1, vacia))
+    return resultado
@@ -0,0 +1,245 @@
+import heapq
+import math
+import threading
+import time
+from array import array
+from datetime import datetime
+from flask import current_app
+from sqlalchemy import func
+from app import db
+from app.models import Sale, SaleProduct, Store, Staff, Product, Category, ProductDailySales
+from app.services.bulk_service import IN_CHUNK_SIZE
+from app.services.reference_service import version
+from app.services.shard_service import federar, ids_tiendas
+from app.utils.helpers import chunked
+from app.utils.shards import motor_tienda
+
+# Filas por lote al recorrer los totales de las ventas
+LOTE_REPORTE = 10000
+PERCENTILES = (50, 90, 95, 99)
+# Importe acumulado (%) hasta el que un producto es clase A y clase B
+CORTES_ABC = (80, 95)
+
+_lock = threading.Lock()
+
+
+def _totales_ordenados(consulta):
+    """
+    Recorre por lotes (yield_per) una consulta de una columna ya ordenada; en
+    modo por tienda mezcla los flujos de cada tienda sin perder el orden.
+    """
+    consulta = consulta.execution_options(yield_per=LOTE_REPORTE)
+    if not current_app.config.get('STORE_SHARDING'):
+        # Core sobre la conexión de la sesión: sin el procesamiento de filas del ORM
+        yield from db.session.connection().execute(consulta).scalars()
+        return
+
+    conexiones = [motor_tienda(t).connect() for t in ids_tiendas()]
+    try:
+        yield from heapq.merge(*(c.execute(consulta).scalars() for c in conexiones))
+    finally:
+        for conexion in conexiones:
+            conexion.close()
+
+
+def _acumular(por_clave, clave, ventas, unidades, centavos):
+    acumulado = por_clave.setdefault(clave, [0, 0, 0])
+    acumulado[0] += ventas
+    acumulado[1] += unidades or 0
+    acumulado[2] += centavos or 0
+
+
+def _desglose(por_clave, columna_id, columna_nombre):
+    """Filas del desglose con el nombre de cada clave, de mayor a menor importe"""
+    nombres = {}
+    for bloque in chunked(por_clave, IN_CHUNK_SIZE):
+        nombres.update(db.session.query(columna_id, columna_nombre).filter(columna_id.in_(bloque)))
+    filas = [{'id': clave, 'nombre': nombres.get(clave), 'ventas': ventas,
+              'unidades': unidades, 'total_centavos': centavos}
+             for clave, (ventas, unidades, centavos) in por_clave.items()]
+    return sorted(filas, key=lambda f: (-f['total_centavos'], f['id']))
+
+
+def percentil(ordenados, p):
+    """Percentil por rango más cercano de un array ya ordenado"""
+    if not ordenados:
+        return 0
+    return ordenados[max(0, math.ceil(p / 100 * len(ordenados)) - 1)]
+
+
+def reporte_ventas(desde, hasta, percentiles=PERCENTILES):
+    """
+    Totales, ticket promedio, percentiles y desgloses por tienda, vendedor y
+    producto de las ventas activas entre dos fechas, en centavos.
+
+    Los desgloses salen de dos GROUP BY en SQL (uno por tienda en modo por
+    tienda) y los totales de cada venta llegan ya ordenados, por lotes, a un
+    array('q') de 8 bytes por venta del que salen la suma y los percentiles.
+    """
+    en_rango = (Sale.fecha >= desde, Sale.fecha <= hasta, Sale.activo.is_(True))
+
+    ordenados = array('q', _totales_ordenados(
+        db.select(Sale.total_centavos).where(*en_rango).order_by(Sale.total_centavos)))
+    total = sum(ordenados)
+    ventas = len(ordenados)
+
+    # Una sola pasada por las líneas, agrupada por tienda, vendedor y producto;
+    # cada producto aparece una vez por venta, así que sus filas cuentan ventas
+    por_linea = federar(
+        db.select(Sale.tienda_id, Sale.empleado_id, SaleProduct.id_producto, func.count(),
+                  func.sum(SaleProduct.cantidad),
+                  func.sum(SaleProduct.cantidad * SaleProduct.precio_unitario_centavos))
+        .join(Sale, Sale.id_venta == SaleProduct.id_venta).where(*en_rango)
+        .group_by(Sale.tienda_id, Sale.empleado_id, SaleProduct.id_producto))
+    por_venta = federar(
+        db.select(Sale.tienda_id, Sale.empleado_id, func.count()).where(*en_rango)
+        .group_by(Sale.tienda_id, Sale.empleado_id))
+
+    por_tienda, por_vendedor, por_producto = {}, {}, {}
+    for tienda_id, empleado_id, conteo in por_venta:
+        _acumular(por_tienda, tienda_id, conteo, 0, 0)
+        _acumular(por_vendedor, empleado_id, conteo, 0, 0)
+    for tienda_id, empleado_id, id_producto, conteo, unidades, centavos in por_linea:
+        _acumular(por_tienda, tienda_id, 0, unidades, centavos)
+        _acumular(por_vendedor, empleado_id, 0, unidades, centavos)
+        _acumular(por_producto, id_producto, conteo, unidades, centavos)
+
+    return {
+        'desde': desde,
+        'hasta': hasta,
+        'ventas': ventas,
+        'total_centavos': total,
+        'ticket_promedio': (total * 2 + ventas) // (ventas * 2) if ventas else 0,
+        'unidades': sum(f[1] for f in por_tienda.values()),
+        'percentiles': {p: percentil(ordenados, p) for p in percentiles},
+        'por_tienda': _desglose(por_tienda, Store.id_tienda, Store.nombre),
+        'por_vendedor': _desglose(por_vendedor, Staff.id_empleado, Staff.nombre),
+        'por_producto': _desglose(por_producto, Product.id_producto, Product.nombre),
+    }
+
+
+def _en_cache(clave, hasta, calcular):
+    """
+    Resultado de una consulta de analítica en caché por periodo. El que
+    incluye hoy (en UTC como las ventas) caduca a los ANALYTICS_CACHE_TTL
+    segundos; un periodo cerrado a los ANALYTICS_CLOSED_CACHE_TTL, por si se
+    anula o corrige una venta pasada. Reconstruir el agregado sube su versión
+    (versiones_tabla) y descarta los resultados de todos los procesos.
+    Como mucho ANALYTICS_CACHE_SIZE entradas: al llenarse sale la más antigua.
+    """
+    cache = current_app.extensions.setdefault('analitica_cache', {})
+    version_agregado = version('ventas_producto_dia')
+    ahora = time.monotonic()
+    with _lock:
+        entrada = cache.get(clave)
+        if entrada is not None and entrada[0] == version_agregado and ahora < entrada[1]:
+            return entrada[2]
+    resultado = calcular()
+    ttl = current_app.config.get('ANALYTICS_CACHE_TTL', 60) if hasta >= datetime.utcnow().date() \
+        else current_app.config.get('ANALYTICS_CLOSED_CACHE_TTL', 3600)
+    with _lock:
+        cache.pop(clave, None)
+        while len(cache) >= current_app.config.get('ANALYTICS_CACHE_SIZE', 256):
+            del cache[next(iter(cache))]
+        cache[clave] = (version_agregado, ahora + ttl, resultado)
+    return resultado
+
+
+def _agregado(desde, hasta, tienda_id, *columnas):
+    """SELECT sobre ventas_producto_dia en [desde, hasta] y, si se indica, de una tienda"""
+    consulta = db.select(*columnas).where(ProductDailySales.fecha >= desde, ProductDailySales.fecha <= hasta)
+    if tienda_id is not None:
+        consulta = consulta.where(ProductDailySales.tienda_id == tienda_id)
+    return consulta
+
+
+def _sumas():
+    return (func.sum(ProductDailySales.ventas).label('ventas'),
+            func.sum(ProductDailySales.unidades).label('unidades'),
+            func.sum(ProductDailySales.importe_centavos).label('importe_centavos'))
+
+
+def top_productos(desde, hasta, tienda_id=None, limite=10, criterio='importe', por_tienda=False):
+    """
+    Los `limite` productos más vendidos entre dos fechas (por importe o por
+    unidades), leídos solo del agregado por día. Con `por_tienda` devuelve el
+    ranking de cada tienda: {tienda_id: [...]}.
+    """
+    def calcular():
+        ventas, unidades, importe = _sumas()
+        orden = (unidades if criterio == 'unidades' else importe).desc()
+        claves = (ProductDailySales.tienda_id,) if por_tienda else ()
+        agrupado = _agregado(desde, hasta, tienda_id, *claves, ProductDailySales.id_producto,
+                             ventas, unidades, importe) \
+            .group_by(*claves, ProductDailySales.id_producto)
+        if por_tienda:
+            # ROW_NUMBER por tienda: el límite se aplica dentro de cada ranking
+            puesto = func.row_number().over(partition_by=ProductDailySales.tienda_id,
+                                            order_by=(orden, ProductDailySales.id_producto)).label('puesto')
+            ranking = agrupado.add_columns(puesto).subquery()
+            consulta = db.select(ranking, Product.nombre).join(Product, Product.id_producto == ranking.c.id_producto) \
+                .where(ranking.c.puesto <= limite).order_by(ranking.c.tienda_id, ranking.c.puesto)
+        else:
+            ranking = agrupado.order_by(orden, ProductDailySales.id_producto).limit(limite).subquery()
+            consulta = db.select(ranking, Product.nombre).join(Product, Product.id_producto == ranking.c.id_producto) \
+                .order_by((ranking.c.unidades if criterio == 'unidades' else ranking.c.importe_centavos).desc(),
+                          ranking.c.id_producto)
+        filas = [{'id_producto': f.id_producto, 'nombre': f.nombre, 'ventas': f.ventas,
+                  'unidades': f.unidades, 'importe_centavos': f.importe_centavos,
+                  **({'tienda_id': f.tienda_id} if por_tienda else {})}
+                 for f in db.session.execute(consulta)]
+        if not por_tienda:
+            return filas
+        por_clave = {}
+        for fila in filas:
+            por_clave.setdefault(fila.pop('tienda_id'), []).append(fila)
+        return por_clave
+
+    return _en_cache(('top', desde, hasta, tienda_id, limite, criterio, por_tienda), hasta, calcular)
+
+
+def mezcla_categorias(desde, hasta, tienda_id=None):
+    """Unidades, importe y participación (fracción del importe) de cada categoría, desde el agregado"""
+    def calcular():
+        ventas, unidades, importe = _sumas()
+        consulta = _agregado(desde, hasta, tienda_id, Category.id_categoria, Category.nombre, unidades, importe) \
+            .join(Product, Product.id_producto == ProductDailySales.id_producto) \
+            .join(Category, Category.id_categoria == Product.categoria_id) \
+            .group_by(Category.id_categoria, Category.nombre)
+        filas = db.session.execute(consulta).all()
+        total = sum(f.importe_centavos or 0 for f in filas)
+        return sorted(({'id_categoria': f.id_categoria, 'nombre': f.nombre, 'unidades': f.unidades or 0,
+                        'importe_centavos': f.importe_centavos or 0,
+                        'participacion': round((f.importe_centavos or 0) / total, 4) if total else 0}
+                       for f in filas), key=lambda f: (-f['importe_centavos'], f['id_categoria']))
+
+    return _en_cache(('categorias', desde, hasta, tienda_id), hasta, calcular)
+
+
+def clasificacion_abc(desde, hasta, tienda_id=None, cortes=CORTES_ABC):
+    """
+    Clasificación ABC por importe: los productos que acumulan hasta el
+    primer corte (%) del importe son A, hasta el segundo B y el resto C.
+    Devuelve un resumen por clase y la clase de cada producto vendido.
+    """
+    def calcular():
+        ventas, unidades, importe = _sumas()
+        consulta = _agregado(desde, hasta, tienda_id, ProductDailySales.id_producto, importe) \
+            .group_by(ProductDailySales.id_producto) \
+            .order_by(importe.desc(), ProductDailySales.id_producto)
+        filas = db.session.execute(consulta).all()
+        total = sum(f.importe_centavos for f in filas)
+        clases = {c: {'productos': 0, 'importe_centavos': 0} for c in 'ABC'}
+        productos = []
+        acumulado = 0
+        for id_producto, centavos in filas:
+            # La clase depende del acumulado antes del producto: el que cruza el corte aún entra
+            porcentaje = acumulado * 100 / total if total else 100
+            clase = 'A' if porcentaje < cortes[0] else 'B' if porcentaje < cortes[1] else 'C'
+            acumulado += centavos
+            clases[clase]['productos'] += 1
+            clases[clase]['importe_centavos'] += centavos
+            productos.append({'id_producto': id_producto, 'importe_centavos': centavos, 'clase': clase})
+        return {'total_centavos': total, 'cortes': list(cortes), 'clases': clases, 'productos': productos}
+
+    return _en_cache(('abc', desde, hasta, tienda_id, tuple(cortes)), hasta, calcular)
@@ -0,0 +1,90 @@
+from datetime import datetime, timedelta
+from flask import current_app
+from app import db
+from app.models import StockReservation, ClientOrderProduct, Product
+from app.services.inventory_service import vendidas_sin_consolidar
+
+_reservas = StockReservation.__table__
+_productos = Product.__table__
+
+
+def _ajustar_reservado(cantidades, condicional=False):
+    """
+    Suma {id_producto: delta} a productos.reservado con un UPDATE executemany.
+    Con `condicional` solo aplica si queda stock libre y lanza ValueError si no.
+    """
+    filas = [{'p_id': p, 'p_delta': d} for p, d in sorted(cantidades.items()) if d]
+    if not filas:
+        return
+    sentencia = _productos.update().where(_productos.c.id_producto == db.bindparam('p_id'))
+    if condicional:
+        libre = db.func.coalesce(_productos.c.stock, 0) - _productos.c.reservado
+        if current_app.config.get('STORE_SHARDING'):
+            # Lo vendido en las tiendas y aún no consolidado sigue contado en productos.stock
+            vendidas = vendidas_sin_consolidar(f['p_id'] for f in filas)
+            for fila in filas:
+                fila['p_vendidas'] = vendidas.get(fila['p_id'], 0)
+            libre = libre - db.bindparam('p_vendidas')
+        sentencia = sentencia.where(libre >= db.bindparam('p_delta'))
+    afectadas = db.session.execute(
+        sentencia.values(reservado=_productos.c.reservado + db.bindparam('p_delta')), filas
+    ).rowcount
+    if condicional and afectadas != -1 and afectadas < len(filas):
+        raise ValueError('Stock disponible insuficiente para reservar la orden')
+
+
+def _borrar(condicion):
+    """Elimina reservas y devuelve {id_producto: unidades liberadas} (DELETE ... RETURNING)"""
+    liberadas = {}
+    for id_producto, cantidad in db.session.execute(
+            _reservas.delete().where(condicion).returning(_reservas.c.id_producto, _reservas.c.cantidad)):
+        liberadas[id_producto] = liberadas.get(id_producto, 0) + cantidad
+    return liberadas
+
+
+def reservar_orden(orden_id, ttl=None):
+    """
+    Ajusta las reservas de una orden pendiente a sus líneas actuales y renueva
+    su vencimiento. Solo toca los productos cuya cantidad cambió; no confirma
+    la transacción.
+    """
+    ttl = ttl or timedelta(hours=current_app.config.get('RESERVATION_TTL_HOURS', 48))
+    lineas = dict(db.session.query(ClientOrderProduct.id_producto, ClientOrderProduct.cantidad)
+                  .filter(ClientOrderProduct.id_orden_cliente == orden_id))
+    anteriores = _borrar(_reservas.c.id_orden_cliente == orden_id)
+
+    cambios = {p: lineas.get(p, 0) - anteriores.get(p, 0) for p in set(lineas) | set(anteriores)}
+    _ajustar_reservado({p: d for p, d in cambios.items() if d < 0})
+    _ajustar_reservado({p: d for p, d in cambios.items() if d > 0}, condicional=True)
+
+    if lineas:
+        ahora = datetime.utcnow()
+        db.session.execute(_reservas.insert(), [
+            {'id_orden_cliente': orden_id, 'id_producto': p, 'cantidad': c, 'fecha': ahora, 'expira': ahora + ttl}
+            for p, c in lineas.items()
+        ])
+
+
+def liberar_reservas(orden_ids):
+    """Libera las reservas de las órdenes dadas; no confirma la transacción"""
+    orden_ids = list(orden_ids)
+    if not orden_ids:
+        return {}
+    liberadas = _borrar(_reservas.c.id_orden_cliente.in_(orden_ids))
+    _ajustar_reservado({p: -c for p, c in liberadas.items()})
+    return liberadas
+
+
+def barrer_reservas_vencidas(ahora=None):
+    """Libera las reservas vencidas (por el índice de `expira`) y confirma; devuelve cuántas unidades"""
+    liberadas = _borrar(_reservas.c.expira <= (ahora or datetime.utcnow()))
+    _ajustar_reservado({p: -c for p, c in liberadas.items()})
+    db.session.commit()
+    return sum(liberadas.values())
+
+
+def disponibilidad(ids_producto):
+    """{id_producto: (stock, reservado)} leyendo solo las filas de producto"""
+    return {p: (stock or 0, reservado) for p, stock, reservado in
+            db.session.query(Product.id_producto, Product.stock, Product.reservado)
+            .filter(Product.id_producto.in_(ids_producto))}
@@ -0,0 +1,204 @@
+from flask import current_app
+from sqlalchemy import case, func
+from sqlalchemy.exc import IntegrityError
+from app import db
+from app.models import Sale, SaleProduct, Client, ClientSummary, ProductDailySales
+from app.services.bulk_service import IN_CHUNK_SIZE, insert_on_conflict
+from app.services.reference_service import registrar_cambio
+from app.services.shard_service import federar, descartar_pendientes
+from app.utils.helpers import chunked, dia, fecha_de
+from app.utils.shards import tabla_acumulada
+
+_resumen = ClientSummary.__table__
+_por_dia = ProductDailySales.__table__
+
+
+def registrar_compra(cliente_id, total_centavos, fecha, compras=1):
+    """
+    Suma una venta (importe en centavos) al resumen del cliente dentro de la
+    transacción actual.
+
+    Es un UPDATE incremental sobre una sola fila; la fila se crea con la
+    primera compra. Con `compras=0` solo ajusta el total (p. ej. al agregar
+    productos a una venta ya registrada). En modo por tienda se suma en la BD
+    de la tienda (ver tabla_acumulada).
+    """
+    resumen = tabla_acumulada(_resumen)
+    conexion = db.session.connection()
+    resultado = conexion.execute(
+        resumen.update().where(resumen.c.cliente_id == cliente_id).values(
+            total_gastado_centavos=resumen.c.total_gastado_centavos + total_centavos,
+            num_compras=resumen.c.num_compras + compras,
+            ultima_compra=case(
+                (resumen.c.ultima_compra.is_(None), fecha),
+                (resumen.c.ultima_compra < fecha, fecha),
+                else_=resumen.c.ultima_compra,
+            ),
+        )
+    )
+    if resultado.rowcount:
+        return
+    try:
+        with db.session.begin_nested():
+            db.session.connection().execute(resumen.insert().values(
+                cliente_id=cliente_id, total_gastado_centavos=total_centavos, num_compras=compras, ultima_compra=fecha))
+    except IntegrityError:
+        # Otra transacción creó la fila entre el UPDATE y el INSERT
+        registrar_compra(cliente_id, total_centavos, fecha, compras)
+
+
+def registrar_compras(por_cliente, fecha):
+    """
+    Variante por lotes de `registrar_compra` para {cliente_id: (centavos, compras)}:
+    un UPDATE executemany para los resúmenes existentes y un INSERT para los nuevos.
+    """
+    resumen = tabla_acumulada(_resumen)
+    existentes = set()
+    for bloque in chunked(por_cliente, IN_CHUNK_SIZE):
+        existentes.update(c for (c,) in db.session.execute(
+            db.select(resumen.c.cliente_id).where(resumen.c.cliente_id.in_(bloque))))
+
+    actualizar = [{'p_cliente': c, 'p_total': t, 'p_compras': n}
+                  for c, (t, n) in por_cliente.items() if c in existentes]
+    if actualizar:
+        db.session.execute(
+            resumen.update().where(resumen.c.cliente_id == db.bindparam('p_cliente')).values(
+                total_gastado_centavos=resumen.c.total_gastado_centavos + db.bindparam('p_total'),
+                num_compras=resumen.c.num_compras + db.bindparam('p_compras'),
+                ultima_compra=case(
+                    (resumen.c.ultima_compra.is_(None), fecha),
+                    (resumen.c.ultima_compra < fecha, fecha),
+                    else_=resumen.c.ultima_compra,
+                ),
+            ),
+            actualizar,
+        )
+
+    nuevos = [(c, t, n) for c, (t, n) in por_cliente.items() if c not in existentes]
+    if not nuevos:
+        return
+    try:
+        with db.session.begin_nested():
+            db.session.execute(resumen.insert(), [
+                {'cliente_id': c, 'total_gastado_centavos': t, 'num_compras': n, 'ultima_compra': fecha}
+                for c, t, n in nuevos
+            ])
+    except IntegrityError:
+        # Alguno se creó en paralelo: se cae a la ruta fila a fila
+        for c, t, n in nuevos:
+            registrar_compra(c, t, fecha, compras=n)
+
+
+def reconstruir_resumenes(cliente_ids=None):
+    """
+    Recalcula los resúmenes desde `ventas` con un solo GROUP BY.
+
+    Para cargas masivas (executemany) que no pasan por `registrar_compra`;
+    sin `cliente_ids` reconstruye la tabla completa. No confirma la transacción.
+    """
+    borrar = _resumen.delete()
+    agregados = (
+        db.select(Sale.cliente_id, func.sum(Sale.total_centavos), func.count(), func.max(Sale.fecha))
+        .where(Sale.activo.is_(True))
+        .group_by(Sale.cliente_id)
+    )
+    if cliente_ids is not None:
+        cliente_ids = list(cliente_ids)
+        borrar = borrar.where(_resumen.c.cliente_id.in_(cliente_ids))
+        agregados = agregados.where(Sale.cliente_id.in_(cliente_ids))
+    db.session.execute(borrar)
+    if not current_app.config.get('STORE_SHARDING'):
+        db.session.execute(_resumen.insert().from_select(
+            ['cliente_id', 'total_gastado_centavos', 'num_compras', 'ultima_compra'], agregados))
+        return
+
+    # En modo por tienda las ventas están en otros archivos: se suman los agregados de cada
+    # tienda, que ya incluyen lo pendiente de consolidar
+    descartar_pendientes(_resumen, cliente_ids)
+    por_cliente = {}
+    for cliente_id, total, compras, ultima in federar(agregados):
+        acumulado = por_cliente.get(cliente_id)
+        if acumulado:
+            total += acumulado['total_gastado_centavos']
+            compras += acumulado['num_compras']
+            ultima = max(ultima, acumulado['ultima_compra'])
+        por_cliente[cliente_id] = {'cliente_id': cliente_id, 'total_gastado_centavos': total,
+                                   'num_compras': compras, 'ultima_compra': ultima}
+    if por_cliente:
+        db.session.execute(_resumen.insert(), list(por_cliente.values()))
+
+
+def registrar_ventas_producto(por_clave):
+    """
+    Suma al agregado por día, tienda y producto dentro de la transacción actual:
+    {(fecha, tienda_id, id_producto): (ventas, unidades, centavos)}, con un solo
+    INSERT ... ON CONFLICT DO UPDATE executemany. En modo por tienda se suma en
+    la BD de la tienda (ver tabla_acumulada).
+    """
+    if not por_clave:
+        return
+    por_dia = tabla_acumulada(_por_dia)
+    sentencia = insert_on_conflict(por_dia)
+    sentencia = sentencia.on_conflict_do_update(
+        index_elements=['fecha', 'tienda_id', 'id_producto'],
+        set_={c: por_dia.c[c] + sentencia.excluded[c] for c in ('ventas', 'unidades', 'importe_centavos')},
+    )
+    # Siempre en el mismo orden de clave para que dos ventas simultáneas no se bloqueen entre sí
+    db.session.execute(sentencia, [
+        {'fecha': fecha, 'tienda_id': tienda_id, 'id_producto': id_producto,
+         'ventas': ventas, 'unidades': unidades, 'importe_centavos': centavos}
+        for (fecha, tienda_id, id_producto), (ventas, unidades, centavos) in sorted(por_clave.items())
+    ])
+
+
+def reconstruir_ventas_producto():
+    """
+    Recalcula todo el agregado por día, tienda y producto desde las líneas de
+    venta con un GROUP BY, para cargas masivas que no pasan por
+    `registrar_ventas_producto`. No confirma la transacción; al confirmarla
+    se descarta la analítica en caché (ver report_service._en_cache).
+    """
+    registrar_cambio('ventas_producto_dia')
+    fecha_venta = fecha_de(Sale.fecha)
+    agregados = (
+        db.select(fecha_venta, Sale.tienda_id, SaleProduct.id_producto, func.count(),
+                  func.sum(SaleProduct.cantidad),
+                  func.sum(SaleProduct.cantidad * SaleProduct.precio_unitario_centavos))
+        .join(Sale, Sale.id_venta == SaleProduct.id_venta)
+        .where(Sale.activo.is_(True))
+        .group_by(fecha_venta, Sale.tienda_id, SaleProduct.id_producto)
+    )
+    columnas = ['fecha', 'tienda_id', 'id_producto', 'ventas', 'unidades', 'importe_centavos']
+    db.session.execute(_por_dia.delete())
+    if not current_app.config.get('STORE_SHARDING'):
+        db.session.execute(_por_dia.insert().from_select(columnas, agregados))
+        return
+    # Cada tienda tiene sus propias ventas: sus claves no se repiten entre archivos
+    descartar_pendientes(_por_dia)
+    for bloque in chunked(federar(agregados), IN_CHUNK_SIZE):
+        db.session.execute(_por_dia.insert(), [dict(zip(columnas, fila)) for fila in bloque])
+
+
+def contar_ventas(desde):
+    """(número de ventas, suma de sus totales en centavos) desde una fecha, en todas las tiendas"""
+    filas = federar(db.select(func.count(Sale.id_venta), func.sum(Sale.total_centavos)).where(Sale.fecha >= desde))
+    return sum(n for n, _ in filas), sum(t for _, t in filas if t is not None)
+
+
+def ventas_recientes(limite):
+    """Últimas ventas de todas las tiendas (id_venta, total_centavos, fecha, cliente_nombre)"""
+    consulta = db.select(Sale.id_venta, Sale.total_centavos, Sale.fecha, Client.nombre.label('cliente_nombre')) \
+        .outerjoin(Client, Sale.cliente_id == Client.id_cliente).order_by(Sale.fecha.desc()).limit(limite)
+    return sorted(federar(consulta), key=lambda v: v.fecha, reverse=True)[:limite]
+
+
+def ventas_por_dia(desde, hasta):
+    """[(fecha 'AAAA-MM-DD', ventas, ingresos en centavos)] por día en todas las tiendas, en orden"""
+    fecha_dia = dia(Sale.fecha)
+    consulta = db.select(fecha_dia, func.count(Sale.id_venta), func.sum(Sale.total_centavos)) \
+        .where(Sale.fecha >= desde, Sale.fecha <= hasta).group_by(fecha_dia)
+    por_dia = {}
+    for fecha, ventas, ingresos in federar(consulta):
+        anterior = por_dia.get(fecha, (0, 0))
+        por_dia[fecha] = (anterior[0] + ventas, anterior[1] + (ingresos or 0))
+    return [(fecha, ventas, ingresos) for fecha, (ventas, ingresos) in sorted(por_dia.items())]
@@ -0,0 +1,155 @@
+from datetime import datetime
+from flask import current_app
+from sqlalchemy import func
+from app import db
+from app.models import Sale, SaleProduct, Staff, SellerMonthlySales
+from app.services.bulk_service import insert_on_conflict
+from app.services.shard_service import federar, descartar_pendientes
+from app.utils.helpers import mes_de
+from app.utils.shards import tabla_acumulada
+
+_por_mes = SellerMonthlySales.__table__
+
+# Criterio del ranking -> columna por la que se ordena
+CRITERIOS = {
+    'importe': SellerMonthlySales.importe_centavos,
+    'ventas': SellerMonthlySales.ventas,
+    'unidades': SellerMonthlySales.unidades,
+}
+
+
+def periodo_de(fecha):
+    """Periodo (primer día del mes) de una fecha o datetime"""
+    return (fecha.date() if isinstance(fecha, datetime) else fecha).replace(day=1)
+
+
+def registrar_ventas_vendedor(por_clave):
+    """
+    Suma a los totales mensuales de los vendedores dentro de la transacción
+    actual: {(periodo, empleado_id): (ventas, unidades, centavos)}, con un solo
+    INSERT ... ON CONFLICT DO UPDATE executemany. En modo por tienda se suma en
+    la BD de la tienda (ver tabla_acumulada).
+    """
+    if not por_clave:
+        return
+    por_mes = tabla_acumulada(_por_mes)
+    sentencia = insert_on_conflict(por_mes)
+    sentencia = sentencia.on_conflict_do_update(
+        index_elements=['periodo', 'empleado_id'],
+        set_={c: por_mes.c[c] + sentencia.excluded[c] for c in ('ventas', 'unidades', 'importe_centavos')},
+    )
+    db.session.execute(sentencia, [
+        {'periodo': periodo, 'empleado_id': empleado_id,
+         'ventas': ventas, 'unidades': unidades, 'importe_centavos': centavos}
+        for (periodo, empleado_id), (ventas, unidades, centavos) in sorted(por_clave.items())
+    ])
+
+
+def reconstruir_ventas_vendedor():
+    """
+    Recalcula los totales mensuales desde las líneas de venta con un GROUP BY
+    (para cargas masivas), conservando las comisiones ya fijadas. No confirma.
+    """
+    periodo = mes_de(Sale.fecha)
+    agregados = (
+        db.select(periodo, Sale.empleado_id, func.count(func.distinct(Sale.id_venta)),
+                  func.sum(SaleProduct.cantidad),
+                  func.sum(SaleProduct.cantidad * SaleProduct.precio_unitario_centavos))
+        .join(Sale, Sale.id_venta == SaleProduct.id_venta)
+        .where(Sale.activo.is_(True))
+        .group_by(periodo, Sale.empleado_id)
+    )
+    # Un vendedor que cambió de tienda aparece en varias: se suman sus filas. Lo pendiente
+    # de consolidar en las tiendas ya está en sus ventas
+    descartar_pendientes(_por_mes)
+    por_clave = {}
+    for periodo_venta, empleado_id, ventas, unidades, centavos in federar(agregados):
+        anterior = por_clave.get((periodo_venta, empleado_id), (0, 0, 0))
+        por_clave[(periodo_venta, empleado_id)] = (anterior[0] + ventas, anterior[1] + (unidades or 0),
+                                                   anterior[2] + (centavos or 0))
+
+    fijadas = db.session.execute(
+        db.select(_por_mes.c.periodo, _por_mes.c.empleado_id, _por_mes.c.comision_centavos,
+                  _por_mes.c.comision_calculada).where(_por_mes.c.comision_calculada.isnot(None))
+    ).all()
+    db.session.execute(_por_mes.delete())
+    filas = {clave: {'periodo': clave[0], 'empleado_id': clave[1], 'ventas': v, 'unidades': u,
+                     'importe_centavos': c, 'comision_centavos': None, 'comision_calculada': None}
+             for clave, (v, u, c) in por_clave.items()}
+    for periodo_fijado, empleado_id, comision_centavos, calculada in fijadas:
+        fila = filas.setdefault((periodo_fijado, empleado_id), {
+            'periodo': periodo_fijado, 'empleado_id': empleado_id, 'ventas': 0, 'unidades': 0,
+            'importe_centavos': 0})
+        fila.update(comision_centavos=comision_centavos, comision_calculada=calculada)
+    if filas:
+        db.session.execute(_por_mes.insert(), list(filas.values()))
+
+
+def comision(importe_centavos, tramos=None):
+    """
+    Comisión en centavos según tramos marginales ((desde_centavos, puntos_basicos), ...)
+    (COMMISSION_TIERS): cada tasa se aplica solo a la parte del importe dentro
+    de su tramo. Aritmética entera, con un solo redondeo al final.
+    """
+    tramos = sorted(tramos or current_app.config['COMMISSION_TIERS'])
+    acumulado = 0
+    for i, (desde, puntos) in enumerate(tramos):
+        if importe_centavos <= desde:
+            break
+        hasta = tramos[i + 1][0] if i + 1 < len(tramos) else importe_centavos
+        acumulado += (min(importe_centavos, hasta) - desde) * puntos
+    return (acumulado + 5000) // 10000
+
+
+def calcular_comisiones(periodo, ahora=None):
+    """
+    Cierre de comisiones de un periodo para toda la plantilla de tiendas: fija
+    la comisión de cada vendedor con los tramos vigentes (un UPDATE
+    executemany) y crea en cero a los vendedores activos sin ventas.
+    Confirma la transacción y devuelve el número de vendedores.
+    """
+    ahora = ahora or datetime.utcnow()
+    periodo = periodo_de(periodo)
+    tramos = current_app.config['COMMISSION_TIERS']
+
+    con_ventas = dict(db.session.query(SellerMonthlySales.empleado_id, SellerMonthlySales.importe_centavos)
+                      .filter(SellerMonthlySales.periodo == periodo))
+    sin_ventas = [e for (e,) in db.session.query(Staff.id_empleado).filter(
+        Staff.activo.is_(True), Staff.tienda_id.isnot(None)) if e not in con_ventas]
+
+    try:
+        if con_ventas:
+            db.session.execute(
+                _por_mes.update().where(
+                    _por_mes.c.periodo == periodo,
+                    _por_mes.c.empleado_id == db.bindparam('p_empleado'),
+                ).values(comision_centavos=db.bindparam('p_comision'), comision_calculada=ahora),
+                [{'p_empleado': e, 'p_comision': comision(importe, tramos)} for e, importe in sorted(con_ventas.items())],
+            )
+        if sin_ventas:
+            db.session.execute(insert_on_conflict(_por_mes).on_conflict_do_nothing(), [
+                {'periodo': periodo, 'empleado_id': e, 'ventas': 0, 'unidades': 0, 'importe_centavos': 0,
+                 'comision_centavos': 0, 'comision_calculada': ahora} for e in sin_ventas
+            ])
+        db.session.commit()
+    except Exception:
+        db.session.rollback()
+        raise
+    return len(con_ventas) + len(sin_ventas)
+
+
+def ranking_vendedores(periodo, tienda_id=None, limite=None, criterio='importe'):
+    """
+    Clasificación de vendedores de un periodo leída solo de los totales
+    mensuales: [(puesto, SellerMonthlySales, nombre, tienda_id)]
+    """
+    orden = CRITERIOS[criterio]
+    consulta = db.session.query(SellerMonthlySales, Staff.nombre, Staff.tienda_id) \
+        .join(Staff, Staff.id_empleado == SellerMonthlySales.empleado_id) \
+        .filter(SellerMonthlySales.periodo == periodo_de(periodo)) \
+        .order_by(orden.desc(), SellerMonthlySales.importe_centavos.desc(), SellerMonthlySales.empleado_id)
+    if tienda_id is not None:
+        consulta = consulta.filter(Staff.tienda_id == tienda_id)
+    if limite:
+        consulta = consulta.limit(limite)
+    return [(puesto, fila, nombre, tienda) for puesto, (fila, nombre, tienda) in enumerate(consulta, start=1)]
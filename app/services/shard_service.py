@@ -0,0 +1,143 @@
+from concurrent.futures import ThreadPoolExecutor
+from flask import current_app
+from sqlalchemy import bindparam, case, text
+from app import db
+from app.models import Store, Product
+from app.services.bulk_service import insert_on_conflict
+from app.utils.shards import TABLAS_TIENDA, TABLAS_ACUMULADAS, motor_tienda, tabla_pendiente, stock_pendiente
+
+_productos = Product.__table__
+
+# Tabla acumulada -> (columnas que se suman, columnas que toman el valor mayor) al consolidar
+_CONSOLIDACION = {
+    'resumen_clientes': (('total_gastado_centavos', 'num_compras'), ('ultima_compra',)),
+    'ventas_producto_dia': (('ventas', 'unidades', 'importe_centavos'), ()),
+    'ventas_vendedor_mes': (('ventas', 'unidades', 'importe_centavos'), ()),
+}
+
+
+def ids_tiendas():
+    """Todas las tiendas, también las inactivas: conservan sus ventas"""
+    return [t for (t,) in db.session.query(Store.id_tienda).order_by(Store.id_tienda)]
+
+
+def federar(consulta):
+    """
+    Ejecuta una consulta de solo lectura en la BD de cada tienda (en paralelo,
+    STORE_SHARD_READ_WORKERS hilos) y devuelve todas las filas concatenadas.
+    Sin modo por tienda se ejecuta una sola vez en la BD principal, así que
+    quien la usa combina las filas igual en ambos casos.
+    """
+    if not current_app.config.get('STORE_SHARDING'):
+        return db.session.execute(consulta).all()
+
+    motores = [motor_tienda(t) for t in ids_tiendas()]
+
+    def leer(motor):
+        with motor.connect() as conexion:
+            return conexion.execute(consulta).all()
+
+    with ThreadPoolExecutor(max_workers=current_app.config.get('STORE_SHARD_READ_WORKERS', 8)) as hilos:
+        return [fila for filas in hilos.map(leer, motores) for fila in filas]
+
+
+# Tabla -> condición que la asocia a una tienda (:tienda) en la BD principal
+_FILTRO_TIENDA = {
+    'ventas': 'tienda_id = :tienda',
+    'venta_producto': 'id_venta IN (SELECT id_venta FROM central.ventas WHERE tienda_id = :tienda)',
+    'facturas': 'venta_id IN (SELECT id_venta FROM central.ventas WHERE tienda_id = :tienda)',
+    'inventario_tiendas': 'tienda_id = :tienda',
+}
+
+
+def repartir_en_tiendas(progreso=None):
+    """
+    Mueve ventas, líneas, facturas e inventario de la BD principal a la BD
+    de cada tienda. Cada tienda se copia y se borra de la principal en una
+    transacción (ambos archivos se confirman juntos con journal de rollback,
+    ver SesionPorTienda), así que puede volver a ejecutarse si se interrumpe. Devuelve las filas movidas por tabla.
+    """
+    movidas = dict.fromkeys(TABLAS_TIENDA, 0)
+    for tienda_id in ids_tiendas():
+        with motor_tienda(tienda_id).begin() as conexion:
+            for tabla in TABLAS_TIENDA:
+                columnas = ', '.join(c.name for c in db.metadata.tables[tabla].columns)
+                resultado = conexion.execute(text(
+                    f'INSERT INTO main.{tabla} ({columnas}) SELECT {columnas} FROM central.{tabla} '
+                    f'WHERE {_FILTRO_TIENDA[tabla]}'
+                ), {'tienda': tienda_id})
+                movidas[tabla] += resultado.rowcount
+            # Las líneas y facturas se borran antes que las ventas por las que se filtran
+            for tabla in ('venta_producto', 'facturas', 'ventas', 'inventario_tiendas'):
+                conexion.execute(text(f'DELETE FROM central.{tabla} WHERE {_FILTRO_TIENDA[tabla]}'),
+                                 {'tienda': tienda_id})
+        if progreso:
+            progreso(tienda_id, movidas)
+    return movidas
+
+
+def _consolidar_tabla(conexion, tabla):
+    """Suma las filas de pendiente_<tabla> a la tabla de la BD principal y las borra"""
+    pendiente = tabla_pendiente(tabla)
+    filas = [dict(f._mapping) for f in conexion.execute(pendiente.delete().returning(*pendiente.c))]
+    if not filas:
+        return 0
+    sumas, mayores = _CONSOLIDACION[tabla.name]
+    clave = [c.name for c in tabla.primary_key.columns]
+    sentencia = insert_on_conflict(tabla)
+    valores = {c: tabla.c[c] + sentencia.excluded[c] for c in sumas}
+    for c in mayores:
+        valores[c] = case((tabla.c[c].is_(None), sentencia.excluded[c]),
+                          (tabla.c[c] < sentencia.excluded[c], sentencia.excluded[c]), else_=tabla.c[c])
+    sentencia = sentencia.on_conflict_do_update(index_elements=clave, set_=valores)
+    columnas = clave + list(sumas) + list(mayores)
+    conexion.execute(sentencia, sorted(({c: f[c] for c in columnas} for f in filas),
+                                       key=lambda f: tuple(f[c] for c in clave)))
+    return len(filas)
+
+
+def consolidar_tiendas(progreso=None):
+    """
+    Lleva a la BD principal lo que las ventas de cada tienda dejaron pendiente:
+    suma las tablas pendiente_ a resumen_clientes, ventas_producto_dia y
+    ventas_vendedor_mes y descuenta de productos.stock las unidades vendidas.
+    Cada tienda se consolida en una transacción propia, la única que escribe a
+    la vez su BD y la principal. Devuelve las filas consolidadas por tabla.
+    """
+    consolidadas = dict.fromkeys(TABLAS_ACUMULADAS + (stock_pendiente.name,), 0)
+    for tienda_id in ids_tiendas():
+        with motor_tienda(tienda_id).begin() as conexion:
+            # Se empieza por un DELETE ... RETURNING: el bloqueo de escritura de la tienda se toma
+            # antes de leerla, si no una venta en curso y esta transacción podrían esperarse entre sí
+            vendidas = conexion.execute(stock_pendiente.delete().returning(
+                stock_pendiente.c.id_producto, stock_pendiente.c.unidades)).all()
+            for nombre in TABLAS_ACUMULADAS:
+                consolidadas[nombre] += _consolidar_tabla(conexion, db.metadata.tables[nombre])
+            if vendidas:
+                conexion.execute(
+                    _productos.update().where(_productos.c.id_producto == bindparam('p_id'))
+                    .values(stock=_productos.c.stock - bindparam('p_unidades')),
+                    [{'p_id': p, 'p_unidades': u} for p, u in sorted(vendidas)],
+                )
+                consolidadas[stock_pendiente.name] += len(vendidas)
+        if progreso:
+            progreso(tienda_id, consolidadas)
+    return consolidadas
+
+
+def descartar_pendientes(tabla, claves=None):
+    """
+    En modo por tienda borra los incrementos pendientes de una tabla acumulada
+    (o solo los de las `claves` de su primera columna de clave), antes de
+    reconstruirla desde las ventas de las tiendas, que ya los incluyen. No es
+    atómico con la reconstrucción: pensado para cargas con las ventas detenidas.
+    """
+    if not current_app.config.get('STORE_SHARDING'):
+        return
+    pendiente = tabla_pendiente(tabla)
+    borrar = pendiente.delete()
+    if claves is not None:
+        borrar = borrar.where(pendiente.primary_key.columns[0].in_(list(claves)))
+    for tienda_id in ids_tiendas():
+        with motor_tienda(tienda_id).begin() as conexion:
+            conexion.execute(borrar)
@@ -0,0 +1,137 @@
+from datetime import datetime, timedelta
+from decimal import Decimal
+from flask import current_app
+from sqlalchemy import case, func
+from app import db
+from app.models import Product, SupplierOrder, SupplierOrderProduct, SupplierPerformance
+from app.services.bulk_service import IN_CHUNK_SIZE
+from app.utils.helpers import chunked
+
+
+def validar_lineas(productos, cantidades):
+    """
+    Valida las líneas de una orden de proveedor enviadas como listas paralelas
+    (productos[], cantidades[]) con una sola consulta IN por bloque.
+
+    Devuelve (lineas, errores): lineas es {id_producto: (cantidad, precio)},
+    con las repetidas sumadas, y errores una lista de mensajes por línea.
+    """
+    errores = []
+    solicitadas = []
+    if len(productos) != len(cantidades):
+        return {}, ['Cada producto debe tener una cantidad']
+
+    for numero, (producto_id, cantidad) in enumerate(zip(productos, cantidades), start=1):
+        try:
+            producto_id = int(producto_id)
+        except (TypeError, ValueError):
+            errores.append(f'Línea {numero}: producto no válido')
+            continue
+        try:
+            cantidad = int(cantidad)
+            if cantidad <= 0:
+                raise ValueError
+        except (TypeError, ValueError):
+            errores.append(f'Línea {numero}: cantidad inválida')
+            continue
+        solicitadas.append((numero, producto_id, cantidad))
+
+    encontrados = {}
+    for bloque in chunked({p for _, p, _ in solicitadas}, IN_CHUNK_SIZE):
+        encontrados.update(
+            (id_producto, (precio, activo)) for id_producto, precio, activo in
+            db.session.query(Product.id_producto, Product.precio, Product.activo)
+            .filter(Product.id_producto.in_(bloque))
+        )
+
+    lineas = {}
+    for numero, producto_id, cantidad in solicitadas:
+        if producto_id not in encontrados:
+            errores.append(f'Línea {numero}: el producto con ID {producto_id} no existe')
+        elif not encontrados[producto_id][1]:
+            errores.append(f'Línea {numero}: el producto con ID {producto_id} está inactivo')
+        else:
+            previa = lineas.get(producto_id, (0, None))[0]
+            lineas[producto_id] = (previa + cantidad, encontrados[producto_id][0])
+    return lineas, errores
+
+
+def crear_orden(proveedor_id, fecha, estado, lineas, tienda_id=None):
+    """
+    Crea la orden con sus totales precalculados e inserta todas sus líneas
+    con un executemany. No confirma la transacción.
+    """
+    orden = SupplierOrder(
+        fecha=fecha,
+        estado=estado,
+        proveedor_id=proveedor_id,
+        tienda_id=tienda_id,
+        num_lineas=len(lineas),
+        valor_total=sum((precio * cantidad for cantidad, precio in lineas.values()), Decimal(0)),
+    )
+    db.session.add(orden)
+    db.session.flush()  # Para obtener el ID de la nueva orden
+
+    db.session.execute(SupplierOrderProduct.__table__.insert(), [
+        {'id_orden_proveedor': orden.id_orden_proveedor, 'id_producto': id_producto, 'cantidad': cantidad}
+        for id_producto, (cantidad, _) in lineas.items()
+    ])
+    return orden
+
+
+def _horas_entre(inicio, fin):
+    """Expresión SQL con las horas transcurridas entre dos columnas DateTime"""
+    if db.session.get_bind().dialect.name == 'postgresql':
+        return func.extract('epoch', fin - inicio) / 3600.0
+    return (func.julianday(fin) - func.julianday(inicio)) * 24.0
+
+
+def recalcular_rendimiento(ahora=None, dias=None):
+    """
+    Rollup de indicadores por proveedor sobre las órdenes creadas en los
+    últimos `dias` (SUPPLIER_ROLLUP_DAYS): un GROUP BY sobre las órdenes más
+    uno sobre sus líneas recibidas. Reemplaza la tabla completa y confirma.
+    """
+    ahora = ahora or datetime.utcnow()
+    desde = ahora - timedelta(days=dias or current_app.config.get('SUPPLIER_ROLLUP_DAYS', 90))
+    recibida = SupplierOrder.estado == 'recibida'
+    lead_time = _horas_entre(SupplierOrder.fecha_creacion, SupplierOrder.fecha_recepcion)
+    con_marcas = recibida & SupplierOrder.fecha_recepcion.isnot(None)
+
+    filas = {}
+    for proveedor_id, ordenes, recibidas, canceladas, pendientes, valor, promedio, maximo in db.session.query(
+        SupplierOrder.proveedor_id,
+        func.count(),
+        func.sum(case((recibida, 1), else_=0)),
+        func.sum(case((SupplierOrder.estado == 'cancelada', 1), else_=0)),
+        func.sum(case((SupplierOrder.estado == 'pendiente', 1), else_=0)),
+        func.sum(case((recibida, SupplierOrder.valor_total), else_=0)),
+        func.avg(case((con_marcas, lead_time))),
+        func.max(case((con_marcas, lead_time))),
+    ).filter(SupplierOrder.fecha_creacion >= desde).group_by(SupplierOrder.proveedor_id):
+        filas[proveedor_id] = {
+            'proveedor_id': proveedor_id, 'ordenes': ordenes, 'recibidas': recibidas or 0,
+            'canceladas': canceladas or 0, 'pendientes': pendientes or 0, 'unidades_recibidas': 0,
+            'valor_recibido': valor or 0, 'lead_time_promedio': promedio, 'lead_time_maximo': maximo,
+            'desde': desde, 'actualizado': ahora,
+        }
+
+    for proveedor_id, unidades in db.session.query(
+        SupplierOrder.proveedor_id, func.sum(SupplierOrderProduct.cantidad)
+    ).join(SupplierOrderProduct, SupplierOrderProduct.id_orden_proveedor == SupplierOrder.id_orden_proveedor) \
+            .filter(SupplierOrder.fecha_creacion >= desde, recibida).group_by(SupplierOrder.proveedor_id):
+        filas[proveedor_id]['unidades_recibidas'] = unidades or 0
+
+    tabla = SupplierPerformance.__table__
+    db.session.execute(tabla.delete())
+    if filas:
+        db.session.execute(tabla.insert(), list(filas.values()))
+    db.session.commit()
+    return len(filas)
+
+
+def rollup_vencido(ahora=None):
+    """True si el rollup nunca se ejecutó o es más antiguo que SUPPLIER_ROLLUP_INTERVAL"""
+    ultimo = db.session.query(func.max(SupplierPerformance.actualizado)).scalar()
+    intervalo = timedelta(seconds=current_app.config.get('SUPPLIER_ROLLUP_INTERVAL', 86400))
+    return ultimo is None or (ahora or datetime.utcnow()) - ultimo >= intervalo
@@ -1,5 +1,5 @@
 from functools import wraps
-from flask import flash, redirect, url_for, abort, request
+from flask import flash, redirect, url_for, abort, request, g
 from flask_login import current_user
 
 def login_required(f):
@@ -129,6 +129,21 @@ def active_user_required(f):
         return f(*args, **kwargs)
     return decorated_function
 
+def solo_lectura(f):
+    """
+    Decorador para vistas que no escriben (dashboards, reportes): sus consultas
+    van a la réplica de lectura si hay una configurada. Ver app/utils/replica.py.
+
+    Va justo encima de la función, debajo de login_required y de los de rol:
+    la carga del usuario y la comprobación de permisos deben leer la BD
+    principal, no una réplica que puede ir atrasada.
+    """
+    @wraps(f)
+    def decorated_function(*args, **kwargs):
+        g.solo_lectura = True
+        return f(*args, **kwargs)
+    return decorated_function
+
 # Versiones para API (sin cambios significativos)
 def api_role_required(role_name):
     def decorator(f):
@@ -0,0 +1,35 @@
+import re
+import unicodedata
+from decimal import Decimal, ROUND_HALF_UP
+
+_NO_DIGITOS = re.compile(r'\D+')
+_ESPACIOS = re.compile(r'\s+')
+
+
+def normalizar_texto(texto):
+    """Minúsculas, sin tildes y con espacios simples: clave para búsquedas por prefijo"""
+    if not texto:
+        return ''
+    sin_tildes = unicodedata.normalize('NFKD', texto).encode('ascii', 'ignore').decode('ascii')
+    return _ESPACIOS.sub(' ', sin_tildes).strip().lower()
+
+
+def normalizar_telefono(telefono):
+    """Solo los dígitos del teléfono ('+57 300-123 4567' -> '573001234567')"""
+    return _NO_DIGITOS.sub('', telefono or '')
+
+
+
+def a_centavos(valor):
+    """Importe (Decimal, str o número) a centavos enteros, redondeando la mitad hacia arriba"""
+    if valor is None or valor == '':
+        return 0
+    return int((Decimal(str(valor)) * 100).quantize(Decimal('1'), rounding=ROUND_HALF_UP))
+
+
+def formatear_centavos(centavos):
+    """Centavos como texto con dos decimales (123456 -> '1234.56'), sin pasar por float"""
+    centavos = int(centavos or 0)
+    signo = '-' if centavos < 0 else ''
+    enteros, resto = divmod(abs(centavos), 100)
+    return f'{signo}{enteros}.{resto:02d}'
@@ -0,0 +1,69 @@
+from datetime import datetime
+from itertools import islice
+from sqlalchemy import Date, cast, func, tuple_, type_coerce
+
+
+def chunked(iterable, size):
+    """Divide un iterable en listas de a lo sumo `size` elementos"""
+    iterator = iter(iterable)
+    while True:
+        bloque = list(islice(iterator, size))
+        if not bloque:
+            return
+        yield bloque
+
+
+def dia(columna):
+    """Día de una columna DateTime como texto 'AAAA-MM-DD', igual en SQLite y PostgreSQL"""
+    from app import db
+    if db.session.get_bind().dialect.name == 'postgresql':
+        return func.to_char(columna, 'YYYY-MM-DD')
+    return func.date(columna)
+
+
+def fecha_de(columna):
+    """Día de una columna DateTime como DATE, para guardarlo o agrupar por él en SQLite y PostgreSQL"""
+    from app import db
+    if db.session.get_bind().dialect.name == 'postgresql':
+        return cast(columna, Date)
+    # SQLite guarda las fechas como texto 'AAAA-MM-DD': basta con leerlo como Date
+    return type_coerce(func.date(columna), Date)
+
+
+def mes_de(columna):
+    """Primer día del mes de una columna DateTime como DATE, en SQLite y PostgreSQL"""
+    from app import db
+    if db.session.get_bind().dialect.name == 'postgresql':
+        return cast(func.date_trunc('month', columna), Date)
+    return type_coerce(func.date(columna, 'start of month'), Date)
+
+
+class PaginaPorClave:
+    """
+    Paginación por clave (keyset) sobre un orden descendente (fecha, id).
+
+    En lugar de OFFSET filtra por la última fila vista, así que cualquier
+    página cuesta lo mismo si hay un índice que cubra el filtro y el orden.
+    El cursor es el texto '<fecha ISO>_<id>' de la última fila.
+    """
+
+    def __init__(self, query, columna_fecha, columna_id, cursor, por_pagina):
+        query = query.order_by(columna_fecha.desc(), columna_id.desc())
+        posicion = self.leer_cursor(cursor)
+        if posicion:
+            query = query.filter(tuple_(columna_fecha, columna_id) < posicion)
+        filas = query.limit(por_pagina + 1).all()
+        self.items = filas[:por_pagina]
+        self.has_next = len(filas) > por_pagina
+        self.has_prev = posicion is not None
+        ultimo = self.items[-1] if self.items else None
+        self.next_cursor = f'{getattr(ultimo, columna_fecha.key).isoformat()}_{getattr(ultimo, columna_id.key)}' \
+            if self.has_next else None
+
+    @staticmethod
+    def leer_cursor(cursor):
+        try:
+            fecha, id_ = (cursor or '').rsplit('_', 1)
+            return datetime.fromisoformat(fecha), int(id_)
+        except ValueError:
+            return None
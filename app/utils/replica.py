@@ -0,0 +1,63 @@
+import time
+from flask import current_app, g, has_request_context, session
+from sqlalchemy import make_url
+from sqlalchemy.sql.dml import UpdateBase
+
+# Bind de Flask-SQLAlchemy con la réplica de lectura
+BIND_REPLICA = 'replica'
+
+
+def configurar_replica(app):
+    """
+    Registra el bind de la réplica antes de db.init_app: DATABASE_REPLICA_URL o,
+    con SQLITE_WAL_READER, una conexión de solo lectura al mismo archivo SQLite
+    (la BD principal pasa a modo WAL para que las lecturas no esperen a las escrituras)
+    """
+    url = app.config.get('SQLALCHEMY_REPLICA_URI')
+    if not url and app.config.get('SQLITE_WAL_READER'):
+        principal = make_url(app.config['SQLALCHEMY_DATABASE_URI'])
+        if principal.get_backend_name() != 'sqlite' or principal.database in (None, '', ':memory:'):
+            raise RuntimeError('SQLITE_WAL_READER requiere una BD principal SQLite en archivo')
+        if app.config.get('STORE_SHARDING'):
+            # Con WAL, una transacción sobre archivos adjuntos deja de ser atómica entre ellos
+            raise RuntimeError('SQLITE_WAL_READER no puede combinarse con STORE_SHARDING')
+        url = principal.set(database=f'file:{principal.database}', query={'mode': 'ro', 'uri': 'true'})
+    if not url:
+        return
+    binds = dict(app.config.get('SQLALCHEMY_BINDS') or {})
+    binds[BIND_REPLICA] = url
+    app.config['SQLALCHEMY_BINDS'] = binds
+
+
+def registrar_replica(app, db):
+    """Activa WAL si se lee del mismo archivo y fija las lecturas a la principal tras escribir"""
+    if BIND_REPLICA not in (app.config.get('SQLALCHEMY_BINDS') or {}):
+        return
+
+    if app.config.get('SQLITE_WAL_READER') and not app.config.get('SQLALCHEMY_REPLICA_URI'):
+        with app.app_context(), db.engine.connect() as conexion:
+            conexion.exec_driver_sql('PRAGMA journal_mode=WAL')
+
+    @app.after_request
+    def _fijar_principal(respuesta):
+        # Quien acaba de escribir lee de la principal un tiempo, aunque la réplica vaya atrasada
+        if g.get('escribio'):
+            session['leer_principal_hasta'] = time.time() + app.config.get('REPLICA_STICKY_SECONDS', 5)
+        return respuesta
+
+
+def motor_lectura(sesion, clause):
+    """
+    Engine de la réplica si la vista es de solo lectura (@solo_lectura) y la
+    sentencia es una lectura; None si debe ir a la principal. Anota las
+    escrituras para que las lecturas siguientes de la petición vean sus cambios.
+    """
+    if sesion._flushing or isinstance(clause, UpdateBase):
+        if has_request_context():
+            g.escribio = True
+        return None
+    if not has_request_context() or not g.get('solo_lectura') or g.get('escribio'):
+        return None
+    if session.get('leer_principal_hasta', 0) > time.time():
+        return None
+    return current_app.extensions['sqlalchemy'].engines.get(BIND_REPLICA)
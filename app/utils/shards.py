@@ -0,0 +1,179 @@
+import os
+import threading
+from contextlib import contextmanager
+from flask import current_app, g
+from flask_login import current_user
+from flask_sqlalchemy.session import Session
+from sqlalchemy import Column, Integer, MetaData, Table, create_engine, event, text
+from app.utils.replica import motor_lectura
+
+# Tablas que, en modo por tienda (STORE_SHARDING), viven en el archivo SQLite de cada tienda
+TABLAS_TIENDA = ('ventas', 'venta_producto', 'facturas', 'inventario_tiendas')
+# Tablas de la BD principal que las ventas incrementan: en modo por tienda los incrementos
+# se suman en la copia pendiente_<tabla> de la BD de la tienda y se consolidan después
+# (ver shard_service.consolidar_tiendas), para que una venta no escriba la BD principal
+TABLAS_ACUMULADAS = ('resumen_clientes', 'ventas_producto_dia', 'ventas_vendedor_mes')
+
+# Reentrante: motor_tienda crea las tablas pendiente_ (tabla_pendiente) con el lock tomado
+_lock = threading.RLock()
+_pendientes = MetaData()
+
+# Unidades vendidas en la tienda que aún no se descuentan de productos.stock
+stock_pendiente = Table(
+    'pendiente_stock', _pendientes,
+    Column('id_producto', Integer, primary_key=True),
+    Column('unidades', Integer, nullable=False),
+)
+
+
+class SesionPorTienda(Session):
+    """
+    Sesión que, en modo por tienda y con una tienda activa (g.tienda_shard),
+    envía todas las sentencias a la BD de esa tienda. La BD principal está
+    adjunta a esa conexión, así que las consultas que cruzan tablas de ambas
+    funcionan. Una venta solo lee la BD principal: lo que incrementa en ella
+    va a las tablas pendiente_ de la tienda (ver TABLAS_ACUMULADAS), y así
+    las ventas de tiendas distintas no esperan el bloqueo de escritura de la
+    principal.
+
+    Una transacción que sí escribe en ambos archivos (órdenes, transferencias,
+    consolidación) se confirma en los dos a la vez solo si ambos usan journal
+    de rollback, el modo por defecto de SQLite; con WAL (que queda guardado en
+    el archivo) cada uno se confirma por separado y una caída entre los dos
+    commits puede dejar solo uno aplicado.
+
+    En las vistas de solo lectura, las lecturas van a la réplica si existe.
+    """
+
+    def get_bind(self, mapper=None, clause=None, bind=None, **kwargs):
+        if bind is None and current_app.config.get('STORE_SHARDING'):
+            tienda_id = g.get('tienda_shard')
+            if tienda_id is not None:
+                return motor_tienda(tienda_id)
+        if bind is None:
+            replica = motor_lectura(self, clause)
+            if replica is not None:
+                return replica
+        return super().get_bind(mapper=mapper, clause=clause, bind=bind, **kwargs)
+
+
+def _copiar_sin_claves(tabla, metadata, nombre=None):
+    """Copia de una tabla sin claves foráneas (SQLite no las admite entre archivos)"""
+    copia = tabla.to_metadata(metadata, name=nombre)
+    for restriccion in list(copia.foreign_key_constraints):
+        copia.constraints.discard(restriccion)
+    for columna in copia.columns:
+        columna.foreign_keys.clear()
+    copia.foreign_keys.clear()
+    return copia
+
+
+def _tablas_tienda(metadata_modelos):
+    """Copias de las tablas de tienda"""
+    metadata = MetaData()
+    for nombre in TABLAS_TIENDA:
+        copia = _copiar_sin_claves(metadata_modelos.tables[nombre], metadata)
+        # AUTOINCREMENT para poder fijar en sqlite_sequence el rango de ids de la tienda
+        if len(copia.primary_key.columns) == 1:
+            copia.dialect_options['sqlite']['autoincrement'] = True
+    return metadata
+
+
+def tabla_pendiente(tabla):
+    """Tabla pendiente_<nombre> de la BD de tienda para una de TABLAS_ACUMULADAS: misma clave, sin índices"""
+    nombre = f'pendiente_{tabla.name}'
+    if nombre not in _pendientes.tables:
+        with _lock:
+            if nombre not in _pendientes.tables:
+                copia = _copiar_sin_claves(tabla, _pendientes, nombre)
+                copia.indexes.clear()
+    return _pendientes.tables[nombre]
+
+
+def tabla_acumulada(tabla):
+    """
+    Dónde sumar los incrementos de una de TABLAS_ACUMULADAS dentro de la
+    transacción actual: en modo por tienda y con una tienda activa, su tabla
+    pendiente_ en la BD de esa tienda; si no, la propia tabla.
+    """
+    if current_app.config.get('STORE_SHARDING') and g.get('tienda_shard') is not None:
+        return tabla_pendiente(tabla)
+    return tabla
+
+
+def _crear_motor(app, tienda_id):
+    db = app.extensions['sqlalchemy']
+    central = db.engines[None].url.database
+    if db.engines[None].dialect.name != 'sqlite' or not central or central == ':memory:':
+        raise RuntimeError('El modo por tienda requiere una BD principal SQLite en archivo')
+
+    os.makedirs(app.config['STORE_SHARD_DIR'], exist_ok=True)
+    uri = f"sqlite:///{os.path.join(app.config['STORE_SHARD_DIR'], f'tienda_{tienda_id}.db')}"
+
+    # Esquema: se crea sin la BD principal adjunta, para que create_all no vea sus tablas.
+    # Los ids de la tienda empiezan en tienda_id * STORE_SHARD_ID_SPAN y no chocan entre tiendas
+    inicial = create_engine(uri)
+    metadata = _tablas_tienda(db.metadata)
+    for nombre in TABLAS_ACUMULADAS:
+        tabla_pendiente(db.metadata.tables[nombre])
+    with inicial.begin() as conexion:
+        metadata.create_all(conexion)
+        _pendientes.create_all(conexion)
+        for tabla in metadata.tables.values():
+            if tabla.dialect_options['sqlite']['autoincrement']:
+                conexion.execute(
+                    text('INSERT INTO sqlite_sequence (name, seq) SELECT :tabla, :inicio '
+                         'WHERE NOT EXISTS (SELECT 1 FROM sqlite_sequence WHERE name = :tabla)'),
+                    {'tabla': tabla.name, 'inicio': tienda_id * app.config['STORE_SHARD_ID_SPAN']},
+                )
+    inicial.dispose()
+
+    motor = create_engine(uri)
+
+    @event.listens_for(motor, 'connect')
+    def _adjuntar_central(conexion_dbapi, _):
+        conexion_dbapi.execute('ATTACH DATABASE ? AS central', (central,))
+
+    return motor
+
+
+def motor_tienda(tienda_id):
+    """Engine de la BD de una tienda; la primera vez crea el archivo y sus tablas"""
+    motores = current_app.extensions.setdefault('motores_tienda', {})
+    motor = motores.get(tienda_id)
+    if motor is None:
+        with _lock:
+            motor = motores.get(tienda_id)
+            if motor is None:
+                motor = motores[tienda_id] = _crear_motor(current_app, tienda_id)
+    return motor
+
+
+@contextmanager
+def en_tienda(tienda_id):
+    """
+    Dirige la sesión a la BD de otra tienda dentro del bloque. Sin modo por
+    tienda no tiene efecto. Si la transacción escribe en varias tiendas, la
+    sesión confirma cada conexión por separado (no es atómico entre ellas).
+    """
+    anterior = g.get('tienda_shard')
+    if anterior != tienda_id and current_app.config.get('STORE_SHARDING'):
+        # Lo pendiente se escribe en la conexión que le corresponde antes de cambiar
+        current_app.extensions['sqlalchemy'].session.flush()
+    g.tienda_shard = tienda_id
+    try:
+        yield
+    finally:
+        g.tienda_shard = anterior
+
+
+def registrar_enrutamiento(app):
+    """Fija la tienda de cada petición desde el empleado asociado al usuario"""
+    if not app.config.get('STORE_SHARDING'):
+        return
+
+    @app.before_request
+    def _tienda_del_usuario():
+        empleado = current_user.empleado_asociado if current_user.is_authenticated else None
+        if empleado is not None and empleado.tienda_id:
+            g.tienda_shard = empleado.tienda_id
@@ -0,0 +1,140 @@
+from decimal import Decimal, InvalidOperation
+
+
+class Campo:
+    """Definición declarativa de un campo de esquema"""
+
+    def __init__(self, tipo, requerido=False, default=None, min_len=None, max_len=None,
+                 min_value=None, max_value=None, opciones=None):
+        self.tipo = tipo
+        self.requerido = requerido
+        self.default = default
+        self.min_len = min_len
+        self.max_len = max_len
+        self.min_value = min_value
+        self.max_value = max_value
+        self.opciones = opciones
+
+
+def _a_str(valor):
+    if not isinstance(valor, str):
+        raise ValueError('Debe ser texto')
+    return valor.strip()
+
+
+def _a_int(valor):
+    if isinstance(valor, bool):
+        raise ValueError('Debe ser un número entero')
+    if isinstance(valor, float) and not valor.is_integer():
+        raise ValueError('Debe ser un número entero')
+    try:
+        return int(valor)
+    except (TypeError, ValueError):
+        raise ValueError('Debe ser un número entero')
+
+
+def _a_decimal(valor):
+    if isinstance(valor, bool):
+        raise ValueError('Debe ser un número')
+    try:
+        return Decimal(str(valor))
+    except (InvalidOperation, ValueError):
+        raise ValueError('Debe ser un número')
+
+
+def _a_bool(valor):
+    if isinstance(valor, bool):
+        return valor
+    if isinstance(valor, (int, str)) and str(valor).lower() in ('1', 'true', 'yes', 'si'):
+        return True
+    if isinstance(valor, (int, str)) and str(valor).lower() in ('0', 'false', 'no'):
+        return False
+    raise ValueError('Debe ser verdadero o falso')
+
+
+CONVERSORES = {
+    'str': _a_str,
+    'int': _a_int,
+    'decimal': _a_decimal,
+    'bool': _a_bool,
+}
+
+
+def _compilar_campo(campo):
+    """Convierte un Campo en una función validadora sin búsquedas en tiempo de ejecución"""
+    convertir = CONVERSORES[campo.tipo]
+    checks = []
+
+    if campo.min_len is not None:
+        checks.append((lambda v, n=campo.min_len: len(v) >= n,
+                       f'Debe tener al menos {campo.min_len} caracteres'))
+    if campo.max_len is not None:
+        checks.append((lambda v, n=campo.max_len: len(v) <= n,
+                       f'No puede exceder {campo.max_len} caracteres'))
+    if campo.min_value is not None:
+        checks.append((lambda v, n=campo.min_value: v >= n,
+                       f'Debe ser mayor o igual a {campo.min_value}'))
+    if campo.max_value is not None:
+        checks.append((lambda v, n=campo.max_value: v <= n,
+                       f'Debe ser menor o igual a {campo.max_value}'))
+    if campo.opciones is not None:
+        opciones = frozenset(campo.opciones)
+        checks.append((lambda v: v in opciones,
+                       f'Debe ser uno de: {", ".join(sorted(map(str, opciones)))}'))
+
+    def validar(valor):
+        valor = convertir(valor)
+        for check, mensaje in checks:
+            if not check(valor):
+                raise ValueError(mensaje)
+        return valor
+
+    return validar
+
+
+class Esquema:
+    """Esquema precompilado: valida y normaliza diccionarios fila por fila"""
+
+    def __init__(self, campos):
+        self.campos = campos
+        self._validadores = tuple(
+            (nombre, _compilar_campo(campo), campo.requerido, campo.default)
+            for nombre, campo in campos.items()
+        )
+        self._nombres = frozenset(campos)
+
+    def validar(self, fila, parcial=False):
+        """
+        Valida una fila y devuelve (datos, errores).
+        En modo parcial solo se validan los campos presentes (actualizaciones).
+        """
+        if not isinstance(fila, dict):
+            return None, {'_fila': 'Cada fila debe ser un objeto JSON'}
+
+        datos = {}
+        errores = {}
+
+        for nombre in fila.keys() - self._nombres:
+            errores[nombre] = 'Campo no permitido'
+
+        for nombre, validar, requerido, default in self._validadores:
+            valor = fila.get(nombre)
+            if valor is None or valor == '':
+                if parcial and nombre not in fila:
+                    continue
+                if requerido:
+                    errores[nombre] = 'Campo requerido'
+                else:
+                    datos[nombre] = default
+                continue
+            try:
+                datos[nombre] = validar(valor)
+            except ValueError as e:
+                errores[nombre] = str(e)
+
+        return datos, errores
+
+
+def compilar_esquema(campos):
+    """Precompila un diccionario de Campos en un Esquema reutilizable"""
+    return Esquema(campos)
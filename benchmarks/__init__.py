@@ -0,0 +1 @@
+"""Suite de benchmarks de los endpoints críticos (ver run_benchmarks.py)"""
@@ -0,0 +1,280 @@
+import http.cookiejar
+import logging
+import random
+import re
+import threading
+import time
+import urllib.error
+import urllib.parse
+import urllib.request
+import json
+from datetime import datetime
+from werkzeug.serving import make_server
+from app import create_app, db
+from app.models import User, Role
+from app.seeds.generator import dominio_correo, PASSWORD_GENERADA, NOMBRES
+from benchmarks.runner import _percentil, preparar_base_datos, ADMIN_EMAIL, ADMIN_PASSWORD
+
+# Peso de cada rol en la mezcla de usuarios virtuales
+MEZCLA_POR_DEFECTO = {'Vendedor': 0.7, 'Administrador': 0.2, 'Proveedor': 0.1}
+
+RE_CSRF = re.compile(r'name="csrf_token"[^>]*value="([^"]+)"')
+RE_SELECT = r'<select[^>]*name="{}"[^>]*>(.*?)</select>'
+RE_OPCION = re.compile(r'<option value="(\d+)"')
+RE_PRODUCTO_VENTA = re.compile(r'<option value="(\d+)" data-precio="[^"]*"\s+data-stock="(\d+)"')
+RE_RECIBIR = re.compile(r'/suppliers/orders/(\d+)/update-status"[^>]*>\s*(?:<[^>]*>\s*)*?'
+                        r'<input[^>]*name="estado" value="recibida"', re.S)
+RE_PROVEEDOR = re.compile(r'/suppliers/(\d+)')
+
+
+class _SinRedirecciones(urllib.request.HTTPRedirectHandler):
+    """Mide cada endpoint por separado: las redirecciones no se siguen"""
+
+    def redirect_request(self, req, fp, code, msg, headers, newurl):
+        return None
+
+
+class Estadisticas:
+    """Latencias y errores por endpoint, compartidas entre hilos"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.latencias = {}
+        self.errores = {}
+
+    def registrar(self, endpoint, segundos, ok):
+        with self._lock:
+            self.latencias.setdefault(endpoint, []).append(segundos * 1000)
+            if not ok:
+                self.errores[endpoint] = self.errores.get(endpoint, 0) + 1
+
+    def resumen(self, duracion):
+        endpoints = {}
+        total = 0
+        for endpoint, valores in sorted(self.latencias.items()):
+            valores = sorted(valores)
+            total += len(valores)
+            endpoints[endpoint] = {
+                'peticiones': len(valores),
+                'errores': self.errores.get(endpoint, 0),
+                'rps': round(len(valores) / duracion, 2),
+                'p50_ms': round(_percentil(valores, 50), 2),
+                'p95_ms': round(_percentil(valores, 95), 2),
+                'p99_ms': round(_percentil(valores, 99), 2),
+                'max_ms': round(valores[-1], 2),
+            }
+        return {
+            'fecha': datetime.utcnow().isoformat(),
+            'duracion_s': round(duracion, 2),
+            'peticiones': total,
+            'errores': sum(self.errores.values()),
+            'rps': round(total / duracion, 2) if duracion else 0,
+            'endpoints': endpoints,
+        }
+
+
+class UsuarioVirtual(threading.Thread):
+    """Usuario con sesión propia (cookies + token CSRF) que repite el flujo de su rol"""
+
+    def __init__(self, base_url, rol, email, password, estadisticas, fin, semilla, pausa=(0.0, 0.0)):
+        super().__init__(daemon=True)
+        self.base_url = base_url.rstrip('/')
+        self.rol = rol
+        self.email = email
+        self.password = password
+        self.estadisticas = estadisticas
+        self.fin = fin
+        self.rng = random.Random(semilla)
+        self.pausa = pausa
+        self.proveedor_id = None
+        self.opener = urllib.request.build_opener(
+            urllib.request.HTTPCookieProcessor(http.cookiejar.CookieJar()),
+            _SinRedirecciones()
+        )
+
+    # ---- HTTP ----
+    def peticion(self, endpoint, ruta, datos=None):
+        """Ejecuta una petición y devuelve (status, cuerpo, location)"""
+        cuerpo_envio = urllib.parse.urlencode(datos, doseq=True).encode() if datos is not None else None
+        inicio = time.perf_counter()
+        try:
+            with self.opener.open(self.base_url + ruta, data=cuerpo_envio, timeout=60) as respuesta:
+                status, cuerpo, location = respuesta.status, respuesta.read().decode('utf-8', 'replace'), None
+        except urllib.error.HTTPError as e:
+            status, cuerpo, location = e.code, e.read().decode('utf-8', 'replace'), e.headers.get('Location')
+        except (urllib.error.URLError, OSError):
+            self.estadisticas.registrar(endpoint, time.perf_counter() - inicio, False)
+            return 0, '', None
+        # Los formularios redirigen si tienen éxito; un 200 a un POST es un formulario rechazado
+        ok = 300 <= status < 400 if datos is not None else status < 400
+        self.estadisticas.registrar(endpoint, time.perf_counter() - inicio, ok)
+        return status, cuerpo, location
+
+    @staticmethod
+    def csrf(html):
+        coincidencia = RE_CSRF.search(html)
+        return coincidencia.group(1) if coincidencia else ''
+
+    @staticmethod
+    def opciones(html, nombre):
+        select = re.search(RE_SELECT.format(re.escape(nombre)), html, re.S)
+        return RE_OPCION.findall(select.group(1)) if select else []
+
+    # ---- Flujos ----
+    def iniciar_sesion(self):
+        _, html, _ = self.peticion('GET /login', '/login')
+        status, _, location = self.peticion('POST /login', '/login', {
+            'csrf_token': self.csrf(html), 'email': self.email, 'password': self.password
+        })
+        if status != 302:
+            return False
+        if self.rol == 'Proveedor' and location:
+            coincidencia = RE_PROVEEDOR.search(location)
+            self.proveedor_id = coincidencia.group(1) if coincidencia else None
+        return True
+
+    def flujo_vendedor(self):
+        if self.rng.random() < 0.3:
+            self.peticion('GET /sales/', '/sales/')
+            return
+
+        _, html, _ = self.peticion('GET /sales/create', '/sales/create')
+        # El selector de clientes consulta el endpoint de búsqueda por prefijo
+        prefijo = urllib.parse.quote(self.rng.choice(NOMBRES)[:3])
+        _, cuerpo, _ = self.peticion('GET /api/v1/clients/lookup', f'/api/v1/clients/lookup?q={prefijo}')
+        try:
+            clientes = [c['id'] for c in json.loads(cuerpo).get('data', [])]
+        except ValueError:
+            clientes = []
+        productos = [p for p, stock in RE_PRODUCTO_VENTA.findall(html) if int(stock) > 0]
+        if not clientes or not productos:
+            return
+        elegidos = self.rng.sample(productos, min(self.rng.randint(1, 4), len(productos)))
+        self.peticion('POST /sales/create', '/sales/create', {
+            'csrf_token': self.csrf(html),
+            'cliente_id': self.rng.choice(clientes),
+            'total': '1',
+            'productos': json.dumps([{'producto_id': int(p), 'cantidad': 1} for p in elegidos]),
+        })
+
+    def flujo_administrador(self):
+        endpoint, ruta = self.rng.choice([
+            ('GET /dashboard/dashboard/', '/dashboard/dashboard/'),
+            ('GET /admin/sales-report', '/admin/sales-report'),
+            ('GET /admin/api/sales-data', '/admin/api/sales-data'),
+            ('GET /products/', '/products/'),
+        ])
+        self.peticion(endpoint, ruta)
+
+    def flujo_proveedor(self):
+        _, html, _ = self.peticion('GET /suppliers/orders', '/suppliers/orders')
+        pendientes = RE_RECIBIR.findall(html)
+        if pendientes:
+            orden = self.rng.choice(pendientes)
+            self.peticion('POST /suppliers/orders/<id>/update-status', f'/suppliers/orders/{orden}/update-status',
+                          {'csrf_token': self.csrf(html), 'estado': 'recibida'})
+            return
+
+        _, html, _ = self.peticion('GET /suppliers/orders/create', '/suppliers/orders/create')
+        productos = self.opciones(html, 'productos[]')
+        proveedores = self.opciones(html, 'proveedor_id')
+        proveedor = self.proveedor_id if self.proveedor_id in proveedores else (proveedores or [None])[0]
+        if not productos or proveedor is None:
+            return
+        elegidos = self.rng.sample(productos, min(self.rng.randint(1, 5), len(productos)))
+        self.peticion('POST /suppliers/orders/create', '/suppliers/orders/create', {
+            'csrf_token': self.csrf(html),
+            'proveedor_id': proveedor,
+            'fecha': datetime.utcnow().strftime('%Y-%m-%d'),
+            'estado': 'pendiente',
+            'productos[]': elegidos,
+            'cantidades[]': [str(self.rng.randint(5, 50)) for _ in elegidos],
+        })
+
+    def run(self):
+        if not self.iniciar_sesion():
+            return
+        flujo = {
+            'Vendedor': self.flujo_vendedor,
+            'Administrador': self.flujo_administrador,
+            'Proveedor': self.flujo_proveedor,
+        }[self.rol]
+        while time.time() < self.fin:
+            flujo()
+            if self.pausa[1]:
+                time.sleep(self.rng.uniform(*self.pausa))
+
+
+def repartir_roles(usuarios, mezcla, credenciales, semilla):
+    """Asigna a cada usuario virtual un rol según la mezcla y una credencial de ese rol"""
+    rng = random.Random(semilla)
+    roles = [r for r in mezcla if credenciales.get(r)]
+    pesos = [mezcla[r] for r in roles]
+    asignados = []
+    for i in range(usuarios):
+        rol = rng.choices(roles, weights=pesos)[0]
+        email, password = credenciales[rol][i % len(credenciales[rol])]
+        asignados.append((rol, email, password))
+    return asignados
+
+
+def ejecutar_carga(base_url, credenciales, usuarios=10, duracion=30, mezcla=None, semilla=42, pausa=(0.0, 0.0)):
+    """
+    Lanza `usuarios` usuarios virtuales durante `duracion` segundos contra `base_url`.
+    `credenciales` es {'Vendedor': [(email, password), ...], ...}.
+    """
+    estadisticas = Estadisticas()
+    mezcla = mezcla or MEZCLA_POR_DEFECTO
+    inicio = time.time()
+    fin = inicio + duracion
+    hilos = [
+        UsuarioVirtual(base_url, rol, email, password, estadisticas, fin, semilla + i, pausa)
+        for i, (rol, email, password) in enumerate(repartir_roles(usuarios, mezcla, credenciales, semilla))
+    ]
+    for hilo in hilos:
+        hilo.start()
+    for hilo in hilos:
+        hilo.join()
+    return estadisticas.resumen(time.time() - inicio)
+
+
+def credenciales_generadas(app, semilla, maximo=200):
+    """Credenciales por rol de los usuarios creados por el generador de datos"""
+    credenciales = {'Administrador': [(ADMIN_EMAIL, ADMIN_PASSWORD)]}
+    with app.app_context():
+        for rol in ('Vendedor', 'Proveedor'):
+            emails = db.session.query(User.email).join(Role, User.rol_id == Role.id_rol) \
+                .filter(Role.nombre == rol, User.activo == True,
+                        User.email.like(f'%@{dominio_correo(semilla)}')) \
+                .order_by(User.id_usuario).limit(maximo)
+            credenciales[rol] = [(email, PASSWORD_GENERADA) for (email,) in emails]
+    return credenciales
+
+
+class ServidorLocal:
+    """Sirve la aplicación con el servidor multihilo de Werkzeug en un hilo aparte"""
+
+    def __init__(self, app, host='127.0.0.1', puerto=0):
+        # El log por petición de Werkzeug distorsiona la medición
+        logging.getLogger('werkzeug').setLevel(logging.WARNING)
+        self.servidor = make_server(host, puerto, app, threaded=True)
+        self.url = f'http://{host}:{self.servidor.server_port}'
+        self.hilo = threading.Thread(target=self.servidor.serve_forever, daemon=True)
+
+    def __enter__(self):
+        self.hilo.start()
+        return self
+
+    def __exit__(self, *args):
+        self.servidor.shutdown()
+        self.hilo.join()
+
+
+def iniciar_aplicacion(tamano, semilla=42, regenerar=False, config='production', **config_overrides):
+    """
+    Crea la aplicación sobre una copia de trabajo de la base de datos generada.
+    Por defecto usa la configuración de producción (CSRF activo, sin debug).
+    """
+    uri = preparar_base_datos(tamano, semilla=semilla, regenerar=regenerar)
+    config_overrides.setdefault('SQLALCHEMY_DATABASE_URI', uri)
+    return create_app(config, **config_overrides)
@@ -0,0 +1,173 @@
+"""Benchmark del modo por tienda: ventas simultáneas en tiendas distintas (ver run_shard_benchmark.py)"""
+import json
+import os
+import random
+import shutil
+import threading
+import time
+from collections import namedtuple
+from datetime import datetime
+from flask import g
+from app import create_app, db
+from app.models import User, Role, Staff, Client, Product, StoreInventory
+from app.seeds.generator import dominio_correo, PASSWORD_GENERADA
+from app.services.inventory_service import descontar_venta
+from app.services.sale_service import registrar_compra, registrar_ventas_producto
+from app.services.seller_service import registrar_ventas_vendedor, periodo_de
+from app.services.shard_service import repartir_en_tiendas, consolidar_tiendas
+from benchmarks.runner import _percentil, preparar_base_datos, BENCH_DIR
+
+# Vendedor y productos con stock de sobra de una tienda
+Puesto = namedtuple('Puesto', 'tienda_id empleado_id email productos')
+
+
+def preparar_tiendas(tamano, semilla=42, tiendas=4, regenerar=False):
+    """
+    Copia de trabajo de la BD generada, repartida en una BD por tienda.
+    Devuelve la aplicación en modo por tienda, un Puesto por tienda y los clientes.
+    """
+    uri = preparar_base_datos(tamano, semilla=semilla, regenerar=regenerar)
+    directorio = os.path.join(BENCH_DIR, f'{tamano}-{semilla}-tiendas')
+    shutil.rmtree(directorio, ignore_errors=True)
+    app = create_app('testing', SQLALCHEMY_DATABASE_URI=uri, STORE_SHARDING=True, STORE_SHARD_DIR=directorio)
+
+    with app.app_context():
+        puestos = {}
+        vendedores = db.session.query(Staff.tienda_id, Staff.id_empleado, User.email) \
+            .join(User, Staff.usuario_id == User.id_usuario).join(Role, User.rol_id == Role.id_rol) \
+            .filter(Role.nombre == 'Vendedor', Staff.tienda_id.isnot(None), User.activo == True,
+                    User.email.like(f'%@{dominio_correo(semilla)}')) \
+            .order_by(Staff.tienda_id, User.id_usuario)
+        for tienda_id, empleado_id, email in vendedores:
+            if tienda_id in puestos or len(puestos) == tiendas:
+                continue
+            # El inventario aún está en la BD principal: se elige antes de repartirlo
+            productos = [p for (p,) in db.session.query(StoreInventory.id_producto)
+                         .join(Product, Product.id_producto == StoreInventory.id_producto)
+                         .filter(StoreInventory.tienda_id == tienda_id, StoreInventory.stock > 100,
+                                 Product.activo == True, Product.stock - Product.reservado > 1000)
+                         .order_by(StoreInventory.id_producto).limit(50)]
+            if productos:
+                puestos[tienda_id] = Puesto(tienda_id, empleado_id, email, productos)
+        if len(puestos) < 2:
+            raise RuntimeError('Se necesitan al menos dos tiendas con vendedor y stock para el benchmark')
+        clientes = [c for (c,) in db.session.query(Client.id_cliente)
+                    .filter(Client.activo == True).order_by(Client.id_cliente).limit(1000)]
+        repartir_en_tiendas()
+
+    return app, list(puestos.values()), clientes
+
+
+def _iniciar_sesion(app, email):
+    cliente = app.test_client()
+    respuesta = cliente.post('/login', data={'email': email, 'password': PASSWORD_GENERADA})
+    if respuesta.status_code != 302:
+        raise RuntimeError(f'No se pudo iniciar sesión como {email}')
+    return cliente
+
+
+def _vender(app, puesto, clientes, ventas, semilla, latencias, errores):
+    """Crea `ventas` ventas de 3 productos por HTTP y anota la latencia de cada una"""
+    rng = random.Random(semilla)
+    cliente = _iniciar_sesion(app, puesto.email)
+    for _ in range(ventas):
+        productos = rng.sample(puesto.productos, min(3, len(puesto.productos)))
+        inicio = time.perf_counter()
+        respuesta = cliente.post('/sales/create', data={
+            'cliente_id': rng.choice(clientes),
+            'total': '1',
+            'productos': json.dumps([{'producto_id': p, 'cantidad': 1} for p in productos]),
+        })
+        latencias.append((time.perf_counter() - inicio) * 1000)
+        # Una venta creada redirige a su detalle; un error vuelve al formulario
+        if respuesta.status_code != 302 or '/sales/create' in respuesta.headers.get('Location', ''):
+            errores.append(respuesta.status_code)
+
+
+def _resumen(latencias, errores, duracion):
+    latencias = sorted(latencias)
+    return {
+        'ventas': len(latencias),
+        'errores': len(errores),
+        'ventas_por_segundo': round(len(latencias) / duracion, 1) if duracion else None,
+        'p50_ms': round(_percentil(latencias, 50), 3),
+        'p95_ms': round(_percentil(latencias, 95), 3),
+        'max_ms': round(latencias[-1], 3),
+    }
+
+
+def medir_concurrencia(app, puestos, clientes, ventas=50, semilla=42):
+    """Un hilo por tienda, todos a la vez, cada uno con `ventas` ventas"""
+    latencias, errores = [], []
+    hilos = [threading.Thread(target=_vender, args=(app, p, clientes, ventas, semilla + i, latencias, errores))
+             for i, p in enumerate(puestos)]
+    inicio = time.perf_counter()
+    for hilo in hilos:
+        hilo.start()
+    for hilo in hilos:
+        hilo.join()
+    return dict(_resumen(latencias, errores, time.perf_counter() - inicio), tiendas=len(puestos))
+
+
+def _venta_abierta(app, puesto, cliente_id, espera, lista):
+    """
+    Escribe lo mismo que una venta en la tienda del puesto (stock y resúmenes)
+    y mantiene la transacción abierta `espera` segundos; al final la deshace
+    para no alterar los datos.
+    """
+    with app.test_request_context():
+        g.tienda_shard = puesto.tienda_id
+        try:
+            fecha = datetime.utcnow()
+            id_producto = puesto.productos[0]
+            descontar_venta(puesto.tienda_id, {id_producto: 1})
+            registrar_compra(cliente_id, 100, fecha)
+            registrar_ventas_producto({(fecha.date(), puesto.tienda_id, id_producto): (1, 1, 100)})
+            registrar_ventas_vendedor({(periodo_de(fecha), puesto.empleado_id): (1, 1, 100)})
+            lista.set()
+            time.sleep(espera)
+        finally:
+            lista.set()
+            db.session.rollback()
+
+
+def medir_bloqueo(app, lenta, puesto, clientes, espera=2.0, ventas=20, semilla=42):
+    """
+    Ventas en `puesto` mientras una venta de `lenta` tiene su transacción
+    abierta `espera` segundos. Si las tiendas no se bloquean entre sí, la
+    latencia máxima queda muy por debajo de `espera`; con la misma tienda
+    en ambos lados sirve de control (la primera venta espera).
+    """
+    lista = threading.Event()
+    hilo = threading.Thread(target=_venta_abierta, args=(app, lenta, clientes[0], espera, lista))
+    hilo.start()
+    lista.wait()
+    latencias, errores = [], []
+    inicio = time.perf_counter()
+    _vender(app, puesto, clientes, ventas, semilla, latencias, errores)
+    duracion = time.perf_counter() - inicio
+    hilo.join()
+    return dict(_resumen(latencias, errores, duracion), espera_ms=espera * 1000,
+                misma_tienda=lenta.tienda_id == puesto.tienda_id)
+
+
+def ejecutar(tamano='tiny', semilla=42, tiendas=4, ventas=50, espera=2.0, regenerar=False):
+    """Prepara las tiendas y ejecuta las mediciones de concurrencia y de bloqueo"""
+    app, puestos, clientes = preparar_tiendas(tamano, semilla=semilla, tiendas=tiendas, regenerar=regenerar)
+    resultado = {
+        'fecha': datetime.utcnow().isoformat(),
+        'tamano': tamano,
+        'semilla': semilla,
+        'una_tienda': medir_concurrencia(app, puestos[:1], clientes, ventas=ventas, semilla=semilla),
+        'varias_tiendas': medir_concurrencia(app, puestos, clientes, ventas=ventas, semilla=semilla),
+        'otra_tienda_bloqueada': medir_bloqueo(app, puestos[0], puestos[1], clientes, espera=espera,
+                                               semilla=semilla),
+        'misma_tienda_bloqueada': medir_bloqueo(app, puestos[0], puestos[0], clientes, espera=espera,
+                                                semilla=semilla),
+    }
+    with app.app_context():
+        inicio = time.perf_counter()
+        consolidadas = consolidar_tiendas()
+        resultado['consolidacion'] = {'filas': consolidadas,
+                                      'duracion_ms': round((time.perf_counter() - inicio) * 1000, 3)}
+    return resultado
@@ -0,0 +1,97 @@
+"""Categorías de producto normalizadas (tabla categorias y productos.categoria_id)
+
+Revision ID: 3f1c2a7d9b40
+Revises:
+Create Date: 2026-10-19 12:30:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '3f1c2a7d9b40'
+down_revision = None
+branch_labels = None
+depends_on = None
+
+SIN_CATEGORIA = 'Sin categoría'
+
+categorias = sa.table(
+    'categorias',
+    sa.column('id_categoria', sa.Integer),
+    sa.column('nombre', sa.String),
+    sa.column('activo', sa.Boolean),
+)
+
+
+def _columnas(inspector, tabla):
+    return {c['name'] for c in inspector.get_columns(tabla)}
+
+
+def upgrade():
+    # La aplicación ejecuta db.create_all() al iniciar, así que la tabla nueva
+    # puede existir ya; solo se crea lo que falta.
+    bind = op.get_bind()
+    inspector = sa.inspect(bind)
+
+    if not inspector.has_table('categorias'):
+        op.create_table(
+            'categorias',
+            sa.Column('id_categoria', sa.Integer(), primary_key=True),
+            sa.Column('nombre', sa.String(length=100), nullable=False, unique=True),
+            sa.Column('activo', sa.Boolean(), nullable=True),
+        )
+
+    if 'categoria_id' in _columnas(inspector, 'productos'):
+        return
+
+    with op.batch_alter_table('productos') as batch_op:
+        batch_op.add_column(sa.Column('categoria_id', sa.Integer(), nullable=True))
+
+    # Backfill: una categoría por texto distinto (sin distinguir mayúsculas ni espacios)
+    existentes = {nombre.lower(): id_categoria for id_categoria, nombre in
+                  bind.execute(sa.select(categorias.c.id_categoria, categorias.c.nombre))}
+    textos = [texto for (texto,) in bind.execute(sa.text('SELECT DISTINCT categoria FROM productos'))]
+    nuevas = {}
+    for texto in textos:
+        nombre = (texto or '').strip() or SIN_CATEGORIA
+        if nombre.lower() not in existentes:
+            nuevas.setdefault(nombre.lower(), nombre)
+    if nuevas:
+        op.bulk_insert(categorias, [{'nombre': nombre, 'activo': True} for nombre in nuevas.values()])
+        existentes = {nombre.lower(): id_categoria for id_categoria, nombre in
+                      bind.execute(sa.select(categorias.c.id_categoria, categorias.c.nombre))}
+
+    actualizaciones = [
+        {'p_texto': texto, 'p_id': existentes[((texto or '').strip() or SIN_CATEGORIA).lower()]}
+        for texto in textos if texto is not None
+    ]
+    if actualizaciones:
+        bind.execute(sa.text('UPDATE productos SET categoria_id = :p_id WHERE categoria = :p_texto'),
+                     actualizaciones)
+    if None in textos:
+        bind.execute(sa.text('UPDATE productos SET categoria_id = :p_id WHERE categoria IS NULL'),
+                     {'p_id': existentes[SIN_CATEGORIA.lower()]})
+
+    with op.batch_alter_table('productos') as batch_op:
+        batch_op.alter_column('categoria_id', existing_type=sa.Integer(), nullable=False)
+        batch_op.create_foreign_key('fk_productos_categoria_id', 'categorias', ['categoria_id'], ['id_categoria'])
+        batch_op.create_index('ix_productos_categoria_id', ['categoria_id'])
+        batch_op.drop_column('categoria')
+
+
+def downgrade():
+    with op.batch_alter_table('productos') as batch_op:
+        batch_op.add_column(sa.Column('categoria', sa.String(length=100), nullable=True))
+
+    op.execute('UPDATE productos SET categoria = '
+               '(SELECT nombre FROM categorias WHERE categorias.id_categoria = productos.categoria_id)')
+
+    with op.batch_alter_table('productos') as batch_op:
+        batch_op.alter_column('categoria', existing_type=sa.String(length=100), nullable=False)
+        batch_op.drop_index('ix_productos_categoria_id')
+        batch_op.drop_constraint('fk_productos_categoria_id', type_='foreignkey')
+        batch_op.drop_column('categoria_id')
+
+    op.drop_table('categorias')
@@ -0,0 +1,46 @@
+"""Resumen de compras por cliente (tabla resumen_clientes) e índice de historial en ventas
+
+Revision ID: 6e2b9d4f7c13
+Revises: d41a7c2e9f08
+Create Date: 2026-10-19 16:40:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '6e2b9d4f7c13'
+down_revision = 'd41a7c2e9f08'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    bind = op.get_bind()
+    inspector = sa.inspect(bind)
+
+    if not inspector.has_table('resumen_clientes'):
+        op.create_table(
+            'resumen_clientes',
+            sa.Column('cliente_id', sa.Integer(), sa.ForeignKey('clientes.id_cliente'), primary_key=True),
+            sa.Column('total_gastado', sa.Numeric(precision=14, scale=2), nullable=False),
+            sa.Column('num_compras', sa.Integer(), nullable=False),
+            sa.Column('ultima_compra', sa.DateTime(), nullable=True),
+        )
+
+    if 'ix_ventas_cliente_fecha' not in {i['name'] for i in inspector.get_indexes('ventas')}:
+        op.create_index('ix_ventas_cliente_fecha', 'ventas', ['cliente_id', 'fecha'])
+
+    # Backfill con un solo GROUP BY; se recalcula aunque create_all haya creado la tabla vacía
+    op.execute('DELETE FROM resumen_clientes')
+    op.execute(sa.text(
+        'INSERT INTO resumen_clientes (cliente_id, total_gastado, num_compras, ultima_compra) '
+        'SELECT cliente_id, SUM(total), COUNT(*), MAX(fecha) FROM ventas '
+        'WHERE activo = :activo GROUP BY cliente_id'
+    ).bindparams(activo=True))
+
+
+def downgrade():
+    op.drop_index('ix_ventas_cliente_fecha', table_name='ventas')
+    op.drop_table('resumen_clientes')
@@ -0,0 +1,43 @@
+"""Contadores de cambios por tabla para la caché de datos de referencia
+
+Revision ID: 8c5e0b3f6a21
+Revises: 3f1c2a7d9b40
+Create Date: 2026-10-19 14:10:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '8c5e0b3f6a21'
+down_revision = '3f1c2a7d9b40'
+branch_labels = None
+depends_on = None
+
+TABLAS = ('ciudades', 'tiendas', 'proveedores', 'roles')
+
+versiones_tabla = sa.table(
+    'versiones_tabla',
+    sa.column('tabla', sa.String),
+    sa.column('version', sa.Integer),
+)
+
+
+def upgrade():
+    bind = op.get_bind()
+    if not sa.inspect(bind).has_table('versiones_tabla'):
+        op.create_table(
+            'versiones_tabla',
+            sa.Column('tabla', sa.String(length=50), primary_key=True),
+            sa.Column('version', sa.Integer(), nullable=False),
+        )
+
+    existentes = {t for (t,) in bind.execute(sa.select(versiones_tabla.c.tabla))}
+    faltantes = [{'tabla': t, 'version': 0} for t in TABLAS if t not in existentes]
+    if faltantes:
+        op.bulk_insert(versiones_tabla, faltantes)
+
+
+def downgrade():
+    op.drop_table('versiones_tabla')
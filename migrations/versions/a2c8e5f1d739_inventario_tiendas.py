@@ -0,0 +1,81 @@
+"""Inventario por tienda (tabla inventario_tiendas) y tienda destino en ordenes_proveedor
+
+Revision ID: a2c8e5f1d739
+Revises: f37b9c2d6e41
+Create Date: 2026-10-19 22:15:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'a2c8e5f1d739'
+down_revision = 'f37b9c2d6e41'
+branch_labels = None
+depends_on = None
+
+inventario = sa.table(
+    'inventario_tiendas',
+    sa.column('tienda_id', sa.Integer),
+    sa.column('id_producto', sa.Integer),
+    sa.column('stock', sa.Integer),
+)
+
+
+def _ubicar_stock_existente(bind):
+    """
+    El stock actual no tiene ubicación: cada producto queda completo en la
+    tienda que más unidades ha vendido de él, o en la primera tienda activa.
+    """
+    tienda_por_defecto = bind.execute(
+        sa.text('SELECT MIN(id_tienda) FROM tiendas WHERE activo = :activo').bindparams(activo=True)
+    ).scalar()
+    if tienda_por_defecto is None:
+        return
+
+    vendidas = {}
+    for id_producto, tienda_id, unidades in bind.execute(sa.text(
+            'SELECT vp.id_producto, v.tienda_id, SUM(vp.cantidad) FROM venta_producto vp '
+            'JOIN ventas v ON v.id_venta = vp.id_venta '
+            'WHERE v.tienda_id IS NOT NULL GROUP BY vp.id_producto, v.tienda_id')):
+        mejor = vendidas.get(id_producto)
+        if mejor is None or (unidades, -tienda_id) > (mejor[1], -mejor[0]):
+            vendidas[id_producto] = (tienda_id, unidades)
+
+    filas = [
+        {'tienda_id': vendidas.get(id_producto, (tienda_por_defecto,))[0], 'id_producto': id_producto, 'stock': stock}
+        for id_producto, stock in bind.execute(sa.text('SELECT id_producto, stock FROM productos WHERE stock > 0'))
+    ]
+    if filas:
+        op.bulk_insert(inventario, filas)
+
+
+def upgrade():
+    bind = op.get_bind()
+    inspector = sa.inspect(bind)
+
+    if not inspector.has_table('inventario_tiendas'):
+        op.create_table(
+            'inventario_tiendas',
+            sa.Column('tienda_id', sa.Integer(), sa.ForeignKey('tiendas.id_tienda'), primary_key=True),
+            sa.Column('id_producto', sa.Integer(), sa.ForeignKey('productos.id_producto'), primary_key=True),
+            sa.Column('stock', sa.Integer(), nullable=False),
+            sa.CheckConstraint('stock >= 0', name='ck_inventario_tiendas_stock'),
+        )
+        op.create_index('ix_inventario_tiendas_id_producto', 'inventario_tiendas', ['id_producto'])
+
+    if not bind.execute(sa.text('SELECT 1 FROM inventario_tiendas LIMIT 1')).first():
+        _ubicar_stock_existente(bind)
+
+    if 'tienda_id' not in {c['name'] for c in inspector.get_columns('ordenes_proveedor')}:
+        with op.batch_alter_table('ordenes_proveedor') as batch_op:
+            batch_op.add_column(sa.Column('tienda_id', sa.Integer(), nullable=True))
+            batch_op.create_foreign_key('fk_ordenes_proveedor_tienda_id', 'tiendas', ['tienda_id'], ['id_tienda'])
+
+
+def downgrade():
+    with op.batch_alter_table('ordenes_proveedor') as batch_op:
+        batch_op.drop_constraint('fk_ordenes_proveedor_tienda_id', type_='foreignkey')
+        batch_op.drop_column('tienda_id')
+    op.drop_table('inventario_tiendas')
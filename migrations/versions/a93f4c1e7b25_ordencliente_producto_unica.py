@@ -0,0 +1,50 @@
+"""Restricción única (id_orden_cliente, id_producto) en ordencliente_producto
+
+Revision ID: a93f4c1e7b25
+Revises: 6e2b9d4f7c13
+Create Date: 2026-10-19 17:30:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'a93f4c1e7b25'
+down_revision = '6e2b9d4f7c13'
+branch_labels = None
+depends_on = None
+
+NOMBRE = 'uq_ordencliente_producto'
+
+
+def upgrade():
+    inspector = sa.inspect(op.get_bind())
+    if NOMBRE in {u['name'] for u in inspector.get_unique_constraints('ordencliente_producto')}:
+        return
+
+    # Las líneas repetidas se funden en la más antigua sumando sus cantidades
+    op.execute(
+        'UPDATE ordencliente_producto SET cantidad = ('
+        '  SELECT SUM(o.cantidad) FROM ordencliente_producto o'
+        '  WHERE o.id_orden_cliente = ordencliente_producto.id_orden_cliente'
+        '    AND o.id_producto = ordencliente_producto.id_producto'
+        ') WHERE id_orden_producto IN ('
+        '  SELECT MIN(id_orden_producto) FROM ordencliente_producto'
+        '  GROUP BY id_orden_cliente, id_producto HAVING COUNT(*) > 1'
+        ')'
+    )
+    op.execute(
+        'DELETE FROM ordencliente_producto WHERE id_orden_producto NOT IN ('
+        '  SELECT MIN(id_orden_producto) FROM ordencliente_producto'
+        '  GROUP BY id_orden_cliente, id_producto'
+        ')'
+    )
+
+    with op.batch_alter_table('ordencliente_producto') as batch_op:
+        batch_op.create_unique_constraint(NOMBRE, ['id_orden_cliente', 'id_producto'])
+
+
+def downgrade():
+    with op.batch_alter_table('ordencliente_producto') as batch_op:
+        batch_op.drop_constraint(NOMBRE, type_='unique')
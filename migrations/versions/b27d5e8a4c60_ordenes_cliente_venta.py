@@ -0,0 +1,34 @@
+"""Venta generada al cumplir una orden de cliente (ordenes_cliente.venta_id)
+
+Revision ID: b27d5e8a4c60
+Revises: a93f4c1e7b25
+Create Date: 2026-10-19 18:30:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'b27d5e8a4c60'
+down_revision = 'a93f4c1e7b25'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    inspector = sa.inspect(op.get_bind())
+    if 'venta_id' in {c['name'] for c in inspector.get_columns('ordenes_cliente')}:
+        return
+
+    with op.batch_alter_table('ordenes_cliente') as batch_op:
+        batch_op.add_column(sa.Column('venta_id', sa.Integer(), nullable=True))
+        batch_op.create_foreign_key('fk_ordenes_cliente_venta_id', 'ventas', ['venta_id'], ['id_venta'])
+        batch_op.create_unique_constraint('uq_ordenes_cliente_venta_id', ['venta_id'])
+
+
+def downgrade():
+    with op.batch_alter_table('ordenes_cliente') as batch_op:
+        batch_op.drop_constraint('uq_ordenes_cliente_venta_id', type_='unique')
+        batch_op.drop_constraint('fk_ordenes_cliente_venta_id', type_='foreignkey')
+        batch_op.drop_column('venta_id')
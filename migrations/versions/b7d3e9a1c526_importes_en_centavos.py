@@ -0,0 +1,60 @@
+"""Importes de ventas, líneas, facturas y resúmenes en centavos enteros
+
+Revision ID: b7d3e9a1c526
+Revises: a2c8e5f1d739
+Create Date: 2026-10-20 09:30:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'b7d3e9a1c526'
+down_revision = 'a2c8e5f1d739'
+branch_labels = None
+depends_on = None
+
+# (tabla, columna decimal anterior, columna en centavos, tipo entero, precisión anterior)
+COLUMNAS = (
+    ('ventas', 'total', 'total_centavos', sa.Integer(), (10, 2)),
+    ('venta_producto', 'precio_unitario', 'precio_unitario_centavos', sa.Integer(), (10, 2)),
+    ('facturas', 'total', 'total_centavos', sa.Integer(), (10, 2)),
+    ('resumen_clientes', 'total_gastado', 'total_gastado_centavos', sa.BigInteger(), (14, 2)),
+)
+
+
+def upgrade():
+    bind = op.get_bind()
+    inspector = sa.inspect(bind)
+
+    for tabla, anterior, centavos, tipo, _ in COLUMNAS:
+        columnas = {c['name'] for c in inspector.get_columns(tabla)}
+        # create_all ya crea las tablas nuevas con la columna en centavos
+        if anterior not in columnas or centavos in columnas:
+            continue
+        with op.batch_alter_table(tabla) as batch_op:
+            batch_op.add_column(sa.Column(centavos, tipo, nullable=True))
+        op.execute(f'UPDATE {tabla} SET {centavos} = CAST(ROUND(COALESCE({anterior}, 0) * 100) AS {tipo.compile(bind.dialect)})')
+        with op.batch_alter_table(tabla) as batch_op:
+            batch_op.alter_column(centavos, existing_type=tipo, nullable=False)
+            batch_op.drop_column(anterior)
+
+    # El resumen por cliente se recalcula desde las ventas ya en centavos: así
+    # coincide con la suma de los totales redondeados aunque 6e2b9d4f7c13 no lo haya llenado
+    op.execute('DELETE FROM resumen_clientes')
+    op.execute(sa.text(
+        'INSERT INTO resumen_clientes (cliente_id, total_gastado_centavos, num_compras, ultima_compra) '
+        'SELECT cliente_id, SUM(total_centavos), COUNT(*), MAX(fecha) FROM ventas '
+        'WHERE activo = :activo GROUP BY cliente_id'
+    ).bindparams(activo=True))
+
+
+def downgrade():
+    for tabla, anterior, centavos, tipo, (precision, escala) in COLUMNAS:
+        with op.batch_alter_table(tabla) as batch_op:
+            batch_op.add_column(sa.Column(anterior, sa.Numeric(precision, escala), nullable=True))
+        op.execute(f'UPDATE {tabla} SET {anterior} = {centavos} / 100.0')
+        with op.batch_alter_table(tabla) as batch_op:
+            batch_op.alter_column(anterior, existing_type=sa.Numeric(precision, escala), nullable=False)
+            batch_op.drop_column(centavos)
@@ -0,0 +1,48 @@
+"""Reservas de stock de órdenes de cliente (tabla reservas_stock y productos.reservado)
+
+Revision ID: c5a81f3e2d94
+Revises: b27d5e8a4c60
+Create Date: 2026-10-19 19:30:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'c5a81f3e2d94'
+down_revision = 'b27d5e8a4c60'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    inspector = sa.inspect(op.get_bind())
+
+    if not inspector.has_table('reservas_stock'):
+        op.create_table(
+            'reservas_stock',
+            sa.Column('id_reserva', sa.Integer(), primary_key=True),
+            sa.Column('id_orden_cliente', sa.Integer(), sa.ForeignKey('ordenes_cliente.id_orden_cliente'),
+                      nullable=False),
+            sa.Column('id_producto', sa.Integer(), sa.ForeignKey('productos.id_producto'), nullable=False),
+            sa.Column('cantidad', sa.Integer(), nullable=False),
+            sa.Column('fecha', sa.DateTime(), nullable=False),
+            sa.Column('expira', sa.DateTime(), nullable=False),
+            sa.UniqueConstraint('id_orden_cliente', 'id_producto', name='uq_reservas_stock_orden_producto'),
+        )
+        op.create_index('ix_reservas_stock_id_producto', 'reservas_stock', ['id_producto'])
+        op.create_index('ix_reservas_stock_expira', 'reservas_stock', ['expira'])
+
+    # Las órdenes pendientes existentes no tienen reservas: el contador empieza en 0
+    if 'reservado' not in {c['name'] for c in inspector.get_columns('productos')}:
+        with op.batch_alter_table('productos') as batch_op:
+            batch_op.add_column(sa.Column('reservado', sa.Integer(), nullable=False, server_default='0'))
+
+
+def downgrade():
+    with op.batch_alter_table('productos') as batch_op:
+        batch_op.drop_column('reservado')
+    op.drop_index('ix_reservas_stock_expira', table_name='reservas_stock')
+    op.drop_index('ix_reservas_stock_id_producto', table_name='reservas_stock')
+    op.drop_table('reservas_stock')
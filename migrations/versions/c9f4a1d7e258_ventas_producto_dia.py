@@ -0,0 +1,47 @@
+"""Agregado de ventas por día, tienda y producto (tabla ventas_producto_dia)
+
+Revision ID: c9f4a1d7e258
+Revises: b7d3e9a1c526
+Create Date: 2026-10-20 11:10:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'c9f4a1d7e258'
+down_revision = 'b7d3e9a1c526'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    bind = op.get_bind()
+    inspector = sa.inspect(bind)
+
+    if not inspector.has_table('ventas_producto_dia'):
+        op.create_table(
+            'ventas_producto_dia',
+            sa.Column('fecha', sa.Date(), primary_key=True),
+            sa.Column('tienda_id', sa.Integer(), sa.ForeignKey('tiendas.id_tienda'), primary_key=True),
+            sa.Column('id_producto', sa.Integer(), sa.ForeignKey('productos.id_producto'), primary_key=True),
+            sa.Column('ventas', sa.Integer(), nullable=False),
+            sa.Column('unidades', sa.Integer(), nullable=False),
+            sa.Column('importe_centavos', sa.BigInteger(), nullable=False),
+        )
+
+    # Backfill con un solo GROUP BY; se recalcula aunque create_all haya creado la tabla vacía
+    fecha = 'CAST(v.fecha AS DATE)' if bind.dialect.name == 'postgresql' else 'date(v.fecha)'
+    op.execute('DELETE FROM ventas_producto_dia')
+    op.execute(sa.text(
+        'INSERT INTO ventas_producto_dia (fecha, tienda_id, id_producto, ventas, unidades, importe_centavos) '
+        f'SELECT {fecha}, v.tienda_id, vp.id_producto, COUNT(*), SUM(vp.cantidad), '
+        'SUM(vp.cantidad * vp.precio_unitario_centavos) '
+        'FROM venta_producto vp JOIN ventas v ON v.id_venta = vp.id_venta '
+        f'WHERE v.activo = :activo GROUP BY {fecha}, v.tienda_id, vp.id_producto'
+    ).bindparams(activo=True))
+
+
+def downgrade():
+    op.drop_table('ventas_producto_dia')
@@ -0,0 +1,76 @@
+"""Columnas normalizadas e índices para buscar clientes por nombre y teléfono
+
+Revision ID: d41a7c2e9f08
+Revises: 8c5e0b3f6a21
+Create Date: 2026-10-19 15:20:00.000000
+
+"""
+import re
+import unicodedata
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'd41a7c2e9f08'
+down_revision = '8c5e0b3f6a21'
+branch_labels = None
+depends_on = None
+
+LOTE = 10000
+
+
+# Copia de app.utils.formatters para que la migración no dependa del código actual
+def _normalizar_texto(texto):
+    if not texto:
+        return ''
+    sin_tildes = unicodedata.normalize('NFKD', texto).encode('ascii', 'ignore').decode('ascii')
+    return re.sub(r'\s+', ' ', sin_tildes).strip().lower()
+
+
+def _normalizar_telefono(telefono):
+    return re.sub(r'\D+', '', telefono or '')
+
+
+def upgrade():
+    bind = op.get_bind()
+    inspector = sa.inspect(bind)
+    columnas = {c['name'] for c in inspector.get_columns('clientes')}
+    indices = {i['name'] for i in inspector.get_indexes('clientes')}
+
+    # Si db.create_all() ya creó las columnas, la aplicación las mantiene al escribir
+    rellenar = not {'nombre_normalizado', 'telefono_normalizado'} <= columnas
+
+    with op.batch_alter_table('clientes') as batch_op:
+        if 'nombre_normalizado' not in columnas:
+            batch_op.add_column(sa.Column('nombre_normalizado', sa.String(length=100), nullable=True))
+        if 'telefono_normalizado' not in columnas:
+            batch_op.add_column(sa.Column('telefono_normalizado', sa.String(length=50), nullable=True))
+
+    # Backfill por lotes con paginación por clave para no cargar toda la tabla
+    ultimo_id = 0
+    while rellenar:
+        filas = bind.execute(sa.text(
+            'SELECT id_cliente, nombre, telefono FROM clientes WHERE id_cliente > :ultimo '
+            'ORDER BY id_cliente LIMIT :lote'), {'ultimo': ultimo_id, 'lote': LOTE}).all()
+        if not filas:
+            break
+        bind.execute(sa.text(
+            'UPDATE clientes SET nombre_normalizado = :p_nombre, telefono_normalizado = :p_telefono '
+            'WHERE id_cliente = :p_id'),
+            [{'p_id': id_cliente, 'p_nombre': _normalizar_texto(nombre), 'p_telefono': _normalizar_telefono(telefono)}
+             for id_cliente, nombre, telefono in filas])
+        ultimo_id = filas[-1][0]
+
+    if 'ix_clientes_nombre_normalizado' not in indices:
+        op.create_index('ix_clientes_nombre_normalizado', 'clientes', ['nombre_normalizado'])
+    if 'ix_clientes_telefono_normalizado' not in indices:
+        op.create_index('ix_clientes_telefono_normalizado', 'clientes', ['telefono_normalizado'])
+
+
+def downgrade():
+    op.drop_index('ix_clientes_telefono_normalizado', table_name='clientes')
+    op.drop_index('ix_clientes_nombre_normalizado', table_name='clientes')
+    with op.batch_alter_table('clientes') as batch_op:
+        batch_op.drop_column('telefono_normalizado')
+        batch_op.drop_column('nombre_normalizado')
@@ -0,0 +1,51 @@
+"""Totales mensuales y comisiones por vendedor (tabla ventas_vendedor_mes)
+
+Revision ID: d5b8e2c4a917
+Revises: c9f4a1d7e258
+Create Date: 2026-10-20 14:20:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'd5b8e2c4a917'
+down_revision = 'c9f4a1d7e258'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    bind = op.get_bind()
+    inspector = sa.inspect(bind)
+
+    if not inspector.has_table('ventas_vendedor_mes'):
+        op.create_table(
+            'ventas_vendedor_mes',
+            sa.Column('periodo', sa.Date(), primary_key=True),
+            sa.Column('empleado_id', sa.Integer(), sa.ForeignKey('personal.id_empleado'), primary_key=True),
+            sa.Column('ventas', sa.Integer(), nullable=False),
+            sa.Column('unidades', sa.Integer(), nullable=False),
+            sa.Column('importe_centavos', sa.BigInteger(), nullable=False),
+            sa.Column('comision_centavos', sa.BigInteger(), nullable=True),
+            sa.Column('comision_calculada', sa.DateTime(), nullable=True),
+        )
+
+    # Backfill de los totales con un solo GROUP BY; las comisiones se fijan con run_commissions.py
+    if bind.dialect.name == 'postgresql':
+        periodo = "CAST(date_trunc('month', v.fecha) AS DATE)"
+    else:
+        periodo = "date(v.fecha, 'start of month')"
+    op.execute('DELETE FROM ventas_vendedor_mes')
+    op.execute(sa.text(
+        'INSERT INTO ventas_vendedor_mes (periodo, empleado_id, ventas, unidades, importe_centavos) '
+        f'SELECT {periodo}, v.empleado_id, COUNT(DISTINCT v.id_venta), SUM(vp.cantidad), '
+        'SUM(vp.cantidad * vp.precio_unitario_centavos) '
+        'FROM venta_producto vp JOIN ventas v ON v.id_venta = vp.id_venta '
+        f'WHERE v.activo = :activo GROUP BY {periodo}, v.empleado_id'
+    ).bindparams(activo=True))
+
+
+def downgrade():
+    op.drop_table('ventas_vendedor_mes')
@@ -0,0 +1,28 @@
+"""Índice (cliente_id, estado, fecha) para el historial de órdenes de cliente
+
+Revision ID: d8e36b0a5f17
+Revises: c5a81f3e2d94
+Create Date: 2026-10-19 20:15:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'd8e36b0a5f17'
+down_revision = 'c5a81f3e2d94'
+branch_labels = None
+depends_on = None
+
+INDICE = 'ix_ordenes_cliente_cliente_estado_fecha'
+
+
+def upgrade():
+    inspector = sa.inspect(op.get_bind())
+    if INDICE not in {i['name'] for i in inspector.get_indexes('ordenes_cliente')}:
+        op.create_index(INDICE, 'ordenes_cliente', ['cliente_id', 'estado', 'fecha'])
+
+
+def downgrade():
+    op.drop_index(INDICE, table_name='ordenes_cliente')
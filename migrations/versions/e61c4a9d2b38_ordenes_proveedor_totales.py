@@ -0,0 +1,63 @@
+"""Totales precalculados e índices de listado en ordenes_proveedor
+
+Revision ID: e61c4a9d2b38
+Revises: d8e36b0a5f17
+Create Date: 2026-10-19 20:50:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'e61c4a9d2b38'
+down_revision = 'd8e36b0a5f17'
+branch_labels = None
+depends_on = None
+
+INDICES = {
+    'ordenes_proveedor': {
+        'ix_ordenes_proveedor_estado_fecha': ['estado', 'fecha'],
+        'ix_ordenes_proveedor_proveedor_estado_fecha': ['proveedor_id', 'estado', 'fecha'],
+    },
+    'ordenproveedor_producto': {
+        'ix_ordenproveedor_producto_id_orden_proveedor': ['id_orden_proveedor'],
+    },
+}
+
+
+def upgrade():
+    inspector = sa.inspect(op.get_bind())
+    columnas = {c['name'] for c in inspector.get_columns('ordenes_proveedor')}
+
+    with op.batch_alter_table('ordenes_proveedor') as batch_op:
+        if 'num_lineas' not in columnas:
+            batch_op.add_column(sa.Column('num_lineas', sa.Integer(), nullable=False, server_default='0'))
+        if 'valor_total' not in columnas:
+            batch_op.add_column(sa.Column('valor_total', sa.Numeric(precision=14, scale=2), nullable=False,
+                                          server_default='0'))
+
+    # Backfill con el precio actual de cada producto (las líneas no guardan precio)
+    op.execute(
+        'UPDATE ordenes_proveedor SET '
+        'num_lineas = (SELECT COUNT(*) FROM ordenproveedor_producto l '
+        '              WHERE l.id_orden_proveedor = ordenes_proveedor.id_orden_proveedor), '
+        'valor_total = COALESCE((SELECT SUM(l.cantidad * p.precio) FROM ordenproveedor_producto l '
+        '                        JOIN productos p ON p.id_producto = l.id_producto '
+        '                        WHERE l.id_orden_proveedor = ordenes_proveedor.id_orden_proveedor), 0)'
+    )
+
+    for tabla, indices in INDICES.items():
+        existentes = {i['name'] for i in inspector.get_indexes(tabla)}
+        for nombre, columnas_indice in indices.items():
+            if nombre not in existentes:
+                op.create_index(nombre, tabla, columnas_indice)
+
+
+def downgrade():
+    for tabla, indices in INDICES.items():
+        for nombre in indices:
+            op.drop_index(nombre, table_name=tabla)
+    with op.batch_alter_table('ordenes_proveedor') as batch_op:
+        batch_op.drop_column('valor_total')
+        batch_op.drop_column('num_lineas')
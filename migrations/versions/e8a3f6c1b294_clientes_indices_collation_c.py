@@ -0,0 +1,33 @@
+"""Índices COLLATE "C" para la búsqueda de clientes por prefijo en PostgreSQL
+
+Revision ID: e8a3f6c1b294
+Revises: d5b8e2c4a917
+Create Date: 2026-10-21 09:30:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'e8a3f6c1b294'
+down_revision = 'd5b8e2c4a917'
+branch_labels = None
+depends_on = None
+
+COLUMNAS = ('nombre_normalizado', 'telefono_normalizado')
+
+
+def upgrade():
+    # SQLite compara en binario por defecto: los índices existentes ya sirven
+    if op.get_bind().dialect.name != 'postgresql':
+        return
+    for columna in COLUMNAS:
+        op.execute(f'CREATE INDEX IF NOT EXISTS ix_clientes_{columna}_c ON clientes ({columna} COLLATE "C")')
+
+
+def downgrade():
+    if op.get_bind().dialect.name != 'postgresql':
+        return
+    for columna in COLUMNAS:
+        op.execute(f'DROP INDEX IF EXISTS ix_clientes_{columna}_c')
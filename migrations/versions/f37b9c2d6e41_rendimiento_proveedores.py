@@ -0,0 +1,55 @@
+"""Marcas de tiempo de estado en ordenes_proveedor y tabla rendimiento_proveedores
+
+Revision ID: f37b9c2d6e41
+Revises: e61c4a9d2b38
+Create Date: 2026-10-19 21:30:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'f37b9c2d6e41'
+down_revision = 'e61c4a9d2b38'
+branch_labels = None
+depends_on = None
+
+MARCAS = ('fecha_creacion', 'fecha_recepcion', 'fecha_cancelacion')
+
+
+def upgrade():
+    inspector = sa.inspect(op.get_bind())
+    columnas = {c['name'] for c in inspector.get_columns('ordenes_proveedor')}
+
+    with op.batch_alter_table('ordenes_proveedor') as batch_op:
+        for columna in MARCAS:
+            if columna not in columnas:
+                batch_op.add_column(sa.Column(columna, sa.DateTime(), nullable=True))
+
+    # Las órdenes históricas solo tienen `fecha`; las transiciones pasadas no se conocen
+    # y quedan fuera del lead time.
+    op.execute('UPDATE ordenes_proveedor SET fecha_creacion = fecha WHERE fecha_creacion IS NULL')
+
+    if not inspector.has_table('rendimiento_proveedores'):
+        op.create_table(
+            'rendimiento_proveedores',
+            sa.Column('proveedor_id', sa.Integer(), sa.ForeignKey('proveedores.id_proveedor'), primary_key=True),
+            sa.Column('ordenes', sa.Integer(), nullable=False),
+            sa.Column('recibidas', sa.Integer(), nullable=False),
+            sa.Column('canceladas', sa.Integer(), nullable=False),
+            sa.Column('pendientes', sa.Integer(), nullable=False),
+            sa.Column('unidades_recibidas', sa.Integer(), nullable=False),
+            sa.Column('valor_recibido', sa.Numeric(precision=14, scale=2), nullable=False),
+            sa.Column('lead_time_promedio', sa.Float(), nullable=True),
+            sa.Column('lead_time_maximo', sa.Float(), nullable=True),
+            sa.Column('desde', sa.DateTime(), nullable=False),
+            sa.Column('actualizado', sa.DateTime(), nullable=False),
+        )
+
+
+def downgrade():
+    op.drop_table('rendimiento_proveedores')
+    with op.batch_alter_table('ordenes_proveedor') as batch_op:
+        for columna in reversed(MARCAS):
+            batch_op.drop_column(columna)
@@ -0,0 +1,34 @@
+import sys
+import os
+import time
+import argparse
+from datetime import datetime
+# Añadir el directorio raíz al path de Python
+sys.path.insert(0, os.path.abspath(os.path.dirname(__file__)))
+from app import create_app
+from app.services.seller_service import calcular_comisiones
+from app.services.shard_service import consolidar_tiendas
+
+parser = argparse.ArgumentParser(
+    description='Cierre de comisiones: fija la comisión de todos los vendedores de un mes según COMMISSION_TIERS')
+parser.add_argument('--periodo', help='Mes a cerrar (AAAA-MM); por defecto el mes anterior')
+parser.add_argument('--config', default=os.getenv('FLASK_CONFIG') or 'default', help='Configuración de Flask')
+args = parser.parse_args()
+
+if args.periodo:
+    periodo = datetime.strptime(args.periodo, '%Y-%m').date()
+else:
+    primero = datetime.utcnow().date().replace(day=1)
+    periodo = (primero.replace(year=primero.year - 1, month=12) if primero.month == 1
+               else primero.replace(month=primero.month - 1))
+
+app = create_app(args.config)
+inicio = time.perf_counter()
+
+with app.app_context():
+    if app.config.get('STORE_SHARDING'):
+        # Los totales del mes deben incluir lo que las tiendas aún no consolidaron
+        consolidar_tiendas()
+    print(f"Calculando comisiones de {periodo:%Y-%m}...")
+    vendedores = calcular_comisiones(periodo)
+    print(f"Comisiones fijadas para {vendedores} vendedores en {time.perf_counter() - inicio:.1f}s")
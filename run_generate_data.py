@@ -0,0 +1,28 @@
+import sys
+import os
+import time
+import argparse
+# Añadir el directorio raíz al path de Python
+sys.path.insert(0, os.path.abspath(os.path.dirname(__file__)))
+from app import create_app
+from app.seeds.generator import generar_datos, TAMANOS
+
+parser = argparse.ArgumentParser(description='Genera datos sintéticos para pruebas de carga y benchmarks')
+parser.add_argument('--tamano', choices=sorted(TAMANOS), default='small', help='Volumen de datos a generar')
+parser.add_argument('--semilla', type=int, default=42, help='Semilla del generador (mismos datos para la misma semilla)')
+parser.add_argument('--dias', type=int, default=365, help='Días de historial de ventas')
+parser.add_argument('--ventas', type=int, help='Sobrescribe el número de ventas del tamaño elegido')
+parser.add_argument('--config', default=os.getenv('FLASK_CONFIG') or 'default', help='Configuración de Flask')
+args = parser.parse_args()
+
+app = create_app(args.config)
+inicio = time.perf_counter()
+
+def mostrar_progreso(tabla, cantidad):
+    print(f"  {tabla}: {cantidad} filas ({time.perf_counter() - inicio:.1f}s)")
+
+with app.app_context():
+    print(f"Generando datos '{args.tamano}' con semilla {args.semilla}...")
+    volumenes = {'ventas': args.ventas} if args.ventas is not None else {}
+    generar_datos(args.tamano, semilla=args.semilla, dias=args.dias, progreso=mostrar_progreso, **volumenes)
+    print(f"Datos generados en {time.perf_counter() - inicio:.1f}s")
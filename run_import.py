@@ -0,0 +1,33 @@
+import sys
+import os
+import time
+import argparse
+# Añadir el directorio raíz al path de Python
+sys.path.insert(0, os.path.abspath(os.path.dirname(__file__)))
+from app import create_app
+from app.services.import_service import importar_productos_csv, IMPORT_BATCH_SIZE
+
+parser = argparse.ArgumentParser(description='Importa un catálogo de productos desde un archivo CSV')
+parser.add_argument('archivo', help='Ruta del archivo CSV')
+parser.add_argument('--lote', type=int, default=IMPORT_BATCH_SIZE, help='Filas por lote de escritura')
+parser.add_argument('--config', default=os.getenv('FLASK_CONFIG') or 'default', help='Configuración de Flask')
+args = parser.parse_args()
+
+app = create_app(args.config)
+inicio = time.perf_counter()
+
+def mostrar_progreso(resumen):
+    transcurrido = time.perf_counter() - inicio
+    print(f"  {resumen['leidas']} filas leídas | {resumen['creadas']} creadas | "
+          f"{resumen['actualizadas']} actualizadas | {resumen['con_error']} con error | {transcurrido:.1f}s")
+
+with app.app_context():
+    print(f"Importando productos desde {args.archivo}...")
+    with open(args.archivo, encoding='utf-8-sig', newline='') as archivo:
+        resumen = importar_productos_csv(archivo, tamano_lote=args.lote, progreso=mostrar_progreso)
+
+    for error in resumen['errores'][:20]:
+        print(f"  Línea {error['linea']}: {error['errores']}")
+    if resumen['con_error'] > 20:
+        print(f"  ... y {resumen['con_error'] - 20} errores más")
+    print(f"Importación finalizada en {time.perf_counter() - inicio:.1f}s")
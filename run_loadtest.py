@@ -0,0 +1,59 @@
+import sys
+import os
+import json
+import argparse
+# Añadir el directorio raíz al path de Python
+sys.path.insert(0, os.path.abspath(os.path.dirname(__file__)))
+from benchmarks.loadtest import (ejecutar_carga, credenciales_generadas, iniciar_aplicacion, ServidorLocal,
+                                 MEZCLA_POR_DEFECTO)
+from benchmarks.runner import guardar_json
+
+parser = argparse.ArgumentParser(description='Prueba de carga HTTP con usuarios virtuales por rol')
+parser.add_argument('--url', help='URL de un servidor ya iniciado; si se omite se inicia uno local')
+parser.add_argument('--credenciales', help='JSON {"Vendedor": [["email", "password"], ...], ...} (requerido con --url)')
+parser.add_argument('--tamano', default='small', help='Tamaño de datos del servidor local (tiny, small, medium, large)')
+parser.add_argument('--semilla', type=int, default=42, help='Semilla del generador de datos y del tráfico')
+parser.add_argument('--regenerar', action='store_true', help='Regenera la base de datos del servidor local')
+parser.add_argument('--config-extra', default='{}', help='JSON con claves de configuración a sobrescribir en el servidor local')
+parser.add_argument('--usuarios', type=int, default=10, help='Usuarios virtuales concurrentes')
+parser.add_argument('--duracion', type=float, default=30, help='Duración de la prueba en segundos')
+parser.add_argument('--mezcla', default=','.join(f'{r}={p}' for r, p in MEZCLA_POR_DEFECTO.items()),
+                    help='Peso de cada rol, p. ej. Vendedor=0.7,Administrador=0.2,Proveedor=0.1')
+parser.add_argument('--pausa', type=float, default=0.0, help='Pausa máxima entre acciones de un usuario (segundos)')
+parser.add_argument('--salida', help='Archivo JSON donde guardar el resultado')
+args = parser.parse_args()
+
+mezcla = {}
+for parte in args.mezcla.split(','):
+    rol, _, peso = parte.partition('=')
+    mezcla[rol.strip()] = float(peso)
+
+def mostrar(resultado):
+    print(f"Duración {resultado['duracion_s']}s  peticiones={resultado['peticiones']}  "
+          f"errores={resultado['errores']}  throughput={resultado['rps']} req/s")
+    for endpoint, datos in resultado['endpoints'].items():
+        print(f"  {endpoint:<45} n={datos['peticiones']:>6}  err={datos['errores']:>4}  {datos['rps']:>8.2f} req/s  "
+              f"p50={datos['p50_ms']:>8.2f}ms  p95={datos['p95_ms']:>8.2f}ms  p99={datos['p99_ms']:>8.2f}ms")
+
+def lanzar(url, credenciales):
+    print(f"Lanzando {args.usuarios} usuarios virtuales durante {args.duracion}s contra {url}...")
+    return ejecutar_carga(url, credenciales, usuarios=args.usuarios, duracion=args.duracion,
+                          mezcla=mezcla, semilla=args.semilla, pausa=(0.0, args.pausa))
+
+if args.url:
+    if not args.credenciales:
+        parser.error('--credenciales es requerido con --url')
+    with open(args.credenciales, encoding='utf-8') as archivo:
+        credenciales = {rol: [tuple(c) for c in lista] for rol, lista in json.load(archivo).items()}
+    resultado = lanzar(args.url, credenciales)
+else:
+    print(f"Preparando datos '{args.tamano}' e iniciando servidor local...")
+    app = iniciar_aplicacion(args.tamano, semilla=args.semilla, regenerar=args.regenerar,
+                             **json.loads(args.config_extra))
+    with ServidorLocal(app) as servidor:
+        resultado = lanzar(servidor.url, credenciales_generadas(app, args.semilla))
+
+mostrar(resultado)
+if args.salida:
+    guardar_json(resultado, args.salida)
+    print(f"Resultado guardado en {args.salida}")
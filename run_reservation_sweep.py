@@ -0,0 +1,21 @@
+import sys
+import os
+import time
+import argparse
+# Añadir el directorio raíz al path de Python
+sys.path.insert(0, os.path.abspath(os.path.dirname(__file__)))
+from app import create_app
+from app.services.reservation_service import barrer_reservas_vencidas
+
+parser = argparse.ArgumentParser(
+    description='Barrido de reservas: libera el stock apartado por reservas de órdenes de cliente ya '
+                'vencidas. Pensado para cron (p. ej. cada 5 minutos), en un solo proceso')
+parser.add_argument('--config', default=os.getenv('FLASK_CONFIG') or 'default', help='Configuración de Flask')
+args = parser.parse_args()
+
+app = create_app(args.config)
+inicio = time.perf_counter()
+
+with app.app_context():
+    unidades = barrer_reservas_vencidas()
+    print(f"Reservas vencidas liberadas: {unidades} unidades en {time.perf_counter() - inicio:.1f}s")
@@ -0,0 +1,44 @@
+import sys
+import os
+import argparse
+# Añadir el directorio raíz al path de Python
+sys.path.insert(0, os.path.abspath(os.path.dirname(__file__)))
+from benchmarks.shards import ejecutar
+from benchmarks.runner import guardar_json, BENCH_DIR
+
+parser = argparse.ArgumentParser(
+    description='Ventas simultáneas en modo por tienda (STORE_SHARDING): comprueba que las ventas de '
+                'tiendas distintas no se esperan entre sí')
+parser.add_argument('--tamano', default='tiny', help='Tamaño de datos (tiny, small, medium, large)')
+parser.add_argument('--semilla', type=int, default=42, help='Semilla del generador de datos')
+parser.add_argument('--regenerar', action='store_true', help='Regenera la base de datos de benchmark')
+parser.add_argument('--tiendas', type=int, default=4, help='Tiendas que venden a la vez')
+parser.add_argument('--ventas', type=int, default=50, help='Ventas por tienda')
+parser.add_argument('--espera', type=float, default=2.0,
+                    help='Segundos que la venta lenta mantiene su transacción abierta')
+parser.add_argument('--salida', default=os.path.join(BENCH_DIR, 'tiendas.json'), help='Archivo JSON de resultados')
+args = parser.parse_args()
+
+print(f"Preparando datos '{args.tamano}' repartidos por tienda...")
+resultado = ejecutar(args.tamano, semilla=args.semilla, tiendas=args.tiendas, ventas=args.ventas,
+                     espera=args.espera, regenerar=args.regenerar)
+
+for nombre in ('una_tienda', 'varias_tiendas'):
+    m = resultado[nombre]
+    print(f"  {nombre:<23} tiendas={m['tiendas']}  {m['ventas_por_segundo']:>7.1f} ventas/s  "
+          f"p50={m['p50_ms']:>8.2f}ms  p95={m['p95_ms']:>8.2f}ms  max={m['max_ms']:>8.2f}ms  errores={m['errores']}")
+for nombre in ('otra_tienda_bloqueada', 'misma_tienda_bloqueada'):
+    m = resultado[nombre]
+    print(f"  {nombre:<23} espera={m['espera_ms']:.0f}ms  p50={m['p50_ms']:>8.2f}ms  "
+          f"max={m['max_ms']:>8.2f}ms  errores={m['errores']}")
+consolidacion = resultado['consolidacion']
+print(f"  consolidación           {consolidacion['duracion_ms']:.1f}ms  {consolidacion['filas']}")
+
+guardar_json(resultado, args.salida)
+print(f"Resultados guardados en {args.salida}")
+
+# Una venta en otra tienda no debe esperar a la transacción abierta
+bloqueada = resultado['otra_tienda_bloqueada']
+if bloqueada['errores'] or bloqueada['max_ms'] >= bloqueada['espera_ms'] / 2:
+    print("Las ventas de otra tienda esperaron a la transacción abierta")
+    sys.exit(1)
@@ -0,0 +1,24 @@
+import sys
+import os
+import time
+import argparse
+# Añadir el directorio raíz al path de Python
+sys.path.insert(0, os.path.abspath(os.path.dirname(__file__)))
+from app import create_app
+from app.services.shard_service import consolidar_tiendas
+
+parser = argparse.ArgumentParser(
+    description='Consolida en la BD principal los resúmenes, agregados y stock que las ventas dejaron pendientes '
+                'en la BD de cada tienda (STORE_SHARDING). Pensado para cron (p. ej. cada minuto)')
+parser.add_argument('--config', default=os.getenv('FLASK_CONFIG') or 'default', help='Configuración de Flask')
+args = parser.parse_args()
+
+app = create_app(args.config)
+inicio = time.perf_counter()
+
+with app.app_context():
+    if not app.config.get('STORE_SHARDING'):
+        sys.exit('STORE_SHARDING no está activo: las ventas escriben directamente en la BD principal')
+    consolidadas = consolidar_tiendas()
+    resumen = ' | '.join(f'{tabla}: {filas}' for tabla, filas in consolidadas.items())
+    print(f"Consolidación finalizada ({resumen}) en {time.perf_counter() - inicio:.1f}s")
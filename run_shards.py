@@ -0,0 +1,28 @@
+import sys
+import os
+import time
+import argparse
+# Añadir el directorio raíz al path de Python
+sys.path.insert(0, os.path.abspath(os.path.dirname(__file__)))
+from app import create_app
+from app.services.shard_service import repartir_en_tiendas
+
+parser = argparse.ArgumentParser(
+    description='Mueve ventas, facturas e inventario de la BD principal a la BD de cada tienda (STORE_SHARDING)')
+parser.add_argument('--config', default=os.getenv('FLASK_CONFIG') or 'default', help='Configuración de Flask')
+args = parser.parse_args()
+
+app = create_app(args.config)
+inicio = time.perf_counter()
+
+def mostrar_progreso(tienda_id, movidas):
+    transcurrido = time.perf_counter() - inicio
+    resumen = ' | '.join(f'{tabla}: {filas}' for tabla, filas in movidas.items())
+    print(f"  Tienda {tienda_id} lista (acumulado {resumen}) | {transcurrido:.1f}s")
+
+with app.app_context():
+    if not app.config.get('STORE_SHARDING'):
+        sys.exit('Active STORE_SHARDING antes de repartir: sin él la aplicación no lee las BD de las tiendas')
+    print(f"Repartiendo datos en {app.config['STORE_SHARD_DIR']}...")
+    repartir_en_tiendas(progreso=mostrar_progreso)
+    print(f"Reparto finalizado en {time.perf_counter() - inicio:.1f}s")
@@ -0,0 +1,26 @@
+import sys
+import os
+import time
+import argparse
+# Añadir el directorio raíz al path de Python
+sys.path.insert(0, os.path.abspath(os.path.dirname(__file__)))
+from app import create_app
+from app.services.supplier_order_service import recalcular_rendimiento, rollup_vencido
+
+parser = argparse.ArgumentParser(
+    description='Rollup de rendimiento de proveedores: recalcula rendimiento_proveedores si venció '
+                'SUPPLIER_ROLLUP_INTERVAL. Pensado para cron (p. ej. cada hora), en un solo proceso')
+parser.add_argument('--forzar', action='store_true', help='Recalcular aunque el rollup siga vigente')
+parser.add_argument('--config', default=os.getenv('FLASK_CONFIG') or 'default', help='Configuración de Flask')
+args = parser.parse_args()
+
+app = create_app(args.config)
+inicio = time.perf_counter()
+
+with app.app_context():
+    if not args.forzar and not rollup_vencido():
+        print('El rollup de proveedores sigue vigente; nada que hacer')
+        sys.exit(0)
+    print('Recalculando el rollup de proveedores...')
+    proveedores = recalcular_rendimiento()
+    print(f"Rollup recalculado para {proveedores} proveedores en {time.perf_counter() - inicio:.1f}s")
@@ -0,0 +1,32 @@
+import pytest
+from app import create_app, db
+from app.models import Category, City, Supplier, Product, Store, StoreInventory
+
+
+@pytest.fixture
+def app():
+    app = create_app('testing')
+    with app.app_context():
+        yield app
+        db.session.remove()
+        db.drop_all()
+
+
+@pytest.fixture
+def producto(app):
+    """Producto con 10 unidades: 3 ubicadas en una tienda y 6 reservadas"""
+    categoria = Category(nombre='Bebidas')
+    proveedor = Supplier(nombre='Proveedor de prueba')
+    ciudad = City(nombre='Ciudad de prueba')
+    db.session.add_all([categoria, proveedor, ciudad])
+    db.session.flush()
+    tienda = Store(nombre='Tienda centro', ciudad_id=ciudad.id_ciudad)
+    db.session.add(tienda)
+    db.session.flush()
+    producto = Product(nombre='Gaseosa', categoria=categoria, proveedor=proveedor,
+                       precio=2500, stock=10, reservado=6)
+    db.session.add(producto)
+    db.session.flush()
+    db.session.add(StoreInventory(tienda_id=tienda.id_tienda, id_producto=producto.id_producto, stock=3))
+    db.session.commit()
+    return producto
@@ -0,0 +1,47 @@
+from datetime import datetime, timedelta
+from app import db
+from app.models import ProductDailySales
+from app.services.reference_service import registrar_cambio
+from app.services.report_service import top_productos
+
+AYER = datetime.utcnow().date() - timedelta(days=1)
+
+
+def _top(app):
+    # Un contexto por consulta, como una petición: la versión se lee una vez por contexto
+    with app.app_context():
+        return [(f['id_producto'], f['unidades']) for f in top_productos(AYER, AYER)]
+
+
+def _vender(producto, unidades, versionar):
+    db.session.merge(ProductDailySales(fecha=AYER, tienda_id=producto.inventario[0].tienda_id,
+                                       id_producto=producto.id_producto, ventas=1,
+                                       unidades=unidades, importe_centavos=unidades * 250000))
+    if versionar:
+        registrar_cambio('ventas_producto_dia')
+    db.session.commit()
+
+
+def test_periodo_cerrado_se_conserva_en_cache(app, producto):
+    _vender(producto, 2, versionar=False)
+    assert _top(app) == [(producto.id_producto, 2)]
+
+    _vender(producto, 5, versionar=False)
+    assert _top(app) == [(producto.id_producto, 2)]
+
+
+def test_cambio_de_version_descarta_periodo_cerrado(app, producto):
+    _vender(producto, 2, versionar=False)
+    assert _top(app) == [(producto.id_producto, 2)]
+
+    _vender(producto, 5, versionar=True)
+    assert _top(app) == [(producto.id_producto, 5)]
+
+
+def test_periodo_cerrado_caduca(app, producto):
+    app.config['ANALYTICS_CLOSED_CACHE_TTL'] = 0
+    _vender(producto, 2, versionar=False)
+    assert _top(app) == [(producto.id_producto, 2)]
+
+    _vender(producto, 5, versionar=False)
+    assert _top(app) == [(producto.id_producto, 5)]
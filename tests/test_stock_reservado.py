@@ -0,0 +1,83 @@
+import io
+from app import db
+from app.models import Product
+from app.services.import_service import importar_productos_csv
+from app.services.inventory_service import ajustar_stock_masivo
+
+
+def _stock(id_producto):
+    db.session.expire_all()
+    return db.session.get(Product, id_producto).stock
+
+
+def test_fijar_stock_bajo_lo_reservado(producto):
+    resultado = ajustar_stock_masivo([{'id_producto': producto.id_producto, 'stock': 5}])
+
+    assert resultado['actualizadas'] == 0
+    assert 'stock' in resultado['errores'][0]['errores']
+    assert _stock(producto.id_producto) == 10
+
+
+def test_fijar_stock_igual_a_lo_reservado(producto):
+    resultado = ajustar_stock_masivo([{'id_producto': producto.id_producto, 'stock': 6}])
+
+    assert resultado['errores'] == []
+    assert _stock(producto.id_producto) == 6
+
+
+def test_restar_mas_de_lo_libre(producto):
+    # Libre: 10 - max(3 ubicadas, 6 reservadas) = 4
+    resultado = ajustar_stock_masivo([{'id_producto': producto.id_producto, 'delta': -5}])
+
+    assert resultado['actualizadas'] == 0
+    assert 'delta' in resultado['errores'][0]['errores']
+    assert _stock(producto.id_producto) == 10
+
+
+def test_restar_lo_libre(producto):
+    resultado = ajustar_stock_masivo([{'id_producto': producto.id_producto, 'delta': -4}])
+
+    assert resultado['errores'] == []
+    assert _stock(producto.id_producto) == 6
+
+
+def test_update_condicional_respeta_lo_reservado(producto):
+    # Una reserva concurrente entre la validación y el UPDATE: la sentencia no debe aplicarse
+    db.session.execute(db.update(Product).where(Product.id_producto == producto.id_producto)
+                       .values(reservado=8))
+    db.session.commit()
+    db.session.expire_all()
+    resultado = ajustar_stock_masivo([{'id_producto': producto.id_producto, 'delta': -2}])
+
+    assert resultado['actualizadas'] == 1
+    assert _stock(producto.id_producto) == 8
+    resultado = ajustar_stock_masivo([{'id_producto': producto.id_producto, 'delta': -1}])
+    assert 'delta' in resultado['errores'][0]['errores']
+
+
+def _importar(stock, producto):
+    csv = ('nombre,categoria,precio,proveedor_id,stock\n'
+           f'Gaseosa,Bebidas,2500,{producto.proveedor_id},{stock}\n')
+    return importar_productos_csv(io.StringIO(csv))
+
+
+def test_importacion_no_baja_de_lo_reservado(producto):
+    resumen = _importar(1, producto)
+
+    assert resumen['actualizadas'] == 1
+    assert _stock(producto.id_producto) == 6
+
+
+def test_importacion_no_baja_de_lo_ubicado(producto):
+    db.session.execute(db.update(Product).where(Product.id_producto == producto.id_producto)
+                       .values(reservado=0))
+    db.session.commit()
+    _importar(1, producto)
+
+    assert _stock(producto.id_producto) == 3
+
+
+def test_importacion_por_encima_del_minimo(producto):
+    _importar(20, producto)
+
+    assert _stock(producto.id_producto) == 20